@@ -1,23 +1,87 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+import time
+BOOT_STARTED = time.perf_counter()  # startup instrumentation, see create_app()
+
+from flask import (Flask, render_template, request, redirect, url_for, flash, session, g,
+                   has_request_context, jsonify, abort, stream_with_context, send_file,
+                   request_started, before_render_template, template_rendered)
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from flask_migrate import Migrate, upgrade, stamp
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import selectinload, load_only, defer, with_expression, RelationshipProperty
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, safe_join
 from functools import wraps
-from datetime import datetime, timezone
+from itertools import chain
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode, urljoin
+import csv
+import fcntl
+import hashlib
+import hmac
+import io
+import json
+import mimetypes
 import os
+import shutil
+import smtplib
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+import uuid
+import click
 from flask_bootstrap import Bootstrap
 from app_config import Config
+from app_content import render_post
+from app_assets import DIST_DIR, build_assets, load_manifest, pick_encoding
+from app_cache import PageCache
+from app_files import OFFLOAD_MODES, send_ranged_file
+from app_images import make_derivatives, derivative_paths, load_variants, srcset, strip_metadata
+from app_jobs import JobRunner
+from app_journal import WriteJournal
+from app_mail import SMTPPool, build_message, new_message_id
+from app_metrics import Metrics, QUERY_COUNT_BUCKETS
+from app_pagination import keyset_paginate
+from app_search import plain_text, search_backend
+from app_storage import collect_garbage, format_size, purge_quarantine, remove_empty_dirs
+from app_stripe import SignatureError, donation_from_event, sign_payload, verify_signature
 from dotenv import load_dotenv
 load_dotenv()
 
+# Seconds spent in each phase of importing this module, logged by create_app().
+boot_timings = {'imports': time.perf_counter() - BOOT_STARTED}
+
 
 app = Flask(__name__)
 app.config.from_object(Config)
+app.logger.setLevel(app.config['LOG_LEVEL'])
 Bootstrap(app)
 
-db = SQLAlchemy(app)
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    """Sends reads to the read replica during requests marked g.use_replica.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary,
+    so a stray write during a replica request is never lost.
+    """
 
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False) \
+                and has_request_context() and g.get('use_replica'):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+migrate = Migrate(app, db, directory=os.path.join(app.root_path, 'migrations'),
+                  render_as_batch=True)
+page_cache = PageCache.from_config(app.config)
 
 
 # =============================================================================
@@ -38,19 +102,42 @@ class User(db.Model):
 
 
 class BlogPost(db.Model):
+    # Keyset pagination on (created_at, id), with or without the public filters.
+    __table_args__ = (
+        db.Index('ix_blog_post_published_category_created', 'published', 'category', 'created_at', 'id'),
+        db.Index('ix_blog_post_published_created', 'published', 'created_at', 'id'),
+        db.Index('ix_blog_post_created', 'created_at', 'id'),
+        db.Index('ix_blog_post_updated', 'updated_at'),  # conditional GET validators
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     excerpt = db.Column(db.String(500))
     category = db.Column(db.String(50), default='General')
     image_url = db.Column(db.String(500))
+    image_variants = db.Column(db.Text)  # JSON from app_images.make_derivatives
+    # Derived from content on save (see render_post_content); never edit directly.
+    content_html = db.Column(db.Text)
+    word_count = db.Column(db.Integer)
+    reading_minutes = db.Column(db.Integer)
     published = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
                            onupdate=lambda: datetime.now(timezone.utc))
 
+    def get_image_variants(self):
+        return load_variants(self.image_variants)
+
+    def body_html(self):
+        """The sanitized body; rendered on the fly only for rows not yet backfilled."""
+        return self.content_html if self.content_html is not None \
+            else render_post(self.content)['content_html']
+
 
 class ContactMessage(db.Model):
+    __table_args__ = (db.Index('ix_contact_message_created', 'created_at', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
@@ -59,17 +146,35 @@ class ContactMessage(db.Model):
     read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    preview = db.query_expression()  # leading slice of message for list views
+
 
 class Donation(db.Model):
+    __table_args__ = (
+        db.Index('ix_donation_created', 'created_at', 'id'),
+        db.Index('ix_donation_amount', 'amount', 'id'),
+        db.Index('ux_donation_payment_reference', 'payment_reference', unique=True),
+        db.Index('ux_donation_reference', 'reference', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     message = db.Column(db.Text)
+    # Token of a donate-form pledge, sent to Stripe as client_reference_id so
+    # the payment settles this row instead of adding another (see STRIPE WEBHOOKS).
+    reference = db.Column(db.String(32))
+    payment_reference = db.Column(db.String(255))  # Stripe PaymentIntent id for paid donations
+    paid_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    preview = db.query_expression()  # leading slice of message for list views
+
 
 class MediaCampaign(db.Model):
+    __table_args__ = (db.Index('ix_media_campaign_updated', 'updated_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -115,11 +220,15 @@ class MediaImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     campaign_id = db.Column(db.Integer, db.ForeignKey('media_campaign.id'), nullable=False)
     image_url = db.Column(db.String(500), nullable=False)
+    variants = db.Column(db.Text)  # JSON from app_images.make_derivatives
     caption = db.Column(db.String(200))
     display_order = db.Column(db.Integer, default=0)
     is_primary = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    def get_variants(self):
+        return load_variants(self.variants)
+
 
 class MediaVideo(db.Model):
     """Uploaded video files OR embedded YouTube/Vimeo links."""
@@ -152,6 +261,103 @@ class MediaVideo(db.Model):
         return self.video_type == 'upload'
 
 
+class ChunkedUpload(db.Model):
+    """A resumable video upload in progress; bytes so far live in CHUNK_UPLOAD_FOLDER."""
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('media_campaign.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    title = db.Column(db.String(200))
+    total_size = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64))  # optional whole-file checksum from the client
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def partial_path(self):
+        return os.path.join(app.config['CHUNK_UPLOAD_FOLDER'], self.id)
+
+    def received(self):
+        """Bytes stored so far — the file on disk is the source of truth for resume."""
+        try:
+            return os.path.getsize(self.partial_path())
+        except OSError:
+            return 0
+
+
+class UploadBlob(db.Model):
+    """A content-addressed file under UPLOAD_FOLDER and how many rows point at it.
+
+    refcount is kept in step with the URL columns in UPLOAD_REFERENCES by
+    the count_upload_references flush hook; `flask rebuild-upload-refs`
+    recomputes it from scratch.
+    """
+    url = db.Column(db.String(500), primary_key=True)
+    size = db.Column(db.BigInteger)
+    refcount = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class JournalSegment(db.Model):
+    """A write-behind journal segment already inserted (see app_journal.WriteJournal)."""
+    name = db.Column(db.String(100), primary_key=True)
+    records = db.Column(db.Integer, nullable=False)
+    flushed_at = db.Column(db.DateTime, nullable=False)
+
+
+class StripeEvent(db.Model):
+    """A verified Stripe webhook event, stored on receipt and processed by a job."""
+    id = db.Column(db.String(255), primary_key=True)  # Stripe's event id
+    type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    received_at = db.Column(db.DateTime, nullable=False)
+    processed_at = db.Column(db.DateTime)
+
+
+class SiteStats(db.Model):
+    """Single-row running totals for the admin dashboard (id is always 1).
+
+    Kept in step with the tables by the maintain_site_stats flush hook;
+    `flask rebuild-stats` recomputes them from scratch.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    total_posts = db.Column(db.Integer, default=0, nullable=False)
+    published_posts = db.Column(db.Integer, default=0, nullable=False)
+    total_messages = db.Column(db.Integer, default=0, nullable=False)
+    unread_messages = db.Column(db.Integer, default=0, nullable=False)
+    total_donations = db.Column(db.Integer, default=0, nullable=False)
+    donation_sum = db.Column(db.Float, default=0, nullable=False)
+
+    FIELDS = ('total_posts', 'published_posts', 'total_messages',
+              'unread_messages', 'total_donations', 'donation_sum')
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class Job(db.Model):
+    """Background job persisted for app_jobs.JobRunner."""
+    __table_args__ = (db.Index('ix_job_status_run_at', 'status', 'run_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text)  # JSON keyword arguments for the handler
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending | running | done | failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    last_error = db.Column(db.Text)
+    run_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'name': self.name, 'status': self.status,
+            'attempts': self.attempts, 'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
 # =============================================================================
 # HELPERS
 # =============================================================================
@@ -174,24 +380,80 @@ def allowed_video(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_VIDEO_EXT
 
 
+def upload_path(url):
+    """Filesystem path of a /static/uploads/... URL, or None for other URLs."""
+    if not url or not url.startswith('/static/uploads/'):
+        return None
+    return safe_join(app.config['UPLOAD_FOLDER'], url[len('/static/uploads/'):])
+
+
+def store_upload(tmp_path, digest, original_name):
+    """Move a fully written temp file into the content-addressed store.
+
+    Files live at <UPLOAD_FOLDER>/ab/cd/<sha256>.<ext>, so identical bytes
+    uploaded twice share one file. The move runs even when the file
+    already exists: a rename is atomic, and the fresh mtime keeps a pending
+    delete job from removing a file that is about to be referenced again.
+    """
+    ext = original_name.rsplit('.', 1)[1].lower() if '.' in original_name else 'bin'
+    relative = f'{digest[:2]}/{digest[2:4]}/{digest}.{secure_filename(ext) or "bin"}'
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative)
+    for attempt in range(2):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            shutil.move(tmp_path, path)
+            break
+        except FileNotFoundError:
+            # delete_upload pruned the emptied shard directory in between.
+            if attempt or not os.path.exists(tmp_path):
+                raise
+    return f'/static/uploads/{relative}'
+
+
 def save_upload(file):
-    """Save a file to UPLOAD_FOLDER and return its public URL."""
-    filename = secure_filename(file.filename)
-    filename = f"{int(datetime.now(timezone.utc).timestamp())}_{filename}"
-    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-    return f"/static/uploads/{filename}"
+    """Hash an uploaded file while writing it out; store it and return its public URL.
+
+    Images lose their EXIF/XMP metadata before they are stored, since the
+    original is served as-is. The digest stays that of the uploaded bytes,
+    so uploading the same photo again still lands on the same file.
+    """
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=app.config['CHUNK_UPLOAD_FOLDER'])
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for block in iter(lambda: file.stream.read(1024 * 1024), b''):
+                digest.update(block)
+                out.write(block)
+        os.chmod(tmp_path, 0o644)
+        if allowed_image(file.filename):
+            strip_metadata(tmp_path)
+        return store_upload(tmp_path, digest.hexdigest(), file.filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 def delete_upload(url):
-    """Delete a file from disk given its /static/uploads/... URL."""
-    try:
-        if url and url.startswith('/static/uploads/'):
-            path = os.path.join(app.config['UPLOAD_FOLDER'],
-                                url.replace('/static/uploads/', ''))
-            if os.path.exists(path):
-                os.remove(path)
-    except Exception as e:
-        print(f'File delete warning: {e}')
+    """Delete an uploaded file and its image derivatives, then any emptied shard directories."""
+    path = upload_path(url)
+    if path is None:
+        return
+    for target in [path] + derivative_paths(path):
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+    remove_empty_dirs(app.config['UPLOAD_FOLDER'], [os.path.dirname(path)])
+
+
+def process_image_upload(url):
+    """Write responsive derivatives for an uploaded image; return them as JSON."""
+    path = upload_path(url)
+    if path is None:
+        return None
+    variants = make_derivatives(path, url.rsplit('/', 1)[0] + '/')
+    return json.dumps(variants) if variants else None
 
 
 def login_required(f):
@@ -204,18 +466,1237 @@ def login_required(f):
     return decorated_function
 
 
+def date_arg(name, end_of_day=False):
+    """Parse a YYYY-MM-DD query argument; end_of_day gives the next midnight."""
+    try:
+        day = datetime.strptime(request.args.get(name, ''), '%Y-%m-%d')
+    except ValueError:
+        return None
+    return day + timedelta(days=1) if end_of_day else day
+
+
+def list_filters(*names):
+    """The non-empty filter/sort query arguments, to carry over into page links."""
+    return {name: request.args[name] for name in names if request.args.get(name)}
+
+
+def preview_of(column, length=80):
+    return db.func.substr(column, 1, length)
+
+
 def handle_image_upload(files, existing_url=None):
     """Single-image upload used by blog posts."""
     if 'image_file' in files:
         file = files['image_file']
         if file and file.filename and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filename = f"{int(datetime.now(timezone.utc).timestamp())}_{filename}"
-            file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-            return f"/static/uploads/{filename}"
+            return save_upload(file)
     return existing_url
 
 
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in testing when a public route runs more SQL than SQL_QUERY_BUDGET."""
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_queries = g.get('sql_queries', 0) + 1
+        conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def time_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+    if started is not None and has_request_context():
+        elapsed = time.perf_counter() - started
+        g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+        if app.config['SLOW_REQUEST_MS']:
+            g.setdefault('sql_log', []).append((elapsed, statement))
+
+
+def is_public_endpoint(endpoint):
+    return bool(endpoint) and endpoint != 'static' and not endpoint.startswith('admin_')
+
+
+@app.after_request
+def enforce_query_budget(response):
+    """Catch N+1 regressions: flag public routes that go over SQL_QUERY_BUDGET."""
+    budget = app.config['SQL_QUERY_BUDGET']
+    used = g.get('sql_queries', 0)
+    if budget and used > budget and is_public_endpoint(request.endpoint):
+        msg = f'{request.endpoint} ran {used} SQL queries (budget {budget})'
+        if app.testing:
+            raise QueryBudgetExceeded(msg)
+        app.logger.warning(msg)
+    return response
+
+
+# =============================================================================
+# READ REPLICA
+# =============================================================================
+# With DATABASE_REPLICA_URL set, public GET requests read from the replica
+# and everything else uses the primary. An admin who has just saved stays
+# on the primary for REPLICA_STICKY_SECONDS so they see their own changes
+# on the public pages despite replication lag.
+
+@app.before_request
+def route_reads_to_replica():
+    g.use_replica = REPLICA_BIND in app.config['SQLALCHEMY_BINDS'] \
+        and request.method in ('GET', 'HEAD') and is_public_endpoint(request.endpoint) \
+        and session.get('primary_until', 0) < time.time()
+
+
+@event.listens_for(db.session, 'after_flush')
+def note_primary_write(sess, flush_context):
+    sess.info['wrote_primary'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def stick_to_primary(sess):
+    if sess.info.pop('wrote_primary', False) and has_request_context() \
+            and 'user_id' in session and REPLICA_BIND in app.config['SQLALCHEMY_BINDS']:
+        session['primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_primary_write(sess):
+    sess.info.pop('wrote_primary', None)
+
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+metrics = Metrics.from_config(app.config)
+metrics.histogram('http_request_duration_seconds',
+                  'Time from request start to response, by endpoint, method and status.')
+metrics.counter('http_response_bytes_total', 'Response body bytes, where the length is known.')
+metrics.histogram('http_request_sql_queries', 'SQL statements run per request.',
+                  QUERY_COUNT_BUCKETS)
+metrics.counter('sql_query_seconds_total', 'Time spent executing SQL, by endpoint.')
+metrics.counter('template_render_seconds_total', 'Time spent rendering templates, by endpoint.')
+metrics.histogram('app_boot_seconds', 'Time from import to a worker being ready.',
+                  (0.25, 0.5, 1, 2, 5, 10, 30))
+
+
+@request_started.connect_via(app)
+def start_request_timer(sender, **extra):
+    g.request_started = time.perf_counter()
+
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    g.setdefault('template_started', []).append(time.perf_counter())
+
+
+@template_rendered.connect_via(app)
+def stop_template_timer(sender, template, context, **extra):
+    if g.get('template_started'):
+        g.template_seconds = (g.get('template_seconds', 0.0)
+                              + time.perf_counter() - g.template_started.pop())
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None or not app.config['METRICS_ENABLED']:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = (('endpoint', request.endpoint or 'unmatched'),)
+    metrics.observe('http_request_duration_seconds',
+                    endpoint + (('method', request.method), ('status', str(response.status_code))),
+                    elapsed)
+    metrics.inc('http_response_bytes_total', endpoint, response.content_length or 0)
+    metrics.observe('http_request_sql_queries', endpoint, g.get('sql_queries', 0))
+    metrics.inc('sql_query_seconds_total', endpoint, g.get('sql_seconds', 0.0))
+    metrics.inc('template_render_seconds_total', endpoint, g.get('template_seconds', 0.0))
+    metrics.maybe_persist()
+    if app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={g.get("sql_seconds", 0.0) * 1000:.1f};desc="{g.get("sql_queries", 0)} queries", '
+            f'tpl;dur={g.get("template_seconds", 0.0) * 1000:.1f}')
+
+    slow_ms = app.config['SLOW_REQUEST_MS']
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        queries = g.get('sql_log', [])
+        app.logger.warning(
+            'Slow request: %s %s -> %s in %.0f ms (%d queries, %.0f ms SQL, %.0f ms templates)%s',
+            request.method, request.full_path.rstrip('?'), response.status_code, elapsed * 1000,
+            g.get('sql_queries', 0), g.get('sql_seconds', 0.0) * 1000,
+            g.get('template_seconds', 0.0) * 1000,
+            ''.join(f'\n  {seconds * 1000:8.1f} ms  {" ".join(statement.split())[:300]}'
+                    for seconds, statement in queries[:50]))
+    return response
+
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    """Prometheus scrape endpoint: admin session or METRICS_TOKEN bearer token."""
+    token = app.config['METRICS_TOKEN']
+    bearer = request.headers.get('Authorization', '')
+    if 'user_id' not in session and not (
+            token and hmac.compare_digest(bearer.encode(), f'Bearer {token}'.encode())):
+        abort(401)
+    jobs_by_status = db.session.query(Job.status, db.func.count()).group_by(Job.status).all()
+    gauges = [
+        ('jobs', 'Background jobs by status.',
+         [((('status', status),), count) for status, count in jobs_by_status]),
+        ('write_journal_segments_pending', 'Write-behind journal segments not yet inserted.',
+         [((), journal.pending())]),
+    ]
+    return app.response_class(metrics.render(gauges),
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# =============================================================================
+# PAGE CACHE
+# =============================================================================
+
+# Which cached pages each model feeds; a committed write to any of these
+# models invalidates the namespace.
+CACHE_NAMESPACES = {
+    'BlogPost': 'posts',
+    'MediaCampaign': 'media',
+    'MediaImage': 'media',
+    'MediaVideo': 'media',
+}
+
+
+@event.listens_for(db.session, 'after_flush')
+def collect_cache_invalidations(sess, flush_context):
+    for obj in chain(sess.new, sess.dirty, sess.deleted):
+        namespace = CACHE_NAMESPACES.get(type(obj).__name__)
+        if namespace:
+            sess.info.setdefault('invalidate_pages', set()).add(namespace)
+
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_page_cache(sess):
+    for namespace in sess.info.pop('invalidate_pages', ()):
+        page_cache.invalidate(namespace)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_cache_invalidations(sess):
+    sess.info.pop('invalidate_pages', None)
+
+
+def cached_page(*namespaces):
+    """Serve a public page from page_cache while its namespaces are unchanged.
+
+    The key covers the host, endpoint, URL arguments, the page cursor,
+    category, fields and limit query arguments, whether an admin is
+    logged in and the validator of an enclosing @conditional_page. The
+    last means a page rendered from a lagging read replica right after an
+    invalidation is not served once the replica catches up. Requests with
+    pending flash messages bypass the cache so messages are neither cached
+    nor swallowed.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if '_flashes' in session:
+                return f(*args, **kwargs)
+            key = page_cache.make_key(
+                namespaces, request.host, request.endpoint, sorted(kwargs.items()),
+                request.args.get('after', ''), request.args.get('before', ''),
+                request.args.get('category', ''),
+                request.args.get('fields', ''), request.args.get('limit', ''),
+                'user_id' in session, g.get('page_validator'))
+            hit = page_cache.get(key)
+            if hit is not None:
+                body, mimetype = hit
+                return app.response_class(body, mimetype=mimetype)
+            response = app.make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                page_cache.set(key, (response.get_data(), response.mimetype))
+            return response
+        return decorated_function
+    return decorator
+
+
+# =============================================================================
+# CONDITIONAL GET
+# =============================================================================
+
+def validator_namespaces(*namespaces):
+    """Declare the page-cache namespaces whose writes can change a validator."""
+    def decorator(f):
+        f.namespaces = namespaces
+        return f
+    return decorator
+
+
+@validator_namespaces('posts')
+def posts_validator():
+    return db.session.query(db.func.count(BlogPost.id), db.func.max(BlogPost.updated_at)).one()
+
+
+@validator_namespaces('media')
+def media_validator():
+    return db.session.query(db.func.count(MediaCampaign.id),
+                            db.func.max(MediaCampaign.updated_at)).one()
+
+
+@validator_namespaces('posts')
+def post_validator():
+    """Like posts_validator, for the one post named in the URL."""
+    return db.session.query(db.func.count(BlogPost.id), db.func.max(BlogPost.updated_at))\
+        .filter(BlogPost.id == request.view_args['post_id']).one()
+
+
+@validator_namespaces('posts', 'media')
+def catalog_validator():
+    """posts_validator and media_validator together, for pages showing both."""
+    (posts, posts_modified), (campaigns, media_modified) = posts_validator(), media_validator()
+    return posts + campaigns, max(filter(None, (posts_modified, media_modified)), default=None)
+
+
+@validator_namespaces('media')
+def campaign_validator():
+    """Like media_validator, for the one campaign named in the URL."""
+    return db.session.query(db.func.count(MediaCampaign.id),
+                            db.func.max(MediaCampaign.updated_at))\
+        .filter(MediaCampaign.id == request.view_args['campaign_id']).one()
+
+
+def cached_validator(validator):
+    """validator()'s result, kept in page_cache until one of its namespaces is invalidated.
+
+    The aggregates scan whole indexes, so they run only on a miss; a page
+    cache hit or a 304 then needs no database at all. Behind a read replica
+    the entry also expires after REPLICA_STICKY_SECONDS, so a value read
+    from a lagging replica right after an invalidation doesn't stick.
+    """
+    key = page_cache.make_key(validator.namespaces, 'validator', validator.__name__,
+                              sorted((request.view_args or {}).items()))
+    value = page_cache.get(key)
+    if value is None:
+        value = tuple(validator())
+        ttl = app.config['REPLICA_STICKY_SECONDS'] \
+            if REPLICA_BIND in app.config['SQLALCHEMY_BINDS'] else None
+        page_cache.set(key, value, ttl)
+    return value
+
+
+@event.listens_for(db.session, 'before_flush')
+def touch_campaign_on_media_change(sess, flush_context, instances):
+    """Images and videos are part of their campaign's page, so bump its updated_at."""
+    for obj in chain(sess.new, sess.dirty, sess.deleted):
+        if isinstance(obj, (MediaImage, MediaVideo)) and \
+                (obj in sess.deleted or sess.is_modified(obj)):
+            campaign = obj.campaign or sess.get(MediaCampaign, obj.campaign_id)
+            if campaign is not None and campaign not in sess.deleted:
+                campaign.updated_at = datetime.now(timezone.utc)
+
+
+def conditional_page(validator):
+    """Answer If-None-Match / If-Modified-Since with a 304 before rendering.
+
+    validator returns (row count, max updated_at) for the data behind the
+    page; together with the URL and login state that makes a weak ETag, so
+    edits, inserts and deletes all change it. Last-Modified can move
+    backwards when the newest row is deleted, so If-Modified-Since only
+    matches the exact value we last sent. Public responses get
+    Cache-Control with stale-while-revalidate for the CDN; an admin's
+    view stays private. Goes outside @cached_page so a 304 skips the page
+    lookup as well; the validator itself comes from cached_validator.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if '_flashes' in session:
+                return f(*args, **kwargs)
+            count, last_modified = g.page_validator = cached_validator(validator)
+            if last_modified is not None and last_modified.tzinfo is None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+            logged_in = 'user_id' in session
+            etag = hashlib.sha1(repr((
+                request.endpoint, sorted(kwargs.items()),
+                sorted(request.args.items(multi=True)), logged_in,
+                count, last_modified and last_modified.isoformat(),
+            )).encode('utf-8')).hexdigest()
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = (last_modified is not None and request.if_modified_since
+                                == last_modified.replace(microsecond=0))
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            if logged_in:
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            else:
+                response.cache_control.public = True
+                response.cache_control.max_age = app.config['HTTP_MAX_AGE']
+                response.cache_control.s_maxage = app.config['HTTP_SHARED_MAX_AGE']
+                response.cache_control.stale_while_revalidate = \
+                    app.config['HTTP_STALE_WHILE_REVALIDATE']
+            response.vary.add('Cookie')
+            return response
+        return decorated_function
+    return decorator
+
+
+# =============================================================================
+# STATIC ASSETS
+# =============================================================================
+
+# Logical name -> fingerprinted name, filled in by create_app(). Until then
+# (or with no build) url_for('static') keeps pointing at the source files.
+asset_manifest = {}
+
+
+def load_assets():
+    manifest = load_manifest(app.static_folder)
+    if app.config['ASSETS_AUTO_BUILD'] and not manifest:
+        manifest = build_assets(app.static_folder)
+    asset_manifest.clear()
+    asset_manifest.update(manifest)
+
+
+@app.url_defaults
+def fingerprint_static_url(endpoint, values):
+    """Make url_for('static', filename=...) point at the built, hashed file."""
+    if endpoint == 'static' and not app.debug:
+        hashed = asset_manifest.get(values.get('filename'))
+        if hashed:
+            values['filename'] = f'{DIST_DIR}/{hashed}'
+
+
+@app.route(f'/static/{DIST_DIR}/<path:filename>')
+def static_dist(filename):
+    """Serve a fingerprinted asset, precompressed if the client accepts it.
+
+    The name changes whenever the content does, so the response may be
+    cached forever.
+    """
+    path = safe_join(app.static_folder, DIST_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    send_path, encoding = pick_encoding(path, request.accept_encodings)
+    response = send_file(send_path, mimetype=mimetypes.guess_type(filename)[0],
+                         conditional=True, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+if app.config['UPLOADS_OFFLOAD'] not in (None,) + OFFLOAD_MODES:
+    raise ValueError(f"Unknown UPLOADS_OFFLOAD: {app.config['UPLOADS_OFFLOAD']!r}")
+
+
+@app.route('/static/uploads/<path:filename>')
+def uploaded_file(filename):
+    """Serve uploads (videos especially) with Range, validators and zero-copy sends."""
+    path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+    response = path and send_ranged_file(
+        request, app.response_class, path,
+        max_age=app.config['UPLOADS_MAX_AGE'],
+        offload=app.config['UPLOADS_OFFLOAD'],
+        offload_url=app.config['UPLOADS_ACCEL_PREFIX'] + filename)
+    if response is None:
+        abort(404)
+    return response
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Minify, fingerprint and precompress static/ into static/dist/."""
+    manifest = build_assets(app.static_folder)
+    dist = os.path.join(app.static_folder, DIST_DIR)
+    for logical, hashed in sorted(manifest.items()):
+        before = os.path.getsize(os.path.join(app.static_folder, logical))
+        after = os.path.getsize(os.path.join(dist, hashed))
+        click.echo(f'{logical} -> {hashed} ({before:,} -> {after:,} bytes)')
+
+
+app.add_template_filter(srcset)
+
+
+# =============================================================================
+# BACKGROUND JOBS
+# =============================================================================
+
+jobs = JobRunner(app, db, Job)
+
+
+@event.listens_for(db.session, 'after_commit')
+def wake_job_runner(sess):
+    if sess.info.pop('jobs_enqueued', False):
+        jobs.notify()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_job_wakeup(sess):
+    sess.info.pop('jobs_enqueued', None)
+
+
+@app.before_request
+def start_job_runner():
+    # Started lazily so each gunicorn worker gets its own threads after fork.
+    if app.config['JOBS_ENABLED']:
+        jobs.start()
+
+
+def known_variants(url):
+    """Derivatives JSON already built for url by another row sharing the file."""
+    return (db.session.query(MediaImage.variants)
+            .filter(MediaImage.image_url == url, MediaImage.variants.isnot(None))
+            .union_all(db.session.query(BlogPost.image_variants)
+                       .filter(BlogPost.image_url == url, BlogPost.image_variants.isnot(None)))
+            .limit(1).scalar())
+
+
+@jobs.task('process_image')
+def process_image_job(model, id, url):
+    """Build responsive derivatives for a MediaImage or BlogPost image."""
+    if model == 'MediaImage':
+        row = db.session.get(MediaImage, id)
+        if row is not None and row.image_url == url:
+            row.variants = known_variants(url) or process_image_upload(url)
+    elif model == 'BlogPost':
+        row = db.session.get(BlogPost, id)
+        if row is not None and row.image_url == url:
+            row.image_variants = known_variants(url) or process_image_upload(url)
+
+
+@jobs.task('delete_files', max_attempts=5)
+def delete_files_job(urls):
+    """Delete uploads that nothing references any more (see UPLOAD STORAGE)."""
+    grace = app.config['UPLOAD_DELETE_GRACE']
+    retry = []
+    for url in urls:
+        path = upload_path(url)
+        if path is None or upload_is_referenced(url):
+            continue
+        try:
+            age = datetime.now(timezone.utc).timestamp() - os.path.getmtime(path)
+        except OSError:
+            age = grace
+        if age < grace:
+            retry.append(url)  # just re-stored by an upload whose row isn't committed yet
+            continue
+        db.session.execute(db.delete(UploadBlob).where(UploadBlob.url == url,
+                                                       UploadBlob.refcount <= 0))
+        delete_upload(url)
+    if retry:
+        jobs.enqueue('delete_files', delay=grace, urls=retry)
+
+
+def enqueue_image_processing(row):
+    url = row.image_url
+    if url and url.startswith('/static/uploads/'):
+        jobs.enqueue('process_image', model=type(row).__name__, id=row.id, url=url)
+
+
+@app.cli.command('run-jobs')
+@click.option('--once', is_flag=True, help='Run every due job inline, then exit.')
+def run_jobs_command(once):
+    """Process background jobs in the foreground (e.g. as a separate worker)."""
+    if once:
+        jobs.requeue_stale()
+        while jobs.dispatch_due(run_inline=True):
+            pass
+        return
+    jobs.start()
+    threading.Event().wait()
+
+
+# =============================================================================
+# UPLOAD STORAGE
+# =============================================================================
+
+# Columns that may hold a /static/uploads/ URL. Every write to them adjusts
+# UploadBlob.refcount in the same transaction; a URL whose count drops gets
+# a delete_files job, which removes the file only if it is still unreferenced.
+UPLOAD_REFERENCES = {
+    MediaImage: 'image_url',
+    MediaVideo: 'video_url',
+    BlogPost: 'image_url',
+}
+
+
+def keep_old_values(*attributes):
+    """Make assignments to attributes load the value they replace.
+
+    Setting a plain column on an expired instance (after a commit, say)
+    doesn't fetch the old value, so _changed() would report None as the old
+    value and the flush hooks would never release it.
+    """
+    for attribute in attributes:
+        event.listen(attribute, 'set', lambda target, value, old, initiator: None,
+                     active_history=True)
+
+
+keep_old_values(*(getattr(model, column) for model, column in UPLOAD_REFERENCES.items()))
+
+
+def _upload_url(url):
+    return url if url and url.startswith('/static/uploads/') else None
+
+
+@event.listens_for(db.session, 'after_flush')
+def count_upload_references(sess, flush_context):
+    delta = {}
+
+    def add(url, n):
+        if _upload_url(url):
+            delta[url] = delta.get(url, 0) + n
+
+    for obj in sess.new:
+        if (column := UPLOAD_REFERENCES.get(type(obj))):
+            add(getattr(obj, column), 1)
+    for obj in sess.deleted:
+        if (column := UPLOAD_REFERENCES.get(type(obj))):
+            add(getattr(obj, column), -1)
+    for obj in sess.dirty:
+        column = UPLOAD_REFERENCES.get(type(obj))
+        if column and (change := _changed(obj, column)):
+            add(change[0], -1)
+            add(change[1], 1)
+
+    delta = {url: n for url, n in delta.items() if n}
+    for url, n in delta.items():
+        bump_upload_refcount(sess, url, n)
+    released = sorted(url for url, n in delta.items() if n < 0)
+    if released:
+        jobs.enqueue_in_flush(sess, 'delete_files', urls=released)
+
+
+def bump_upload_refcount(sess, url, n):
+    """Add n to url's refcount, creating its UploadBlob row on first use.
+
+    A single INSERT ... ON CONFLICT DO UPDATE, so two requests referencing
+    the same new file at once can't both try to create the row.
+    """
+    table = UploadBlob.__table__
+    path = upload_path(url)
+    size = os.path.getsize(path) if n > 0 and path and os.path.isfile(path) else None
+    conn = sess.connection()
+    insert = (sqlite_insert if conn.dialect.name == 'sqlite' else pg_insert)(table)
+    conn.execute(insert.values(url=url, size=size, refcount=n,
+                               created_at=datetime.now(timezone.utc))
+                 .on_conflict_do_update(index_elements=['url'],
+                                        set_={'refcount': table.c.refcount + n}))
+
+
+def upload_is_referenced(url):
+    blob = db.session.get(UploadBlob, url, populate_existing=True)
+    if blob is not None:
+        return blob.refcount > 0
+    # Not tracked (derivatives, pre-refcount jobs): look at the columns directly.
+    return any(db.session.query(getattr(model, column)).filter_by(**{column: url}).first()
+               is not None for model, column in UPLOAD_REFERENCES.items())
+
+
+def rebuild_upload_refs():
+    """Recount every UploadBlob from the URL columns and fill in missing sizes."""
+    counts = {}
+    for model, column in UPLOAD_REFERENCES.items():
+        attr = getattr(model, column)
+        for url, n in db.session.query(attr, db.func.count()).group_by(attr):
+            if _upload_url(url):
+                counts[url] = counts.get(url, 0) + n
+    for blob in UploadBlob.query.all():
+        blob.refcount = counts.pop(blob.url, 0)
+    for url in counts:
+        db.session.add(UploadBlob(url=url, refcount=counts[url]))
+    db.session.flush()
+    for blob in UploadBlob.query.filter(UploadBlob.size.is_(None)):
+        path = upload_path(blob.url)
+        if path and os.path.isfile(path):
+            blob.size = os.path.getsize(path)
+    db.session.commit()
+
+
+@app.cli.command('rebuild-upload-refs')
+def rebuild_upload_refs_command():
+    """Recompute upload reference counts and sizes from the database and disk."""
+    rebuild_upload_refs()
+    total, shared, unused = db.session.query(
+        db.func.count(), db.func.sum(db.case((UploadBlob.refcount > 1, 1), else_=0)),
+        db.func.sum(db.case((UploadBlob.refcount <= 0, 1), else_=0))).one()
+    click.echo(f'{total} files, {shared or 0} shared by several rows, {unused or 0} unreferenced.')
+
+
+UPLOAD_PREFIX = '/static/uploads/'
+
+
+def referenced_upload_paths():
+    """Every upload some row points at, as paths relative to UPLOAD_FOLDER.
+
+    Read straight from the URL columns rather than UploadBlob, so the
+    collector stays correct even if reference counts have drifted.
+    """
+    paths = set()
+    for model, column in UPLOAD_REFERENCES.items():
+        attr = getattr(model, column)
+        urls = db.session.execute(db.select(attr).where(attr.like(UPLOAD_PREFIX + '%'))
+                                  .distinct().execution_options(yield_per=5000)).scalars()
+        paths.update(url[len(UPLOAD_PREFIX):] for url in urls)
+    return paths
+
+
+def referenced_upload_subset(paths):
+    """The subset of paths referenced right now (re-checked before removal)."""
+    urls = [UPLOAD_PREFIX + path for path in paths]
+    found = set()
+    for model, column in UPLOAD_REFERENCES.items():
+        attr = getattr(model, column)
+        found.update(db.session.execute(db.select(attr).where(attr.in_(urls))).scalars())
+    db.session.rollback()  # don't hold a read transaction open between batches
+    return [url[len(UPLOAD_PREFIX):] for url in found]
+
+
+def collect_upload_garbage(apply=False, delete=False, grace=None):
+    """Reconcile UPLOAD_FOLDER with the database; see app_storage.collect_garbage.
+
+    Orphans are quarantined (or, with delete, removed) only when apply is
+    set. Applying also purges quarantined files older than
+    UPLOAD_QUARANTINE_DAYS and drops UploadBlob rows left for files that are
+    gone. Returns (report, (count, bytes) purged from quarantine).
+    """
+    referenced = referenced_upload_paths()
+    db.session.rollback()
+    report = collect_garbage(
+        app.config['UPLOAD_FOLDER'], referenced,
+        grace=app.config['UPLOAD_DELETE_GRACE'] if grace is None else grace,
+        apply=apply, quarantine=None if delete else app.config['UPLOAD_QUARANTINE_FOLDER'],
+        recheck=referenced_upload_subset)
+    purged = (0, 0)
+    if apply:
+        purged = purge_quarantine(app.config['UPLOAD_QUARANTINE_FOLDER'],
+                                  app.config['UPLOAD_QUARANTINE_DAYS'] * 86400)
+        for blob in UploadBlob.query.filter(UploadBlob.refcount <= 0):
+            path = upload_path(blob.url)
+            if path is None or not os.path.exists(path):
+                db.session.delete(blob)
+        db.session.commit()
+    return report, purged
+
+
+@jobs.task('gc_uploads', max_attempts=1, every='UPLOAD_GC_INTERVAL')
+def gc_uploads_job():
+    """Quarantine orphaned uploads; runs every UPLOAD_GC_INTERVAL seconds."""
+    report, purged = collect_upload_garbage(apply=True)
+    app.logger.info('Upload GC: quarantined %d files (%s), purged %d (%s) from quarantine',
+                    report.removed[0], format_size(report.removed[1]),
+                    purged[0], format_size(purged[1]))
+
+
+@app.cli.command('gc-uploads')
+@click.option('--apply', is_flag=True,
+              help='Quarantine orphaned files. Without it, only report.')
+@click.option('--delete', is_flag=True,
+              help='With --apply, delete orphans outright instead of quarantining them.')
+@click.option('--grace', type=int, default=None,
+              help='Skip files modified within this many seconds (default UPLOAD_DELETE_GRACE).')
+def gc_uploads_command(apply, delete, grace):
+    """Report upload disk usage and remove files no row references."""
+    report, purged = collect_upload_garbage(apply=apply, delete=delete, grace=grace)
+    for line in report.lines():
+        click.echo(line)
+    if not apply:
+        click.echo('Dry run: nothing was removed. Re-run with --apply to clean up.')
+        return
+    action = 'Deleted' if delete else f"Quarantined to {app.config['UPLOAD_QUARANTINE_FOLDER']}:"
+    click.echo(f'{action} {report.removed[0]:,} files ({format_size(report.removed[1])}).')
+    if report.kept:
+        click.echo(f'Kept {report.kept:,} files referenced or rewritten during the scan.')
+    if purged[0]:
+        click.echo(f'Purged {purged[0]:,} expired files ({format_size(purged[1])}) from quarantine.')
+
+
+# =============================================================================
+# POST CONTENT
+# =============================================================================
+
+# What the public blog pages show in listings; the body columns stay unloaded.
+POST_CARD_COLUMNS = load_only(
+    BlogPost.id, BlogPost.title, BlogPost.excerpt, BlogPost.category, BlogPost.image_url,
+    BlogPost.image_variants, BlogPost.reading_minutes, BlogPost.created_at)
+
+
+def apply_post_rendering(post):
+    rendered = render_post(post.content)
+    post.content_html = rendered['content_html']
+    post.word_count = rendered['word_count']
+    post.reading_minutes = rendered['reading_minutes']
+    if not (post.excerpt or '').strip():
+        post.excerpt = rendered['excerpt']
+
+
+@event.listens_for(db.session, 'before_flush')
+def render_post_content(sess, flush_context, instances):
+    """Sanitize and measure a post's content whenever it is saved, not per view."""
+    for obj in chain(sess.new, sess.dirty):
+        if isinstance(obj, BlogPost) and (obj in sess.new or _changed(obj, 'content')
+                                          or _changed(obj, 'excerpt')):
+            apply_post_rendering(obj)
+
+
+def render_posts(everything=False, batch_size=500):
+    """Backfill the derived columns (all posts with everything); returns the count."""
+    count, last_id = 0, 0
+    while True:
+        query = BlogPost.query.filter(BlogPost.id > last_id)
+        if not everything:
+            query = query.filter(BlogPost.content_html.is_(None))
+        batch = query.order_by(BlogPost.id).limit(batch_size).all()
+        if not batch:
+            return count
+        for post in batch:
+            apply_post_rendering(post)
+        db.session.commit()
+        count += len(batch)
+        last_id = batch[-1].id
+
+
+@app.cli.command('render-posts')
+@click.option('--all', 'everything', is_flag=True,
+              help='Re-render every post, e.g. after changing the sanitizer rules.')
+def render_posts_command(everything):
+    """Fill in sanitized HTML, excerpts and reading times for blog posts."""
+    click.echo(f'{render_posts(everything)} posts rendered.')
+
+
+# =============================================================================
+# SITE STATISTICS
+# =============================================================================
+
+def _changed(obj, attr):
+    """(old, new) for an attribute modified in the pending flush, else None."""
+    history = db.inspect(obj).attrs[attr].history
+    if not history.has_changes():
+        return None
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old, new
+
+
+keep_old_values(BlogPost.published, ContactMessage.read, Donation.amount)
+
+
+@event.listens_for(db.session, 'after_flush')
+def maintain_site_stats(sess, flush_context):
+    """Apply this flush's effect on SiteStats in the same transaction."""
+    delta = dict.fromkeys(SiteStats.FIELDS, 0)
+    for obj in sess.new:
+        if isinstance(obj, BlogPost):
+            delta['total_posts'] += 1
+            delta['published_posts'] += obj.published is not False
+        elif isinstance(obj, ContactMessage):
+            delta['total_messages'] += 1
+            delta['unread_messages'] += not obj.read
+        elif isinstance(obj, Donation):
+            delta['total_donations'] += 1
+            delta['donation_sum'] += obj.amount or 0
+    for obj in sess.deleted:
+        if isinstance(obj, BlogPost):
+            delta['total_posts'] -= 1
+            delta['published_posts'] -= obj.published is not False
+        elif isinstance(obj, ContactMessage):
+            delta['total_messages'] -= 1
+            delta['unread_messages'] -= not obj.read
+        elif isinstance(obj, Donation):
+            delta['total_donations'] -= 1
+            delta['donation_sum'] -= obj.amount or 0
+    for obj in sess.dirty:
+        if isinstance(obj, BlogPost) and (change := _changed(obj, 'published')):
+            delta['published_posts'] += bool(change[1]) - bool(change[0])
+        elif isinstance(obj, ContactMessage) and (change := _changed(obj, 'read')):
+            delta['unread_messages'] += bool(change[0]) - bool(change[1])
+        elif isinstance(obj, Donation) and (change := _changed(obj, 'amount')):
+            delta['donation_sum'] += (change[1] or 0) - (change[0] or 0)
+    bump_site_stats(sess, **delta)
+
+
+def bump_site_stats(sess, **delta):
+    """Atomically add delta to the SiteStats counters (UPDATE col = col + n)."""
+    delta = {k: v for k, v in delta.items() if v}
+    if delta:
+        table = SiteStats.__table__
+        sess.connection().execute(
+            table.update().where(table.c.id == 1)
+            .values({k: table.c[k] + v for k, v in delta.items()}))
+
+
+def rebuild_site_stats():
+    """Recompute every counter from the underlying tables."""
+    stats = db.session.get(SiteStats, 1)
+    if stats is None:
+        stats = SiteStats(id=1)
+        db.session.add(stats)
+    stats.total_posts = BlogPost.query.count()
+    stats.published_posts = BlogPost.query.filter_by(published=True).count()
+    stats.total_messages = ContactMessage.query.count()
+    stats.unread_messages = ContactMessage.query.filter_by(read=False).count()
+    stats.total_donations = Donation.query.count()
+    stats.donation_sum = db.session.query(db.func.sum(Donation.amount)).scalar() or 0
+    db.session.commit()
+    return stats
+
+
+def get_site_stats():
+    return db.session.get(SiteStats, 1) or rebuild_site_stats()
+
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the dashboard counters from the posts, messages and donations tables."""
+    stats = rebuild_site_stats()
+    for key, value in stats.to_dict().items():
+        click.echo(f'{key}: {value}')
+
+
+# =============================================================================
+# OUTBOUND MAIL
+# =============================================================================
+# Mail is rendered in the request and sent by the send_mail job, so SMTP
+# latency never reaches the visitor. Jobs give persistence and retries with
+# backoff; mail_pool keeps SMTP sessions open between messages.
+
+mail_pool = SMTPPool.from_config(app.config)
+
+
+def mail_sender():
+    return app.config['MAIL_DEFAULT_SENDER'] or app.config['MAIL_USERNAME']
+
+
+def queue_mail(to, subject, template, reply_to=None, **context):
+    """Render a text email and enqueue it in the current session.
+
+    Sent once the session commits. Does nothing when MAIL_SERVER is unset.
+    """
+    if not app.config['MAIL_SERVER'] or not to:
+        return None
+    return jobs.enqueue('send_mail', to=to, subject=subject,
+                        body=render_template(template, **context), reply_to=reply_to,
+                        message_id=new_message_id(mail_sender()))
+
+
+@jobs.task('send_mail', max_attempts=6)
+def send_mail_job(to, subject, body, reply_to=None, message_id=None):
+    try:
+        mail_pool.send(build_message(mail_sender(), to, subject, body, reply_to, message_id))
+    except smtplib.SMTPRecipientsRefused:
+        # A bad address won't get better with retries.
+        app.logger.warning('Mail to %s refused by the server; dropping it', to)
+
+
+def notify_submission(kind, record):
+    """Queue the emails for a new contact message or donation pledge."""
+    organization = app.config['ORGANIZATION_NAME'] or 'Modaly'
+    if kind == 'donation':
+        queue_mail(record['email'], f'Thank you for your donation to {organization}',
+                   'emails/donation_pledge.txt', donation=record, organization=organization,
+                   pay_url=pledge_payment_url(record))
+    elif kind == 'contact':
+        queue_mail(app.config['ADMIN_EMAIL'],
+                   f'New message: {record.get("subject") or record["name"]}',
+                   'emails/contact_alert.txt', reply_to=record['email'],
+                   contact=record, organization=organization)
+
+
+def notify_payment(donation):
+    """Queue the receipt for a donation Stripe has confirmed as paid."""
+    organization = app.config['ORGANIZATION_NAME'] or 'Modaly'
+    queue_mail(donation.email, f'Your donation receipt from {organization}',
+               'emails/donation_receipt.txt', donation=donation, organization=organization)
+
+
+@app.cli.command('send-test-mail')
+@click.argument('to')
+def send_test_mail_command(to):
+    """Send a message straight through the SMTP settings, bypassing the queue."""
+    if not app.config['MAIL_SERVER']:
+        raise click.ClickException('MAIL_SERVER is not set.')
+    mail_pool.send(build_message(mail_sender(), to, 'Test message',
+                                 'Mail from this site is working.'))
+    mail_pool.close()
+    click.echo(f'Sent to {to} via {app.config["MAIL_SERVER"]}:{app.config["MAIL_PORT"]}.')
+
+
+# =============================================================================
+# WRITE-BEHIND SUBMISSIONS
+# =============================================================================
+
+# With WRITE_BEHIND on, contact messages and donations are acknowledged once
+# they are in the local journal and inserted in batches by a flusher thread,
+# so a burst of submissions doesn't queue on the database's write lock.
+journal = WriteJournal(app, db, JournalSegment)
+
+JOURNALED_MODELS = {'contact': ContactMessage, 'donation': Donation}
+
+
+def save_submission(kind, **fields):
+    """Store a public form submission, directly or through the journal."""
+    if journal.enabled:
+        journal.append(kind, **fields)
+    else:
+        db.session.add(JOURNALED_MODELS[kind](**fields))
+        notify_submission(kind, fields)
+        db.session.commit()
+
+
+def _journal_rows(records):
+    return [dict(record, created_at=datetime.fromisoformat(record['created_at']))
+            for record in records]
+
+
+@journal.handler('contact')
+def insert_contact_messages(records):
+    # Bulk INSERTs bypass the flush hooks, so the counters are bumped here.
+    db.session.execute(db.insert(ContactMessage), _journal_rows(records))
+    bump_site_stats(db.session, total_messages=len(records), unread_messages=len(records))
+    for record in records:
+        notify_submission('contact', record)
+
+
+@journal.handler('donation')
+def insert_donations(records):
+    db.session.execute(db.insert(Donation), _journal_rows(records))
+    bump_site_stats(db.session, total_donations=len(records),
+                    donation_sum=sum(record['amount'] for record in records))
+    for record in records:
+        notify_submission('donation', record)
+
+
+@app.before_request
+def start_journal_flusher():
+    if journal.enabled:
+        journal.start()
+
+
+@app.cli.command('flush-journal')
+def flush_journal_command():
+    """Insert every journaled submission, including those left by stopped workers."""
+    click.echo(f'{journal.flush()} journaled submissions inserted.')
+
+
+# =============================================================================
+# STRIPE WEBHOOKS
+# =============================================================================
+# The webhook only verifies the signature and stores the event, so it
+# answers in milliseconds however busy the database is with payments; the
+# process_stripe_event job turns it into a Donation. The event id is the
+# primary key, so Stripe's redeliveries are dropped on arrival.
+#
+# The donate form records a pledge, acknowledged by email. With
+# STRIPE_PAYMENT_LINK set, the donor is sent there with the pledge's
+# reference as client_reference_id, and the payment settles that pledge
+# rather than counting the donation twice. Every confirmed payment gets a
+# receipt; pledges paid some other way are settled by hand.
+
+def pledge_payment_url(pledge):
+    """The Stripe Payment Link for a pledge (a Donation's fields), or None."""
+    link = app.config['STRIPE_PAYMENT_LINK']
+    if not link or not pledge.get('reference'):
+        return None
+    query = urlencode({'client_reference_id': pledge['reference'],
+                       'prefilled_email': pledge['email']})
+    return f"{link}{'&' if '?' in link else '?'}{query}"
+
+
+def record_stripe_event(event):
+    """Store a verified event and enqueue its processing; False if already seen."""
+    table = StripeEvent.__table__
+    conn = db.session.connection()
+    insert = (sqlite_insert if conn.dialect.name == 'sqlite' else pg_insert)(table)
+    result = conn.execute(insert.values(
+        id=event['id'], type=event['type'], payload=json.dumps(event),
+        received_at=datetime.now(timezone.utc)).on_conflict_do_nothing(index_elements=['id']))
+    if not result.rowcount:
+        return False
+    jobs.enqueue('process_stripe_event', event_id=event['id'])
+    return True
+
+
+@app.route('/webhooks/stripe', methods=['POST'])
+def stripe_webhook():
+    secret = app.config['STRIPE_WEBHOOK_SECRET']
+    if not secret:
+        abort(404)
+    try:
+        event = verify_signature(request.get_data(), request.headers.get('Stripe-Signature'),
+                                 secret, app.config['STRIPE_WEBHOOK_TOLERANCE'])
+    except SignatureError as e:
+        return jsonify(error=str(e)), 400
+    record_stripe_event(event)
+    db.session.commit()
+    return jsonify(received=True)
+
+
+def process_stripe_event(event_id, force=False):
+    """Apply a stored event. Safe to repeat: a payment settles at most one Donation.
+
+    A payment for an unpaid pledge fills in that row, amount included in
+    case the donor changed it; any other payment becomes a new Donation.
+    Returns the donation settled, or None.
+    """
+    event = db.session.get(StripeEvent, event_id)
+    if event is None or (event.processed_at is not None and not force):
+        return None
+    fields = donation_from_event(json.loads(event.payload))
+    donation = None
+    if fields:
+        pledge = fields.pop('pledge')
+        if not Donation.query.filter_by(payment_reference=fields['payment_reference']).first():
+            donation = pledge and Donation.query.filter_by(
+                reference=pledge, payment_reference=None).first()
+            if donation:
+                donation.amount = fields['amount']
+                donation.payment_reference = fields['payment_reference']
+            else:
+                donation = Donation(**fields)
+                db.session.add(donation)
+            donation.paid_at = datetime.now(timezone.utc)
+            notify_payment(donation)
+    event.processed_at = datetime.now(timezone.utc)
+    db.session.commit()
+    return donation
+
+
+@jobs.task('process_stripe_event', max_attempts=5)
+def process_stripe_event_job(event_id):
+    # Two events for one payment processed at once: the loser hits the
+    # unique payment_reference, is retried, and then finds the donation.
+    process_stripe_event(event_id)
+
+
+@app.cli.command('replay-stripe-events')
+@click.argument('event_ids', nargs=-1)
+@click.option('--unprocessed', is_flag=True, help='Every stored event not yet processed.')
+def replay_stripe_events_command(event_ids, unprocessed):
+    """Process stored Stripe events now, e.g. after fixing a failed job."""
+    if unprocessed:
+        event_ids = [id for (id,) in db.session.query(StripeEvent.id)
+                     .filter(StripeEvent.processed_at.is_(None)).order_by(StripeEvent.received_at)]
+    for event_id in event_ids:
+        if db.session.get(StripeEvent, event_id) is None:
+            click.echo(f'{event_id}: not found')
+            continue
+        donation = process_stripe_event(event_id, force=True)
+        click.echo(f'{event_id}: ' + (f'donation {donation.id}' if donation else 'no new donation'))
+
+
+@app.cli.command('send-stripe-fixture')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--url', help='POST to a running server instead of in-process.')
+@click.option('--new-id', is_flag=True, help='Give the event a fresh id instead of a redelivery.')
+@click.option('--pledge', help='Set client_reference_id, to pay the pledge with this reference.')
+def send_stripe_fixture_command(path, url, new_id, pledge):
+    """Sign a fixture event with STRIPE_WEBHOOK_SECRET and deliver it to the webhook."""
+    secret = app.config['STRIPE_WEBHOOK_SECRET']
+    if not secret:
+        raise click.ClickException('STRIPE_WEBHOOK_SECRET is not set.')
+    with open(path) as f:
+        event = json.load(f)
+    if new_id:
+        event['id'] = f'evt_local_{uuid.uuid4().hex[:24]}'
+    if pledge:
+        event['data']['object']['client_reference_id'] = pledge
+    payload = json.dumps(event).encode('utf-8')
+    headers = {'Content-Type': 'application/json',
+               'Stripe-Signature': sign_payload(payload, secret)}
+    if url:
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, payload, headers)) as response:
+                status, body = response.status, response.read().decode('utf-8')
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read().decode('utf-8')
+    else:
+        response = app.test_client().post('/webhooks/stripe', data=payload, headers=headers)
+        status, body = response.status_code, response.get_data(as_text=True)
+    click.echo(f'{event["id"]} ({event["type"]}): {status} {body.strip()}')
+
+
+# =============================================================================
+# SEARCH INDEX
+# =============================================================================
+
+# Columns whose text goes into the index; edits touching only other columns
+# (image variants, display order, ...) don't rewrite the document.
+SEARCH_FIELDS = {
+    'BlogPost': ('title', 'content', 'excerpt', 'category', 'published'),
+    'MediaCampaign': ('title', 'description', 'overview', 'services_provided',
+                      'category', 'published'),
+}
+
+
+SEARCH_KIND = {BlogPost: 'post', MediaCampaign: 'campaign'}
+
+
+def search_document(obj):
+    """(kind, title, body) for a post or campaign as stored in the index."""
+    if isinstance(obj, BlogPost):
+        body = plain_text(obj.excerpt, obj.content, obj.category)
+    else:
+        body = plain_text(obj.description, obj.overview, obj.services_provided, obj.category)
+    return SEARCH_KIND[type(obj)], obj.title, body
+
+
+def get_search_backend():
+    return search_backend(db.engine.dialect.name)
+
+
+@event.listens_for(db.session, 'after_flush')
+def sync_search_index(sess, flush_context):
+    """Mirror published posts and campaigns into the search index in the same transaction."""
+    backend = get_search_backend()
+    if backend is None:
+        return
+    conn = sess.connection()
+    for obj in chain(sess.new, sess.dirty, sess.deleted):
+        fields = SEARCH_FIELDS.get(type(obj).__name__)
+        if fields is None:
+            continue
+        if obj in sess.dirty and not any(_changed(obj, f) for f in fields):
+            continue
+        if obj in sess.deleted or not obj.published:
+            # Only the key is needed; don't load or render the body of a row on its way out.
+            backend.delete(conn, SEARCH_KIND[type(obj)], obj.id)
+        else:
+            kind, title, body = search_document(obj)
+            backend.upsert(conn, kind, obj.id, title, body)
+
+
+def rebuild_search_index():
+    """Rewrite the whole index from the posts and campaigns tables."""
+    backend = get_search_backend()
+    conn = db.session.connection()
+    backend.clear(conn)
+    count = 0
+    for model in (BlogPost, MediaCampaign):
+        for obj in model.query.filter_by(published=True).yield_per(500):
+            kind, title, body = search_document(obj)
+            backend.upsert(conn, kind, obj.id, title, body)
+            count += 1
+    db.session.commit()
+    return count
+
+
+@app.cli.command('reindex-search')
+def reindex_search_command():
+    """Rebuild the full-text search index from published posts and campaigns."""
+    if get_search_backend() is None:
+        raise click.ClickException(f'Full-text search is not supported on {db.engine.dialect.name}.')
+    click.echo(f'Indexed {rebuild_search_index()} documents.')
+
+
 @app.context_processor
 def inject_globals():
     return {'current_year': datetime.now(timezone.utc).year}
@@ -226,23 +1707,27 @@ def inject_globals():
 # =============================================================================
 
 @app.route('/')
+@conditional_page(posts_validator)
+@cached_page('posts')
 def index():
-    recent_posts = BlogPost.query.filter_by(published=True)\
+    recent_posts = BlogPost.query.options(POST_CARD_COLUMNS).filter_by(published=True)\
         .order_by(BlogPost.created_at.desc()).limit(3).all()
     return render_template('index.html', recent_posts=recent_posts)
 
 
 @app.route('/blog')
+@conditional_page(posts_validator)
+@cached_page('posts')
 def blog():
-    page = request.args.get('page', 1, type=int)
     category = request.args.get('category')
 
-    query = BlogPost.query.filter_by(published=True)
+    query = BlogPost.query.options(POST_CARD_COLUMNS).filter_by(published=True)
     if category:
         query = query.filter_by(category=category)
 
-    posts = query.order_by(BlogPost.created_at.desc())\
-        .paginate(page=page, per_page=app.config['POSTS_PER_PAGE'], error_out=False)
+    posts = keyset_paginate(query, [BlogPost.created_at, BlogPost.id],
+                            app.config['POSTS_PER_PAGE'],
+                            after=request.args.get('after'), before=request.args.get('before'))
 
     categories = db.session.query(BlogPost.category).distinct().all()
     categories = [c[0] for c in categories]
@@ -251,25 +1736,93 @@ def blog():
                            current_category=category)
 
 
+CAMPAIGN_CARD_COLUMNS = load_only(
+    MediaCampaign.id, MediaCampaign.title, MediaCampaign.description, MediaCampaign.category,
+    MediaCampaign.completion_date, MediaCampaign.display_order, MediaCampaign.created_at)
+
+
+def campaign_card_media():
+    """{campaign id: (thumbnail, image count, video count)} for published campaigns' cards.
+
+    Picks the same image as MediaCampaign.get_primary_image, but in one
+    query for every campaign instead of loading each one's images.
+    """
+    ranked = db.select(
+        MediaImage.id,
+        db.func.row_number().over(
+            partition_by=MediaImage.campaign_id,
+            order_by=(MediaImage.is_primary.desc(), MediaImage.display_order, MediaImage.id),
+        ).label('rank'),
+        db.func.count().over(partition_by=MediaImage.campaign_id).label('images'),
+    ).join(MediaCampaign).where(MediaCampaign.published == True).subquery()
+    cards = {image.campaign_id: (image, images, 0) for image, images in
+             db.session.query(MediaImage, ranked.c.images)
+             .join(ranked, ranked.c.id == MediaImage.id).filter(ranked.c.rank == 1)}
+    videos = db.session.query(MediaVideo.campaign_id, db.func.count())\
+        .join(MediaCampaign).filter(MediaCampaign.published == True)\
+        .group_by(MediaVideo.campaign_id)
+    for campaign_id, count in videos:
+        image, images, _ = cards.get(campaign_id, (None, 0, 0))
+        cards[campaign_id] = (image, images, count)
+    return cards
+
+
 @app.route('/media')
+@conditional_page(media_validator)
+@cached_page('media')
 def media():
-    campaigns = MediaCampaign.query.filter_by(published=True)\
+    # Only what the cards show; each campaign's gallery, videos and details
+    # are fetched from media_detail when its card is opened.
+    campaigns = MediaCampaign.query.options(CAMPAIGN_CARD_COLUMNS).filter_by(published=True)\
         .order_by(MediaCampaign.display_order.desc(),
                   MediaCampaign.created_at.desc()).all()
-    return render_template('media.html', campaigns=campaigns)
+    return render_template('media.html', campaigns=campaigns, cards=campaign_card_media())
+
+
+@app.route('/media/<int:campaign_id>/detail')
+@conditional_page(campaign_validator)
+@cached_page('media')
+def media_detail(campaign_id):
+    """The body of one campaign's modal on /media, as an HTML fragment."""
+    campaign = MediaCampaign.query\
+        .options(selectinload(MediaCampaign.images), selectinload(MediaCampaign.videos))\
+        .get_or_404(campaign_id)
+    if not campaign.published and 'user_id' not in session:
+        abort(404)
+    return render_template('_media_detail.html', c=campaign)
 
 
 @app.route('/blog/<int:post_id>')
+@conditional_page(posts_validator)
+@cached_page('posts')
 def blog_post(post_id):
     post = BlogPost.query.get_or_404(post_id)
     if not post.published and 'user_id' not in session:
         return redirect(url_for('blog'))
-    recent_posts = BlogPost.query.filter(
+    recent_posts = BlogPost.query.options(POST_CARD_COLUMNS).filter(
         BlogPost.id != post_id, BlogPost.published == True
     ).order_by(BlogPost.created_at.desc()).limit(3).all()
     return render_template('blog_post.html', post=post, recent_posts=recent_posts)
 
 
+@app.route('/search')
+def search():
+    backend = get_search_backend()
+    if backend is None:
+        abort(404)
+    q = request.args.get('q', '').strip()[:200]
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = app.config['SEARCH_PER_PAGE']
+
+    # Results are ordered by relevance, which no index can seek into, so this
+    # pages by offset; one extra row tells whether there is a next page.
+    hits = backend.search(db.session.connection(), q, per_page + 1,
+                          (page - 1) * per_page) if q else []
+    has_next = len(hits) > per_page
+    return render_template('search.html', q=q, hits=hits[:per_page], page=page,
+                           has_next=has_next)
+
+
 @app.route('/contact', methods=['GET', 'POST'])
 def contact():
     if request.method == 'POST':
@@ -278,9 +1831,7 @@ def contact():
         subject = request.form.get('subject', '').strip()
         message = request.form.get('message', '').strip()
         if name and email and message:
-            msg = ContactMessage(name=name, email=email, subject=subject, message=message)
-            db.session.add(msg)
-            db.session.commit()
+            save_submission('contact', name=name, email=email, subject=subject, message=message)
             flash('Thank you for your message! We will get back to you soon.', 'success')
             return redirect(url_for('contact'))
         else:
@@ -317,15 +1868,202 @@ def donate():
             flash('Please select or enter a donation amount.', 'danger')
             return render_template('donate.html')
 
-        donation = Donation(name=name, email=email, amount=final_amount, message=message)
-        db.session.add(donation)
-        db.session.commit()
+        pledge = dict(name=name, email=email, amount=final_amount, message=message,
+                      reference=uuid.uuid4().hex)
+        save_submission('donation', **pledge)
         return render_template('donate_success.html',
                                amount=f'{final_amount:.2f}',
-                               email=email, name=name)
+                               email=email, name=name, pay_url=pledge_payment_url(pledge))
     return render_template('donate.html')
 
 
+# =============================================================================
+# JSON API
+# =============================================================================
+# Read-only view of published posts and campaigns for the mobile app and
+# partner sites. Responses go through the same validators and page cache as
+# the HTML pages, so a repeat request costs one validator query and an
+# unchanged one gets a 304.
+
+API_PREFIX = '/api/v1'
+
+
+def api_url(url):
+    return urljoin(request.host_url, url) if url else None
+
+
+def api_time(value):
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value and value.isoformat()
+
+
+def api_image(url, variants):
+    if not url:
+        return None
+    sizes = variants.get('sizes', []) if variants else []
+    return {'url': api_url(url),
+            'sizes': [{'width': size['width'], 'jpg': api_url(size.get('jpg')),
+                       'webp': api_url(size.get('webp'))} for size in sizes]}
+
+
+# Field name -> (attributes to load, value). Columns go into load_only and
+# relationships are selectin-loaded, so ?fields= also trims the query.
+POST_FIELDS = {
+    'id': ((), lambda p: p.id),
+    'url': ((), lambda p: url_for('blog_post', post_id=p.id, _external=True)),
+    'title': ((BlogPost.title,), lambda p: p.title),
+    'category': ((BlogPost.category,), lambda p: p.category),
+    'excerpt': ((BlogPost.excerpt,), lambda p: p.excerpt),
+    'image': ((BlogPost.image_url, BlogPost.image_variants),
+              lambda p: api_image(p.image_url, p.get_image_variants())),
+    'content_html': ((BlogPost.content_html, BlogPost.content), lambda p: p.body_html()),
+    'word_count': ((BlogPost.word_count,), lambda p: p.word_count),
+    'reading_minutes': ((BlogPost.reading_minutes,), lambda p: p.reading_minutes),
+    'created_at': ((BlogPost.created_at,), lambda p: api_time(p.created_at)),
+    'updated_at': ((BlogPost.updated_at,), lambda p: api_time(p.updated_at)),
+}
+POST_LIST_FIELDS = [name for name in POST_FIELDS if name != 'content_html']
+
+CAMPAIGN_FIELDS = {
+    'id': ((), lambda c: c.id),
+    'url': ((), lambda c: url_for('media', _anchor=f'modal{c.id}', _external=True)),
+    'title': ((MediaCampaign.title,), lambda c: c.title),
+    'category': ((MediaCampaign.category,), lambda c: c.category),
+    'description': ((MediaCampaign.description,), lambda c: c.description),
+    'overview': ((MediaCampaign.overview,), lambda c: c.overview),
+    'completion_date': ((MediaCampaign.completion_date,), lambda c: c.completion_date),
+    'featured': ((MediaCampaign.featured,), lambda c: bool(c.featured)),
+    'metrics': ((MediaCampaign.metric1_value, MediaCampaign.metric1_label,
+                 MediaCampaign.metric2_value, MediaCampaign.metric2_label,
+                 MediaCampaign.metric3_value, MediaCampaign.metric3_label),
+                lambda c: [{'value': value, 'label': label} for value, label in (
+                    (c.metric1_value, c.metric1_label), (c.metric2_value, c.metric2_label),
+                    (c.metric3_value, c.metric3_label)) if value]),
+    'services': ((MediaCampaign.services_provided,), lambda c: c.get_services_list()),
+    'images': ((MediaCampaign.images,),
+               lambda c: [dict(api_image(i.image_url, i.get_variants()), caption=i.caption,
+                               primary=bool(i.is_primary)) for i in c.images]),
+    'videos': ((MediaCampaign.videos,),
+               lambda c: [{'type': v.video_type, 'url': api_url(v.video_url),
+                           'embed_url': v.get_embed_url(), 'title': v.title,
+                           'caption': v.caption} for v in c.videos]),
+    'created_at': ((MediaCampaign.created_at,), lambda c: api_time(c.created_at)),
+    'updated_at': ((MediaCampaign.updated_at,), lambda c: api_time(c.updated_at)),
+}
+
+POST_ORDER = [BlogPost.created_at, BlogPost.id]
+CAMPAIGN_ORDER = [MediaCampaign.display_order, MediaCampaign.created_at, MediaCampaign.id]
+
+
+def api_error(status, message):
+    response = jsonify(error=message)
+    response.status_code = status
+    return response
+
+
+def api_fields(spec, default):
+    """The fields named in ?fields=, or default; 400 for unknown names."""
+    names = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in spec]
+    if unknown:
+        abort(api_error(400, f'Unknown fields: {", ".join(unknown)}.'))
+    return list(dict.fromkeys(names)) or default
+
+
+def api_load_options(spec, fields, always):
+    columns, relationships = list(always), []
+    for name in fields:
+        for attribute in spec[name][0]:
+            if isinstance(attribute.property, RelationshipProperty):
+                relationships.append(attribute)
+            else:
+                columns.append(attribute)
+    return [load_only(*columns), *(selectinload(r) for r in relationships)]
+
+
+def api_serialize(obj, spec, fields):
+    return {name: spec[name][1](obj) for name in fields}
+
+
+def api_list(model, spec, default_fields, order):
+    """One keyset page of published rows, optionally filtered by ?category=."""
+    fields = api_fields(spec, default_fields)
+    per_page = min(max(request.args.get('limit', app.config['API_PER_PAGE'], type=int), 1),
+                   app.config['API_MAX_PER_PAGE'])
+    query = model.query.options(*api_load_options(spec, fields, order))\
+        .filter(model.published == True)
+    if request.args.get('category'):
+        query = query.filter(model.category == request.args['category'])
+    page = keyset_paginate(query, order, per_page,
+                           after=request.args.get('after'), before=request.args.get('before'))
+
+    args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+    return jsonify(
+        data=[api_serialize(row, spec, fields) for row in page],
+        next=url_for(request.endpoint, after=page.next_cursor, _external=True, **args)
+        if page.has_next else None,
+        prev=url_for(request.endpoint, before=page.prev_cursor, _external=True, **args)
+        if page.has_prev else None,
+    )
+
+
+def api_detail(model, spec, id):
+    fields = api_fields(spec, list(spec))
+    obj = model.query.options(*api_load_options(spec, fields, [model.id]))\
+        .filter(model.id == id, model.published == True).first_or_404()
+    return jsonify(api_serialize(obj, spec, fields))
+
+
+@app.after_request
+def allow_api_cross_origin(response):
+    """Partner sites may call the API from the browser; it is public and read-only."""
+    if request.path.startswith(API_PREFIX + '/'):
+        response.access_control_allow_origin = '*'
+    return response
+
+
+@app.route(f'{API_PREFIX}/posts')
+@conditional_page(posts_validator)
+@cached_page('posts')
+def api_posts():
+    return api_list(BlogPost, POST_FIELDS, POST_LIST_FIELDS, POST_ORDER)
+
+
+@app.route(f'{API_PREFIX}/posts/<int:post_id>')
+@conditional_page(post_validator)
+@cached_page('posts')
+def api_post(post_id):
+    return api_detail(BlogPost, POST_FIELDS, post_id)
+
+
+@app.route(f'{API_PREFIX}/campaigns')
+@conditional_page(media_validator)
+@cached_page('media')
+def api_campaigns():
+    return api_list(MediaCampaign, CAMPAIGN_FIELDS, list(CAMPAIGN_FIELDS), CAMPAIGN_ORDER)
+
+
+@app.route(f'{API_PREFIX}/campaigns/<int:campaign_id>')
+@conditional_page(campaign_validator)
+@cached_page('media')
+def api_campaign(campaign_id):
+    return api_detail(MediaCampaign, CAMPAIGN_FIELDS, campaign_id)
+
+
+@app.route(f'{API_PREFIX}/categories')
+@conditional_page(catalog_validator)
+@cached_page('posts', 'media')
+def api_categories():
+    """Categories in use by published posts and campaigns, with counts."""
+    def counts(model):
+        return [{'name': name, 'count': count} for name, count in
+                db.session.query(model.category, db.func.count())
+                .filter(model.published == True)
+                .group_by(model.category).order_by(model.category)]
+    return jsonify(posts=counts(BlogPost), campaigns=counts(MediaCampaign))
+
+
 # =============================================================================
 # AUTH
 # =============================================================================
@@ -365,14 +2103,7 @@ def admin_dashboard():
     recent_posts = BlogPost.query.order_by(BlogPost.created_at.desc()).limit(5).all()
     recent_messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).limit(5).all()
     recent_donations = Donation.query.order_by(Donation.created_at.desc()).limit(5).all()
-    stats = {
-        'total_posts': BlogPost.query.count(),
-        'published_posts': BlogPost.query.filter_by(published=True).count(),
-        'total_messages': ContactMessage.query.count(),
-        'unread_messages': ContactMessage.query.filter_by(read=False).count(),
-        'total_donations': Donation.query.count(),
-        'donation_sum': db.session.query(db.func.sum(Donation.amount)).scalar() or 0
-    }
+    stats = get_site_stats().to_dict()
     return render_template('admin/dashboard.html',
                            recent_posts=recent_posts,
                            recent_messages=recent_messages,
@@ -383,8 +2114,31 @@ def admin_dashboard():
 @app.route('/admin/posts')
 @login_required
 def admin_posts():
-    posts = BlogPost.query.order_by(BlogPost.created_at.desc()).all()
-    return render_template('admin/posts.html', posts=posts)
+    query = BlogPost.query.options(load_only(
+        BlogPost.id, BlogPost.title, BlogPost.excerpt, BlogPost.category,
+        BlogPost.image_url, BlogPost.published, BlogPost.created_at))
+
+    q = request.args.get('q', '').strip()
+    if q:
+        query = query.filter(BlogPost.title.ilike(f'%{q}%'))
+    if request.args.get('category'):
+        query = query.filter(BlogPost.category == request.args['category'])
+    status = request.args.get('status')
+    if status in ('published', 'draft'):
+        query = query.filter(BlogPost.published == (status == 'published'))
+
+    sorts = {
+        'newest': ([BlogPost.created_at, BlogPost.id], True),
+        'oldest': ([BlogPost.created_at, BlogPost.id], False),
+        'title': ([BlogPost.title, BlogPost.id], False),
+    }
+    columns, descending = sorts.get(request.args.get('sort'), sorts['newest'])
+    posts = keyset_paginate(query, columns, app.config['ADMIN_PER_PAGE'],
+                            after=request.args.get('after'), before=request.args.get('before'),
+                            descending=descending)
+    return render_template('admin/posts.html', posts=posts,
+                           categories=app.config['CATEGORIES'],
+                           filters=list_filters('q', 'category', 'status', 'sort'))
 
 
 @app.route('/admin/post/new', methods=['GET', 'POST'])
@@ -404,11 +2158,13 @@ def admin_new_post():
 
         if title and content:
             post = BlogPost(
-                title=title, content=content,
-                excerpt=excerpt or content[:150] + '...',
+                title=title, content=content, excerpt=excerpt,
                 category=category, image_url=image_url, published=published
             )
             db.session.add(post)
+            if uploaded_url:
+                db.session.flush()
+                enqueue_image_processing(post)
             db.session.commit()
             flash('Blog post created successfully!', 'success')
             return redirect(url_for('admin_dashboard'))
@@ -425,14 +2181,17 @@ def admin_edit_post(post_id):
     if request.method == 'POST':
         post.title = request.form.get('title', '').strip()
         post.content = request.form.get('content', '').strip()
-        post.excerpt = request.form.get('excerpt', '').strip() or post.content[:150] + '...'
+        post.excerpt = request.form.get('excerpt', '').strip()
         post.category = request.form.get('category', 'General')
         post.published = request.form.get('published') == 'on'
         uploaded_url = handle_image_upload(request.files)
         if uploaded_url:
             post.image_url = uploaded_url
-        elif request.form.get('image_url', '').strip():
+            post.image_variants = None
+            enqueue_image_processing(post)
+        elif request.form.get('image_url', '').strip() not in ('', post.image_url):
             post.image_url = request.form.get('image_url', '').strip()
+            post.image_variants = None
         db.session.commit()
         flash('Blog post updated successfully!', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -453,8 +2212,42 @@ def admin_delete_post(post_id):
 @app.route('/admin/messages')
 @login_required
 def admin_messages():
-    messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).all()
-    return render_template('admin/messages.html', messages=messages)
+    query = ContactMessage.query.options(
+        defer(ContactMessage.message),
+        with_expression(ContactMessage.preview, preview_of(ContactMessage.message)))
+
+    if request.args.get('unread'):
+        query = query.filter(ContactMessage.read == False)
+    q = request.args.get('q', '').strip()
+    if q:
+        like = f'%{q}%'
+        query = query.filter(db.or_(ContactMessage.name.ilike(like),
+                                    ContactMessage.email.ilike(like),
+                                    ContactMessage.subject.ilike(like)))
+    start, end = date_arg('from'), date_arg('to', end_of_day=True)
+    if start:
+        query = query.filter(ContactMessage.created_at >= start)
+    if end:
+        query = query.filter(ContactMessage.created_at < end)
+
+    descending = request.args.get('sort') != 'oldest'
+    messages = keyset_paginate(query, [ContactMessage.created_at, ContactMessage.id],
+                               app.config['ADMIN_PER_PAGE'],
+                               after=request.args.get('after'), before=request.args.get('before'),
+                               descending=descending)
+    total = get_site_stats().total_messages
+    return render_template('admin/messages.html', messages=messages, total=total,
+                           filters=list_filters('unread', 'q', 'from', 'to', 'sort'))
+
+
+@app.route('/admin/message/<int:message_id>')
+@login_required
+def admin_message_detail(message_id):
+    """Full message body, fetched when a message is opened in the list view."""
+    message = ContactMessage.query.get_or_404(message_id)
+    return jsonify(id=message.id, name=message.name, email=message.email,
+                   subject=message.subject, message=message.message, read=message.read,
+                   created_at=message.created_at.strftime('%B %d, %Y at %H:%M'))
 
 
 @app.route('/admin/message/<int:message_id>/read', methods=['POST'])
@@ -479,9 +2272,98 @@ def admin_delete_message(message_id):
 @app.route('/admin/donations')
 @login_required
 def admin_donations():
-    donations = Donation.query.order_by(Donation.created_at.desc()).all()
-    total = db.session.query(db.func.sum(Donation.amount)).scalar() or 0
-    return render_template('admin/donations.html', donations=donations, total=total)
+    query = Donation.query.options(
+        defer(Donation.message),
+        with_expression(Donation.preview, preview_of(Donation.message, 41)))
+
+    q = request.args.get('q', '').strip()
+    if q:
+        like = f'%{q}%'
+        query = query.filter(db.or_(Donation.name.ilike(like), Donation.email.ilike(like)))
+    start, end = date_arg('from'), date_arg('to', end_of_day=True)
+    if start:
+        query = query.filter(Donation.created_at >= start)
+    if end:
+        query = query.filter(Donation.created_at < end)
+    min_amount = request.args.get('min', type=float)
+    max_amount = request.args.get('max', type=float)
+    if min_amount is not None:
+        query = query.filter(Donation.amount >= min_amount)
+    if max_amount is not None:
+        query = query.filter(Donation.amount <= max_amount)
+
+    sorts = {
+        'newest': ([Donation.created_at, Donation.id], True),
+        'oldest': ([Donation.created_at, Donation.id], False),
+        'largest': ([Donation.amount, Donation.id], True),
+        'smallest': ([Donation.amount, Donation.id], False),
+    }
+    columns, descending = sorts.get(request.args.get('sort'), sorts['newest'])
+    donations = keyset_paginate(query, columns, app.config['ADMIN_PER_PAGE'],
+                                after=request.args.get('after'), before=request.args.get('before'),
+                                descending=descending)
+    total = get_site_stats().donation_sum
+    return render_template('admin/donations.html', donations=donations, total=total,
+                           filters=list_filters('q', 'from', 'to', 'min', 'max', 'sort'))
+
+
+# ── EXPORTS ───────────────────────────────────────────────────────────────────
+
+EXPORT_COLUMNS = {
+    'donations': (Donation, ['id', 'name', 'email', 'amount', 'message', 'created_at']),
+    'messages': (ContactMessage, ['id', 'name', 'email', 'subject', 'message', 'read', 'created_at']),
+}
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_rows(model, names, start, end):
+    """Yield export rows as plain tuples, fetched in server-side cursor batches."""
+    columns = [getattr(model, name) for name in names]
+    stmt = db.select(*columns).order_by(model.id)
+    if start:
+        stmt = stmt.where(model.created_at >= start)
+    if end:
+        stmt = stmt.where(model.created_at < end)
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for batch in result.partitions():
+        yield batch
+
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+@app.route('/admin/export/<kind>.<fmt>')
+@login_required
+def admin_export(kind, fmt):
+    """Stream donations or messages as CSV or NDJSON in constant memory."""
+    if kind not in EXPORT_COLUMNS or fmt not in ('csv', 'ndjson'):
+        abort(404)
+    model, names = EXPORT_COLUMNS[kind]
+    start, end = date_arg('from'), date_arg('to', end_of_day=True)
+
+    def generate_csv():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(names)
+        for batch in export_rows(model, names, start, end):
+            writer.writerows([export_value(v) for v in row] for row in batch)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        yield buf.getvalue()
+
+    def generate_ndjson():
+        for batch in export_rows(model, names, start, end):
+            yield ''.join(json.dumps(dict(zip(names, map(export_value, row)))) + '\n'
+                          for row in batch)
+
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%d')
+    generate, mimetype = ((generate_csv, 'text/csv') if fmt == 'csv'
+                          else (generate_ndjson, 'application/x-ndjson'))
+    return app.response_class(
+        stream_with_context(generate()), mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={kind}-{stamp}.{fmt}'})
 
 
 # =============================================================================
@@ -492,6 +2374,7 @@ def admin_donations():
 @login_required
 def admin_media():
     campaigns = MediaCampaign.query\
+        .options(selectinload(MediaCampaign.images), selectinload(MediaCampaign.videos))\
         .order_by(MediaCampaign.display_order.desc(),
                   MediaCampaign.created_at.desc()).all()
     return render_template('admin/media.html', campaigns=campaigns)
@@ -533,15 +2416,17 @@ def admin_new_campaign():
         db.session.add(campaign)
         db.session.flush()  # get campaign.id before committing
 
-        # Images
+        # Images (derivatives are built by a background job)
+        new_images = []
         for idx, f in enumerate(request.files.getlist('images')):
             if f and f.filename and allowed_image(f.filename):
-                db.session.add(MediaImage(
+                new_images.append(MediaImage(
                     campaign_id=campaign.id,
                     image_url=save_upload(f),
                     display_order=idx,
                     is_primary=(idx == 0),
                 ))
+        db.session.add_all(new_images)
 
         # Uploaded video files
         video_titles = request.form.getlist('video_title')
@@ -571,6 +2456,9 @@ def admin_new_campaign():
                     display_order=vid_offset + idx,
                 ))
 
+        db.session.flush()
+        for image in new_images:
+            enqueue_image_processing(image)
         db.session.commit()
         flash('Media campaign created successfully!', 'success')
         return redirect(url_for('admin_media'))
@@ -584,7 +2472,9 @@ def admin_new_campaign():
 @app.route('/admin/media/<int:campaign_id>/edit', methods=['GET', 'POST'])
 @login_required
 def admin_edit_campaign(campaign_id):
-    campaign = MediaCampaign.query.get_or_404(campaign_id)
+    campaign = MediaCampaign.query\
+        .options(selectinload(MediaCampaign.images), selectinload(MediaCampaign.videos))\
+        .get_or_404(campaign_id)
     categories = ['Education', 'Healthcare', 'Community', 'Environment']
 
     if request.method == 'POST':
@@ -605,16 +2495,18 @@ def admin_edit_campaign(campaign_id):
         campaign.featured = request.form.get('featured') == 'on'
         campaign.display_order = int(request.form.get('display_order', 0) or 0)
 
-        # New images
+        # New images (derivatives are built by a background job)
         max_img = max((img.display_order for img in campaign.images), default=-1)
+        new_images = []
         for idx, f in enumerate(request.files.getlist('images')):
             if f and f.filename and allowed_image(f.filename):
-                db.session.add(MediaImage(
+                new_images.append(MediaImage(
                     campaign_id=campaign.id,
                     image_url=save_upload(f),
                     display_order=max_img + idx + 1,
                     is_primary=False,
                 ))
+        db.session.add_all(new_images)
 
         # New uploaded video files
         video_titles = request.form.getlist('video_title')
@@ -647,12 +2539,15 @@ def admin_edit_campaign(campaign_id):
 
         try:
             campaign.updated_at = datetime.now(timezone.utc)
+            db.session.flush()
+            for image in new_images:
+                enqueue_image_processing(image)
             db.session.commit()
             flash('Campaign updated successfully!', 'success')
             return redirect(url_for('admin_media'))
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Update error: {e}")
+            app.logger.exception('Campaign %s update failed', campaign.id)
             flash(f'Update failed: {str(e)}', 'danger')
             return redirect(url_for('admin_edit_campaign', campaign_id=campaign.id))
 
@@ -666,12 +2561,7 @@ def admin_edit_campaign(campaign_id):
 @login_required
 def admin_delete_campaign(campaign_id):
     campaign = MediaCampaign.query.get_or_404(campaign_id)
-    for img in campaign.images:
-        delete_upload(img.image_url)
-    for vid in campaign.videos:
-        if vid.is_upload():
-            delete_upload(vid.video_url)
-    db.session.delete(campaign)
+    db.session.delete(campaign)  # files are released by count_upload_references
     db.session.commit()
     flash('Campaign deleted successfully.', 'info')
     return redirect(url_for('admin_media'))
@@ -684,7 +2574,6 @@ def admin_delete_campaign(campaign_id):
 def admin_delete_campaign_image(image_id):
     image = MediaImage.query.get_or_404(image_id)
     campaign_id = image.campaign_id
-    delete_upload(image.image_url)
     db.session.delete(image)
     db.session.commit()
     flash('Image deleted successfully.', 'info')
@@ -710,25 +2599,226 @@ def admin_set_primary_image(image_id):
 def admin_delete_campaign_video(video_id):
     video = MediaVideo.query.get_or_404(video_id)
     campaign_id = video.campaign_id
-    if video.is_upload():
-        delete_upload(video.video_url)
     db.session.delete(video)
     db.session.commit()
     flash('Video deleted successfully.', 'info')
     return redirect(url_for('admin_edit_campaign', campaign_id=campaign_id))
 
 
+# ── RESUMABLE VIDEO UPLOADS ───────────────────────────────────────────────────
+# Protocol: POST .../uploads starts an upload, PUT .../uploads/<id> appends one
+# raw chunk at the offset given in the Upload-Offset header, GET reports the
+# current offset so a client can resume, and POST .../complete verifies the
+# file and attaches it to the campaign as a MediaVideo. GET or PUT answer 410
+# once the partial file is gone, and the client starts a new upload.
+
+UPLOAD_BLOCK_SIZE = 64 * 1024
+
+
+def partial_upload_gone(upload):
+    """410 for an upload whose partial file is gone (cleanup, another host).
+
+    The row is dropped too; the client starts a new upload from byte 0.
+    """
+    db.session.delete(upload)
+    db.session.commit()
+    return jsonify(error='Upload data is gone; start the upload again.', offset=0), 410
+
+
+def lock_partial_upload(fh):
+    """Take the upload's write lock without waiting; False if a request holds it.
+
+    Released when fh is closed.
+    """
+    try:
+        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+@app.route('/admin/media/<int:campaign_id>/uploads', methods=['POST'])
+@login_required
+def admin_start_chunked_upload(campaign_id):
+    campaign = MediaCampaign.query.get_or_404(campaign_id)
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get('filename', ''))
+    try:
+        total_size = int(data.get('size', 0))
+    except (ValueError, TypeError):
+        total_size = 0
+    sha256 = str(data.get('sha256') or '').lower() or None
+
+    if not allowed_video(filename):
+        return jsonify(error='Unsupported video type.'), 400
+    if total_size <= 0:
+        return jsonify(error='File size is required.'), 400
+    if sha256 and len(sha256) != 64:
+        return jsonify(error='sha256 must be a hex SHA-256 digest.'), 400
+
+    upload = ChunkedUpload(campaign_id=campaign.id, filename=filename,
+                           title=str(data.get('title', ''))[:200],
+                           total_size=total_size, sha256=sha256)
+    db.session.add(upload)
+    db.session.commit()
+    open(upload.partial_path(), 'wb').close()
+    return jsonify(id=upload.id, offset=0, chunk_size=app.config['UPLOAD_CHUNK_SIZE'],
+                   url=url_for('admin_chunked_upload', upload_id=upload.id)), 201
+
+
+@app.route('/admin/uploads/<upload_id>', methods=['GET', 'PUT'])
+@login_required
+def admin_chunked_upload(upload_id):
+    upload = ChunkedUpload.query.get_or_404(upload_id)
+    if not os.path.exists(upload.partial_path()):
+        return partial_upload_gone(upload)
+    offset = upload.received()
+    if request.method == 'GET':
+        return jsonify(id=upload.id, offset=offset, size=upload.total_size)
+
+    try:
+        client_offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify(error='Upload-Offset header is required.', offset=offset), 400
+
+    # Stream the body straight to disk; request.stream is never parsed or
+    # buffered for non-form content types, so memory stays constant.
+    expected = request.headers.get('Upload-Checksum', '').lower() or None
+    digest = hashlib.sha256()
+    try:
+        fh = open(upload.partial_path(), 'r+b')
+    except FileNotFoundError:
+        return partial_upload_gone(upload)
+    with fh:
+        # One writer per upload at a time, so two PUTs for the same offset
+        # can't interleave their bytes; the offset is read under the lock.
+        if not lock_partial_upload(fh):
+            return jsonify(error='Another chunk is being written.', offset=offset), 409
+        offset = os.fstat(fh.fileno()).st_size
+        if client_offset != offset:
+            return jsonify(error='Offset mismatch.', offset=offset), 409
+        remaining = upload.total_size - offset
+        fh.seek(offset)
+        try:
+            while True:
+                block = request.stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                if len(block) > remaining:
+                    fh.truncate(offset)
+                    return jsonify(error='Chunk exceeds declared file size.', offset=offset), 400
+                fh.write(block)
+                digest.update(block)
+                remaining -= len(block)
+        except BaseException:
+            # Client gone mid-chunk: drop the partial bytes so a retry resumes at offset.
+            fh.truncate(offset)
+            raise
+        if expected and digest.hexdigest() != expected:
+            fh.truncate(offset)
+            return jsonify(error='Chunk checksum mismatch.', offset=offset), 422
+        fh.flush()
+        os.fsync(fh.fileno())
+        new_offset = fh.tell()
+    return jsonify(id=upload.id, offset=new_offset, size=upload.total_size)
+
+
+@app.route('/admin/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def admin_complete_chunked_upload(upload_id):
+    upload = ChunkedUpload.query.get_or_404(upload_id)
+    path = upload.partial_path()
+    if upload.received() != upload.total_size:
+        return jsonify(error='Upload is incomplete.', offset=upload.received()), 409
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        # Held until the file has been moved, so no PUT can still be truncating it.
+        if not lock_partial_upload(fh):
+            return jsonify(error='A chunk is still being written.', offset=upload.received()), 409
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+        if upload.sha256 and digest.hexdigest() != upload.sha256:
+            os.remove(path)
+            db.session.delete(upload)
+            db.session.commit()
+            return jsonify(error='Checksum mismatch; upload discarded.'), 422
+
+        video_url = store_upload(path, digest.hexdigest(), upload.filename)
+    max_vid = db.session.query(db.func.max(MediaVideo.display_order))\
+        .filter_by(campaign_id=upload.campaign_id).scalar()
+    video = MediaVideo(campaign_id=upload.campaign_id,
+                       video_url=video_url,
+                       video_type='upload',
+                       title=upload.title or '',
+                       display_order=(max_vid if max_vid is not None else -1) + 1)
+    db.session.add(video)
+    db.session.delete(upload)
+    db.session.commit()
+    return jsonify(video_id=video.id, video_url=video.video_url, sha256=digest.hexdigest())
+
+
+@app.route('/admin/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def admin_cancel_chunked_upload(upload_id):
+    upload = ChunkedUpload.query.get_or_404(upload_id)
+    try:
+        os.remove(upload.partial_path())
+    except OSError:
+        pass
+    db.session.delete(upload)
+    db.session.commit()
+    return '', 204
+
+
+# =============================================================================
+# ADMIN — BACKGROUND JOBS
+# =============================================================================
+
+@app.route('/admin/jobs')
+@login_required
+def admin_jobs():
+    query = Job.query
+    status = request.args.get('status')
+    if status:
+        query = query.filter_by(status=status)
+    recent = query.order_by(Job.id.desc()).limit(100).all()
+    counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+    return jsonify(counts=counts, jobs=[job.to_dict() for job in recent])
+
+
+@app.route('/admin/jobs/<int:job_id>')
+@login_required
+def admin_job_status(job_id):
+    return jsonify(Job.query.get_or_404(job_id).to_dict())
+
+
+@app.route('/admin/jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+def admin_retry_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    if job.status != 'failed':
+        return jsonify(error='Only failed jobs can be retried.'), 409
+    jobs.retry(job)
+    db.session.commit()
+    return jsonify(job.to_dict())
+
+
 # =============================================================================
 # ERROR HANDLERS
 # =============================================================================
 
 @app.errorhandler(404)
 def page_not_found(e):
+    if request.path.startswith(API_PREFIX + '/'):
+        return jsonify(error='Not found.'), 404
     return render_template('errors/404.html'), 404
 
 
 @app.errorhandler(413)
 def request_too_large(e):
+    if request.mimetype == 'application/octet-stream':  # resumable upload chunk
+        return jsonify(error='Chunk too large.'), 413
     flash('File too large. Maximum size is 100MB.', 'danger')
     return redirect(request.referrer or url_for('admin_media'))
 
@@ -743,51 +2833,96 @@ def internal_error(e):
 # DATABASE INIT
 # =============================================================================
 
-def init_db_on_startup():
-    """Auto-initialize database on startup (Render free tier compatible)."""
-    with app.app_context():
-        try:
-            print("=" * 60)
-            print("INITIALIZING DATABASE...")
-            print("=" * 60)
-
-            db.create_all()
-            print(f"✓ Tables: {list(db.metadata.tables.keys())}")
-
-            admin_email    = os.environ.get('ADMIN_EMAIL')
-            admin_password = os.environ.get('ADMIN_PASSWORD')
-
-            if admin_email and admin_password:
-                existing_admin = User.query.filter_by(email=admin_email).first()
-                if not existing_admin:
-                    admin = User(email=admin_email)
-                    admin.set_password(admin_password)
-                    db.session.add(admin)
-                    db.session.commit()
-                    print(f"✓ Admin created: {admin_email}")
-                else:
-                    # Always sync password with what's in the environment
-                    existing_admin.set_password(admin_password)
-                    db.session.commit()
-                    print(f"✓ Admin password synced: {admin_email}")
-            else:
-                print("⚠ ADMIN_EMAIL / ADMIN_PASSWORD not set")
-
-            print("=" * 60)
-            print("DATABASE READY")
-            print("=" * 60)
-
-        except Exception as e:
-            print(f"❌ DB INIT ERROR: {e}")
-            import traceback
-            traceback.print_exc()
-            db.session.rollback()
-
-
-
-
-init_db_on_startup()
+# First migration; databases built by db.create_all() before migrations
+# existed are stamped at this revision and upgraded from there.
+BASELINE_REVISION = '1574b68d2ac2'
+
+
+def upgrade_database():
+    """Apply pending Flask-Migrate migrations, adopting pre-migration databases."""
+    tables = set(db.inspect(db.engine).get_table_names())
+    if tables and 'alembic_version' not in tables:
+        stamp(revision=BASELINE_REVISION)
+    upgrade()
+
+
+def sync_admin():
+    """Create or update the admin from ADMIN_EMAIL / ADMIN_PASSWORD.
+
+    The password is only re-hashed when it no longer matches, so repeated
+    bootstraps don't rewrite the row. Returns 'created', 'updated',
+    'unchanged', or None when the variables aren't set.
+    """
+    email, password = app.config['ADMIN_EMAIL'], app.config['ADMIN_PASSWORD']
+    if not (email and password):
+        return None
+    admin = User.query.filter_by(email=email).first()
+    if admin is None:
+        admin = User(email=email)
+        admin.set_password(password)
+        db.session.add(admin)
+        status = 'created'
+    elif admin.check_password(password):
+        return 'unchanged'
+    else:
+        admin.set_password(password)
+        status = 'updated'
+    db.session.commit()
+    return status
+
+
+def bootstrap():
+    """Bring the database to the latest migration and sync the admin account."""
+    started = time.perf_counter()
+    upgrade_database()
+    app.logger.info('Database migrated (%.0f ms)', (time.perf_counter() - started) * 1000)
+
+    flushed = journal.flush()
+    if flushed:
+        app.logger.info('Inserted %d journaled submissions', flushed)
+
+    started = time.perf_counter()
+    status = sync_admin()
+    if status is None:
+        app.logger.warning('ADMIN_EMAIL / ADMIN_PASSWORD not set')
+    else:
+        app.logger.info('Admin %s: %s (%.0f ms)', status, app.config['ADMIN_EMAIL'],
+                        (time.perf_counter() - started) * 1000)
+
+
+@app.cli.command('bootstrap')
+def bootstrap_command():
+    """Migrate the database and sync the admin account (once per deploy, before workers start)."""
+    bootstrap()
+
+
+def create_app():
+    """WSGI entry point for gunicorn: `gunicorn 'app:create_app()'`.
+
+    Importing this module only defines things; the per-process setup
+    (upload directories, the asset manifest) happens here, once. Neither
+    does any database work, so workers start (and recycle) without
+    migrating, querying or hashing anything; run `flask bootstrap` before
+    them. Logs how long the worker took to boot.
+    """
+    if 'ready' not in boot_timings:
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['CHUNK_UPLOAD_FOLDER'], exist_ok=True)
+        started = time.perf_counter()
+        load_assets()
+        boot_timings['assets'] = time.perf_counter() - started
+
+        boot_timings['ready'] = time.perf_counter() - BOOT_STARTED
+        metrics.observe('app_boot_seconds', (), boot_timings['ready'])
+        phases = ', '.join(f'{name} {seconds * 1000:.0f} ms'
+                           for name, seconds in boot_timings.items() if name != 'ready')
+        app.logger.info('Worker %d ready in %.0f ms (%s)', os.getpid(),
+                        boot_timings['ready'] * 1000, phases)
+    return app
 
 
 if __name__ == '__main__':
+    create_app()
+    with app.app_context():
+        bootstrap()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,232 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import posixpath
+import re
+import tempfile
+
+from PIL import Image, UnidentifiedImageError
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz variants are written
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+# Directories under static/ that hold user content or build output, not assets.
+SKIP_DIRS = {DIST_DIR, 'uploads'}
+# Text assets get precompressed siblings; images are already compressed.
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+# Opaque PNGs at least this big are photos saved in the wrong format and are
+# re-encoded as WebP; smaller ones (logos, icons) are only optimised losslessly.
+PNG_TO_WEBP_BYTES = 64 * 1024
+WEBP_QUALITY = 80
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+# -----------------------------------------------------------------------------
+# Minifiers
+# -----------------------------------------------------------------------------
+
+def minify_css(source):
+    """Strip comments and insignificant whitespace, leaving strings intact."""
+    parts = _CSS_STRING.split(_CSS_COMMENT.sub('', source))
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2:  # a quoted string
+            out.append(part)
+            continue
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        part = re.sub(r':\s+', ':', part)  # only after ':' — "a :hover" is not "a:hover"
+        out.append(part.replace(';}', '}'))
+    return ''.join(out).strip()
+
+
+def minify_js(source):
+    """Conservative line-based JS minifier.
+
+    Drops indentation, blank lines and lines that are only comments, but
+    never rewrites code inside a line, so string, regex and ASI semantics
+    are untouched. Lines inside a multi-line template literal are kept as is.
+    """
+    out = []
+    in_template = False
+    in_comment = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_template:
+            out.append(line)
+        elif in_comment:
+            if '*/' in stripped:
+                in_comment = False
+                rest = stripped.split('*/', 1)[1].strip()
+                if rest:
+                    out.append(rest)
+            continue
+        elif stripped.startswith('/*'):
+            if '*/' not in stripped[2:]:
+                in_comment = True
+            elif stripped.endswith('*/'):
+                continue
+            else:
+                out.append(stripped)
+            continue
+        elif stripped and not stripped.startswith('//'):
+            out.append(stripped)
+        if line.count('`') % 2:
+            in_template = not in_template
+    return '\n'.join(out) + '\n'
+
+
+# -----------------------------------------------------------------------------
+# Build
+# -----------------------------------------------------------------------------
+
+def _fingerprint(logical, data, ext=None):
+    stem, old_ext = posixpath.splitext(logical)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f'{stem}.{digest}{ext or old_ext}'
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.chmod(tmp, 0o644)  # mkstemp creates 0600; a front-end server must read these
+    os.replace(tmp, path)
+
+
+def _encode_binary(path):
+    """(bytes, extension) to publish for a non-text asset; PNGs are re-encoded."""
+    with open(path, 'rb') as f:
+        original = f.read()
+    ext = os.path.splitext(path)[1].lower()
+    if ext != '.png':
+        return original, ext
+    try:
+        with Image.open(io.BytesIO(original)) as im:
+            im.load()
+            opaque = 'A' not in im.getbands() or im.getchannel('A').getextrema()[0] == 255
+            buf = io.BytesIO()
+            if opaque and len(original) >= PNG_TO_WEBP_BYTES:
+                im.convert('RGB').save(buf, 'WEBP', quality=WEBP_QUALITY, method=6)
+                return buf.getvalue(), '.webp'
+            im.save(buf, 'PNG', optimize=True)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return original, ext
+    data = buf.getvalue()
+    return (data, ext) if len(data) < len(original) else (original, ext)
+
+
+def _rewrite_css_urls(css, logical, manifest):
+    """Point relative url()s in a stylesheet at the fingerprinted files."""
+    base = posixpath.dirname(logical)
+
+    def replace(match):
+        target = match.group(2).strip()
+        if re.match(r'^(data:|[a-z]+:|/|#)', target, re.IGNORECASE):
+            return match.group(0)
+        path = target.split('?', 1)[0].split('#', 1)[0]
+        resolved = posixpath.normpath(posixpath.join(base, path))
+        hashed = manifest.get(resolved)
+        if hashed is None:
+            return match.group(0)
+        return f"url('{posixpath.relpath(hashed, base)}')"
+
+    return _CSS_URL.sub(replace, css)
+
+
+def _compressed_variants(data):
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+def build_assets(static_folder):
+    """Minify, fingerprint and precompress everything under static_folder.
+
+    Output goes to static/dist/ with a manifest.json mapping each logical
+    path (e.g. 'css/style.css') to its hashed name. Stylesheets are built
+    last so their url()s can point at hashed images. Files from the previous
+    build are kept so pages cached with old URLs keep working; anything
+    older is removed. Returns the new manifest.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    previous = load_manifest(static_folder)
+
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder)
+        if rel_root == '.':
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in sorted(files):
+            if not name.startswith('.'):
+                sources.append(posixpath.normpath(
+                    posixpath.join(rel_root.replace(os.sep, '/'), name)))
+    sources.sort(key=lambda p: (p.endswith('.css'), p))
+
+    manifest = {}
+    for logical in sources:
+        path = os.path.join(static_folder, *logical.split('/'))
+        ext = os.path.splitext(logical)[1].lower()
+        if ext == '.css':
+            with open(path, encoding='utf-8') as f:
+                css = _rewrite_css_urls(f.read(), logical, manifest)
+            data, out_ext = minify_css(css).encode('utf-8'), ext
+        elif ext == '.js':
+            with open(path, encoding='utf-8') as f:
+                data, out_ext = minify_js(f.read()).encode('utf-8'), ext
+        else:
+            data, out_ext = _encode_binary(path)
+
+        hashed = _fingerprint(logical, data, out_ext)
+        target = os.path.join(dist, *hashed.split('/'))
+        if not os.path.exists(target):
+            _write(target, data)
+            if out_ext in COMPRESSIBLE:
+                for suffix, blob in _compressed_variants(data).items():
+                    _write(target + suffix, blob)
+        manifest[logical] = hashed
+
+    _write(os.path.join(dist, MANIFEST),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    _prune(dist, set(manifest.values()) | set(previous.values()))
+    return manifest
+
+
+def _prune(dist, keep):
+    for root, dirs, files in os.walk(dist):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), dist).replace(os.sep, '/')
+            base = re.sub(r'\.(gz|br)$', '', rel)
+            if rel != MANIFEST and base not in keep:
+                os.remove(os.path.join(root, name))
+
+
+# -----------------------------------------------------------------------------
+# Runtime
+# -----------------------------------------------------------------------------
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def pick_encoding(path, accept_encodings):
+    """(path to send, Content-Encoding or None) for the best variant on disk."""
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accept_encodings.quality(encoding) > 0 and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
@@ -0,0 +1,204 @@
+import os
+import pickle
+import random
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from hashlib import sha1
+
+
+class NullCache:
+    """Cache that stores nothing — used when PAGE_CACHE_TYPE is 'null'."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache:
+    """In-process cache with per-entry TTL and least-recently-used eviction.
+
+    Only visible to the worker that owns it, so with several gunicorn workers
+    an invalidation in one worker reaches the others only once the TTL runs out.
+    """
+
+    def __init__(self, max_entries=500, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else 0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class FileSystemCache:
+    """Cache stored as one file per entry in a directory shared by all workers.
+
+    Writes go through a temp file and os.replace(), so readers in other
+    processes never see a half-written entry. Once the directory holds more
+    than max_entries files, expired entries are pruned first, then the
+    least recently written ones.
+    """
+
+    def __init__(self, directory, max_entries=2000, default_ttl=300):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+
+    def _path(self, key):
+        return os.path.join(self.directory, sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as fh:
+                expires, value = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        if expires and expires < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else 0
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        except FileNotFoundError:
+            # The directory is only created once something is stored in it.
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump((expires, value), fh, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        # Pruning lists the whole directory, so only do it now and then.
+        if random.random() < 0.05:
+            self._prune()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _prune(self):
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.tmp'):
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        excess = len(entries) - self.max_entries
+        for mtime, path in entries:
+            if excess <= 0 and mtime + self.default_ttl >= now:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            excess -= 1
+
+
+class PageCache:
+    """Rendered-page cache keyed by namespace versions.
+
+    Every cached page depends on one or more namespaces ('posts', 'media').
+    Their current version tokens are part of the cache key, so invalidating
+    a namespace just swaps its token and every page built on the old one
+    stops matching; the stale entries then age out through TTL/eviction.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @classmethod
+    def from_config(cls, config):
+        kind = config['PAGE_CACHE_TYPE']
+        ttl = config['PAGE_CACHE_TTL']
+        max_entries = config['PAGE_CACHE_MAX_ENTRIES']
+        if kind == 'simple':
+            return cls(LRUCache(max_entries=max_entries, default_ttl=ttl))
+        if kind == 'filesystem':
+            return cls(FileSystemCache(config['PAGE_CACHE_DIR'],
+                                       max_entries=max_entries, default_ttl=ttl))
+        if kind == 'null':
+            return cls(NullCache())
+        raise ValueError(f"Unknown PAGE_CACHE_TYPE: {kind!r}")
+
+    def version(self, namespace):
+        key = f'ns:{namespace}'
+        token = self.backend.get(key)
+        if token is None:
+            token = uuid.uuid4().hex
+            self.backend.set(key, token, ttl=0)
+        return token
+
+    def invalidate(self, namespace):
+        self.backend.set(f'ns:{namespace}', uuid.uuid4().hex, ttl=0)
+
+    def make_key(self, namespaces, *parts):
+        versions = ','.join(f'{ns}={self.version(ns)}' for ns in namespaces)
+        return '|'.join(['page', versions] + [str(p) for p in parts])
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
@@ -19,6 +19,8 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///' + os.path.join(basedir, 'modaly.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', 'False').lower() == 'true'
+    # Max SQL statements a public page may run (0 = off). Raises under TESTING, logs otherwise.
+    SQL_QUERY_BUDGET = int(os.environ.get('SQL_QUERY_BUDGET', 0))
 
     if DATABASE_URL and 'postgresql' in DATABASE_URL:
         SQLALCHEMY_ENGINE_OPTIONS = {
@@ -28,12 +30,86 @@ class Config:
             'max_overflow': 20
         }
 
+    # Optional read replica for public GET requests. Locally, a copy of the
+    # SQLite file or a second Postgres instance works.
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    if DATABASE_REPLICA_URL and DATABASE_REPLICA_URL.startswith('postgres://'):
+        DATABASE_REPLICA_URL = DATABASE_REPLICA_URL.replace('postgres://', 'postgresql://', 1)
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    # Seconds an admin reads from the primary after saving, to cover replication lag.
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 30))
+
     # --- Uploads ---
     UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 100 * 1024 * 1024))
+    # Resumable video uploads: partial files and the chunk size clients are told to use
+    CHUNK_UPLOAD_FOLDER = os.environ.get('CHUNK_UPLOAD_FOLDER', os.path.join(basedir, 'instance', 'partial_uploads'))
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    # Unreferenced uploads written more recently than this are not deleted yet
+    # (an identical upload may be about to reference them again).
+    UPLOAD_DELETE_GRACE = int(os.environ.get('UPLOAD_DELETE_GRACE', 300))
+    # `flask gc-uploads` / the gc_uploads job: orphaned files are moved here and
+    # deleted after UPLOAD_QUARANTINE_DAYS. UPLOAD_GC_INTERVAL is how often the
+    # job runs (seconds, 0 = only on demand).
+    UPLOAD_QUARANTINE_FOLDER = os.environ.get('UPLOAD_QUARANTINE_FOLDER', os.path.join(basedir, 'instance', 'upload_quarantine'))
+    UPLOAD_QUARANTINE_DAYS = int(os.environ.get('UPLOAD_QUARANTINE_DAYS', 7))
+    UPLOAD_GC_INTERVAL = int(os.environ.get('UPLOAD_GC_INTERVAL', 24 * 3600))
     ALLOWED_EXTENSIONS = set(
         os.environ.get('ALLOWED_EXTENSIONS', 'png,jpg,jpeg,gif,webp,mp4,mov,avi,webm,mkv').split(',')
     )
+    # Serving /static/uploads/: browser cache lifetime, and optionally let the
+    # reverse proxy send the bytes. 'x-accel-redirect' (nginx) needs an
+    # internal location mapping UPLOADS_ACCEL_PREFIX to UPLOAD_FOLDER, e.g.
+    #   location /_uploads/ { internal; alias /app/static/uploads/; }
+    # 'x-sendfile' is for Apache mod_xsendfile / lighttpd.
+    UPLOADS_MAX_AGE = int(os.environ.get('UPLOADS_MAX_AGE', 86400))
+    UPLOADS_OFFLOAD = os.environ.get('UPLOADS_OFFLOAD', '').lower() or None
+    UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX', '/_uploads/')
+
+    # --- Page cache ---
+    # 'filesystem' is shared by all gunicorn workers; 'simple' is a per-worker LRU.
+    PAGE_CACHE_TYPE = os.environ.get('PAGE_CACHE_TYPE', 'filesystem')
+    PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR', os.path.join(basedir, 'instance', 'page_cache'))
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 2000))
+
+    # --- Static assets (see `flask build-assets`) ---
+    # Build static/dist at startup if no manifest exists yet (e.g. no build step).
+    ASSETS_AUTO_BUILD = os.environ.get('ASSETS_AUTO_BUILD', 'False').lower() in ('true', '1', 'yes')
+
+    # --- HTTP caching (Cache-Control on public pages, seconds) ---
+    HTTP_MAX_AGE = int(os.environ.get('HTTP_MAX_AGE', 60))
+    HTTP_SHARED_MAX_AGE = int(os.environ.get('HTTP_SHARED_MAX_AGE', 300))
+    HTTP_STALE_WHILE_REVALIDATE = int(os.environ.get('HTTP_STALE_WHILE_REVALIDATE', 600))
+
+    # --- Background jobs ---
+    JOBS_ENABLED = os.environ.get('JOBS_ENABLED', 'True').lower() == 'true'
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+    JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', 10))
+
+    # --- Write-behind for contact/donation submissions ---
+    # When on, submissions are fsynced to a journal in WRITE_JOURNAL_DIR and
+    # batch-inserted every WRITE_BEHIND_INTERVAL seconds by a background thread.
+    WRITE_BEHIND = os.environ.get('WRITE_BEHIND', 'False').lower() in ('true', '1', 'yes')
+    WRITE_BEHIND_INTERVAL = float(os.environ.get('WRITE_BEHIND_INTERVAL', 1))
+    WRITE_JOURNAL_DIR = os.environ.get('WRITE_JOURNAL_DIR', os.path.join(basedir, 'instance', 'write_journal'))
+
+    # --- Metrics and logging ---
+    # /admin/metrics serves Prometheus text to logged-in admins, or to scrapers
+    # sending "Authorization: Bearer <METRICS_TOKEN>". Each worker writes its
+    # totals to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds so any worker
+    # can report for all of them.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(basedir, 'instance', 'metrics'))
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Log requests slower than this (ms) with the SQL they ran (0 = off).
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 0))
+    # Add a Server-Timing header (app, SQL and template time; SQL query count)
+    # to every response, for browser dev tools and the benchmark suite.
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'False').lower() == 'true'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
 
     # --- Admin ---
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL')
@@ -47,15 +123,27 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+    # Open SMTP connections kept for the send_mail job, and how long one may sit idle.
+    MAIL_POOL_SIZE = int(os.environ.get('MAIL_POOL_SIZE', 2))
+    MAIL_IDLE_TIMEOUT = int(os.environ.get('MAIL_IDLE_TIMEOUT', 60))
 
     # --- Pagination / Categories ---
     POSTS_PER_PAGE = int(os.environ.get('POSTS_PER_PAGE', 6))
+    ADMIN_PER_PAGE = int(os.environ.get('ADMIN_PER_PAGE', 50))
+    SEARCH_PER_PAGE = int(os.environ.get('SEARCH_PER_PAGE', 10))
+    API_PER_PAGE = int(os.environ.get('API_PER_PAGE', 20))
+    API_MAX_PER_PAGE = int(os.environ.get('API_MAX_PER_PAGE', 100))
     CATEGORIES = os.environ.get('CATEGORIES', 'General,Education,Healthcare,Community,Events,News').split(',')
 
     # --- Stripe ---
     STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY')
     STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
     STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
+    # Payment Link (https://buy.stripe.com/...) donors are sent to after pledging on the
+    # donate form; the pledge's reference goes along as client_reference_id.
+    STRIPE_PAYMENT_LINK = os.environ.get('STRIPE_PAYMENT_LINK')
+    # Max age (seconds) of a webhook's signed timestamp, against replayed requests.
+    STRIPE_WEBHOOK_TOLERANCE = int(os.environ.get('STRIPE_WEBHOOK_TOLERANCE', 300))
 
     # --- Sessions ---
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
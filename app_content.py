@@ -0,0 +1,79 @@
+import math
+import re
+from urllib.parse import urlsplit
+
+import nh3
+
+from app_search import plain_text
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 200
+
+# nh3's defaults (ammonia's vetted allowlist), plus class for Bootstrap
+# styling, titles, and video embeds from the hosts MediaVideo supports.
+ALLOWED_TAGS = nh3.ALLOWED_TAGS | {'iframe'}
+ALLOWED_ATTRIBUTES = {tag: set(attrs) for tag, attrs in nh3.ALLOWED_ATTRIBUTES.items()}
+for _tag in ('p', 'div', 'span', 'table', 'img', 'a', 'blockquote', 'figure', 'ul', 'ol', 'pre', 'code'):
+    ALLOWED_ATTRIBUTES.setdefault(_tag, set()).add('class')
+ALLOWED_ATTRIBUTES['a'] |= {'title'}
+ALLOWED_ATTRIBUTES['img'] |= {'title'}
+ALLOWED_ATTRIBUTES['iframe'] = {'src', 'width', 'height', 'title', 'allow', 'allowfullscreen'}
+EMBED_HOSTS = {'www.youtube.com', 'youtube.com', 'www.youtube-nocookie.com', 'player.vimeo.com'}
+
+_HEADING = re.compile(r'<(h[23])>(.*?)</\1>', re.IGNORECASE | re.DOTALL)
+_IMG = re.compile(r'<img\b(?![^>]*\bloading=)', re.IGNORECASE)
+_SLUG = re.compile(r'[^a-z0-9]+')
+
+
+def _filter_attribute(tag, attribute, value):
+    if tag == 'iframe' and attribute == 'src':
+        parts = urlsplit(value)
+        return value if parts.scheme == 'https' and parts.hostname in EMBED_HOSTS else None
+    return value
+
+
+def sanitize_html(source):
+    """Allowlist-clean admin-authored HTML so it is safe to emit verbatim."""
+    return nh3.clean(source or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES,
+                     attribute_filter=_filter_attribute,
+                     url_schemes={'http', 'https', 'mailto'})
+
+
+def _anchor_headings(body):
+    """Give each <h2>/<h3> a unique id so sections can be linked to."""
+    seen = {}
+
+    def replace(match):
+        tag, inner = match.groups()
+        slug = _SLUG.sub('-', plain_text(inner).lower()).strip('-') or 'section'
+        seen[slug] = seen.get(slug, 0) + 1
+        if seen[slug] > 1:
+            slug = f'{slug}-{seen[slug]}'
+        return f'<{tag} id="{slug}">{inner}</{tag}>'
+
+    return _HEADING.sub(replace, body)
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """The first length characters of text, cut back to a whole word."""
+    if len(text) <= length:
+        return text
+    cut = text[:length + 1].rsplit(' ', 1)[0].rstrip(' ,.;:-')
+    return cut + '…'
+
+
+def render_post(content):
+    """Everything the blog pages derive from a post's raw content.
+
+    Returns a dict with the sanitized HTML body (headings anchored, images
+    lazy-loaded), a plain-text excerpt, the word count and reading time.
+    """
+    body = _IMG.sub('<img loading="lazy"', _anchor_headings(sanitize_html(content)))
+    text = plain_text(body)
+    words = len(text.split())
+    return {
+        'content_html': body,
+        'excerpt': make_excerpt(text),
+        'word_count': words,
+        'reading_minutes': max(1, math.ceil(words / WORDS_PER_MINUTE)),
+    }
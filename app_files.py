@@ -0,0 +1,179 @@
+import mimetypes
+import os
+import uuid
+from datetime import datetime, timezone
+
+from werkzeug.wsgi import wrap_file
+
+# Types the stdlib table lacks or gets wrong for the formats ALLOWED_EXTENSIONS admits.
+mimetypes.add_type('video/mp4', '.mp4')
+mimetypes.add_type('video/quicktime', '.mov')
+mimetypes.add_type('video/webm', '.webm')
+mimetypes.add_type('video/x-matroska', '.mkv')
+mimetypes.add_type('video/x-msvideo', '.avi')
+mimetypes.add_type('image/webp', '.webp')
+
+# More ranges than this in one request is almost certainly abuse; RFC 9110
+# lets us ignore the Range header and send the whole file instead.
+MAX_RANGES = 16
+BLOCK_SIZE = 64 * 1024
+OFFLOAD_MODES = ('x-accel-redirect', 'x-sendfile')
+
+
+def file_validators(st):
+    """(strong ETag, Last-Modified) for a stat result."""
+    etag = f'{st.st_mtime_ns:x}-{st.st_size:x}'
+    last_modified = datetime.fromtimestamp(int(st.st_mtime), timezone.utc)
+    return etag, last_modified
+
+
+def _not_modified(request, etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return request.if_modified_since is not None and last_modified <= request.if_modified_since
+
+
+def _range_applies(request, etag, last_modified):
+    """If-Range: only honour Range when the client's copy is still current."""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return if_range.date == last_modified
+    return True
+
+
+def satisfiable_ranges(rng, size):
+    """Resolve a parsed Range against size into sorted, merged (start, stop) pairs.
+
+    Returns None when the header should be ignored, and [] when nothing
+    in it can be satisfied (a 416).
+    """
+    if rng is None or rng.units != 'bytes' or len(rng.ranges) > MAX_RANGES:
+        return None
+    spans = []
+    for begin, end in rng.ranges:
+        if begin < 0:  # suffix range: the last -begin bytes
+            start, stop = max(size + begin, 0), size
+        else:
+            start, stop = begin, size if end is None else min(end, size)
+        if start < stop:
+            spans.append((start, stop))
+    spans.sort()
+    merged = []
+    for start, stop in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def _copy(f, length):
+    while length:
+        block = f.read(min(BLOCK_SIZE, length))
+        if not block:
+            break
+        length -= len(block)
+        yield block
+
+
+def _read_span(f, length):
+    with f:
+        yield from _copy(f, length)
+
+
+def _multipart_body(path, spans, size, mimetype, boundary):
+    heads = [(f'--{boundary}\r\nContent-Type: {mimetype}\r\n'
+              f'Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n').encode('latin-1')
+             for start, stop in spans]
+    tail = f'--{boundary}--\r\n'.encode('latin-1')
+    length = sum(len(h) + (stop - start) + 2 for h, (start, stop) in zip(heads, spans)) + len(tail)
+
+    def generate():
+        with open(path, 'rb') as f:
+            for head, (start, stop) in zip(heads, spans):
+                yield head
+                f.seek(start)
+                yield from _copy(f, stop - start)
+                yield b'\r\n'
+            yield tail
+
+    return generate(), length
+
+
+def send_ranged_file(request, response_class, path, *, max_age=0, offload=None,
+                     offload_url=None):
+    """Serve path honouring conditional and (multi-)Range requests.
+
+    Full responses and single ranges hand an open file, positioned at the
+    start of the range, to the server's wsgi.file_wrapper with an exact
+    Content-Length, so gunicorn and similar servers send it with sendfile()
+    instead of copying it through Python. Several ranges become a
+    multipart/byteranges body. With offload set to 'x-accel-redirect'
+    (nginx, offload_url is the internal location) or 'x-sendfile'
+    (Apache/lighttpd), only headers are returned and the proxy serves the
+    bytes, including ranges.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    etag, last_modified = file_validators(st)
+    size = st.st_size
+
+    def finish(response):
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.accept_ranges = 'bytes'
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response
+
+    if _not_modified(request, etag, last_modified):
+        return finish(response_class(status=304))
+
+    if offload == 'x-accel-redirect':
+        response = response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = offload_url
+        return finish(response)
+    if offload == 'x-sendfile':
+        response = response_class(mimetype=mimetype)
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+        return finish(response)
+
+    spans = None
+    if request.range is not None and _range_applies(request, etag, last_modified):
+        spans = satisfiable_ranges(request.range, size)
+    if spans == []:
+        response = finish(response_class(status=416))
+        response.headers['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if spans and len(spans) > 1:
+        boundary = uuid.uuid4().hex
+        body, length = _multipart_body(path, spans, size, mimetype, boundary)
+        response = response_class(body, status=206, direct_passthrough=True,
+                                  content_type=f'multipart/byteranges; boundary={boundary}')
+        response.content_length = length
+        return finish(response)
+
+    start, stop = spans[0] if spans else (0, size)
+    f = open(path, 'rb')
+    f.seek(start)
+    # A file wrapper sends from the current offset to EOF unless the server
+    # clamps it to Content-Length (gunicorn does); otherwise copy the slice.
+    if stop == size or request.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn'):
+        body = wrap_file(request.environ, f, BLOCK_SIZE)
+    else:
+        body = _read_span(f, stop - start)
+    response = response_class(body, status=206 if spans else 200, mimetype=mimetype,
+                              direct_passthrough=True)
+    response.content_length = stop - start
+    if spans:
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    return finish(response)
@@ -0,0 +1,145 @@
+import base64
+import io
+import json
+import os
+import re
+import tempfile
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Widths (px) of the resized copies written next to each uploaded image.
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+PLACEHOLDER_WIDTH = 16
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+# Re-encoding an original to drop its metadata should not visibly cost quality.
+ORIGINAL_JPEG_QUALITY = 95
+ORIGINAL_WEBP_QUALITY = 95
+# Pillow format of an opened file -> the format it is re-saved in.
+METADATA_FORMATS = {'JPEG': 'JPEG', 'MPO': 'JPEG', 'PNG': 'PNG', 'WEBP': 'WEBP'}
+
+
+def _flatten(im):
+    """Return an RGB copy of im, compositing any transparency onto white."""
+    if im.mode in ('RGBA', 'LA', 'P'):
+        im = im.convert('RGBA')
+        background = Image.new('RGB', im.size, (255, 255, 255))
+        background.paste(im, mask=im.getchannel('A'))
+        return background
+    return im.convert('RGB')
+
+
+def strip_metadata(path):
+    """Rewrite an image file without its EXIF/XMP metadata (GPS position, camera serials).
+
+    The EXIF orientation is applied to the pixels first, so the picture still
+    displays the right way up; only the colour profile is carried over.
+    Returns True if the file was rewritten. Files without metadata,
+    animations and anything Pillow can't read are left as they are.
+    """
+    try:
+        with Image.open(path) as original:
+            fmt = METADATA_FORMATS.get(original.format)
+            if fmt is None or getattr(original, 'n_frames', 1) > 1:
+                return False
+            if not original.getexif() and not original.info.get('xmp'):
+                return False
+            im = ImageOps.exif_transpose(original)
+            options = {}
+            if original.info.get('icc_profile'):
+                options['icc_profile'] = original.info['icc_profile']
+            if fmt == 'JPEG':
+                options['quality'] = ORIGINAL_JPEG_QUALITY
+            elif fmt == 'WEBP':
+                options['quality'] = ORIGINAL_WEBP_QUALITY
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    im.save(out, fmt, **options)
+                os.chmod(tmp, os.stat(path).st_mode & 0o777)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return False
+    return True
+
+
+def make_derivatives(src_path, url_prefix):
+    """Write resized WebP/JPEG copies of an uploaded image next to it.
+
+    Returns a dict describing the copies (stored as JSON on the owning
+    row), or None if the file is not an image Pillow can read. Copies are
+    never wider than the original; EXIF is dropped after applying its
+    orientation (the original itself is cleaned by strip_metadata on
+    upload), and a tiny blurred WebP is inlined as a data URI
+    placeholder.
+    """
+    directory, filename = os.path.split(src_path)
+    stem = filename.rsplit('.', 1)[0]
+    try:
+        with Image.open(src_path) as original:
+            original.seek(0)
+            im = _flatten(ImageOps.exif_transpose(original))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return None
+
+    widths = [w for w in DERIVATIVE_WIDTHS if w < im.width]
+    if im.width <= DERIVATIVE_WIDTHS[-1]:
+        widths.append(im.width)
+    else:
+        widths.append(DERIVATIVE_WIDTHS[-1])
+
+    sizes = []
+    for width in sorted(set(widths)):
+        height = max(1, round(im.height * width / im.width))
+        resized = im if width == im.width else im.resize((width, height), Image.LANCZOS)
+        entry = {'width': width}
+        for fmt, ext, options in (('WEBP', 'webp', {'quality': WEBP_QUALITY, 'method': 6}),
+                                  ('JPEG', 'jpg', {'quality': JPEG_QUALITY, 'optimize': True,
+                                                   'progressive': True})):
+            name = f'{stem}_{width}w.{ext}'
+            resized.save(os.path.join(directory, name), fmt, **options)
+            entry[ext] = f'{url_prefix}{name}'
+        sizes.append(entry)
+
+    thumb = im.resize((PLACEHOLDER_WIDTH,
+                       max(1, round(im.height * PLACEHOLDER_WIDTH / im.width))),
+                      Image.BILINEAR)
+    buf = io.BytesIO()
+    thumb.save(buf, 'WEBP', quality=30)
+    placeholder = 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+    return {'width': im.width, 'height': im.height,
+            'sizes': sizes, 'placeholder': placeholder}
+
+
+def derivative_paths(src_path):
+    """Return the paths of the derivative files make_derivatives wrote for src_path."""
+    directory, filename = os.path.split(src_path)
+    pattern = re.compile(re.escape(filename.rsplit('.', 1)[0]) + r'_\d+w\.(webp|jpg)$')
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names if pattern.match(name)]
+
+
+def load_variants(raw):
+    """Decode a variants JSON column, tolerating empty or broken values."""
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def srcset(variants, ext):
+    """Build an HTML srcset attribute value for one derivative format."""
+    if not variants:
+        return ''
+    return ', '.join(f"{entry[ext]} {entry['width']}w"
+                     for entry in variants.get('sizes', []) if entry.get(ext))
@@ -0,0 +1,233 @@
+import json
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import exists, literal, select, text
+
+
+class JobRunner:
+    """Runs jobs persisted in a database table on an in-process thread pool.
+
+    Jobs are enqueued inside the caller's transaction, so they exist exactly
+    when the write that produced them commits, and they survive restarts. A
+    dispatcher thread claims due jobs with a conditional UPDATE (safe with
+    several gunicorn workers polling the same table) and hands them to the
+    pool, claiming no more than it has idle threads: a job claimed here sits
+    in no local queue while another process could be running it. Failed jobs
+    are retried with exponential backoff until max_attempts, then left as
+    'failed' for inspection or a manual retry.
+    """
+
+    def __init__(self, app=None, db=None, model=None):
+        self.handlers = {}
+        self.periodic = {}
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._started = False
+        self._pool = None
+        self._busy = 0  # jobs submitted to the pool and not yet finished
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model):
+        self.app = app
+        self.db = db
+        self.model = model
+        app.config.setdefault('JOB_WORKERS', 4)
+        app.config.setdefault('JOB_POLL_INTERVAL', 2.0)
+        app.config.setdefault('JOB_RETRY_DELAY', 10)
+        app.config.setdefault('JOB_STALE_AFTER', 900)
+
+    # ── registration / enqueueing ─────────────────────────────────────────
+
+    def task(self, name, max_attempts=3, every=None):
+        """Register a handler; it receives the job payload as keyword args.
+
+        every makes the job periodic: seconds between runs, or the name of a
+        config key holding them (0 disables it). A periodic job is enqueued
+        when the runner starts and again each time a run finishes.
+        """
+        def decorator(f):
+            self.handlers[name] = (f, max_attempts)
+            if every is not None:
+                self.periodic[name] = every
+            return f
+        return decorator
+
+    def _interval(self, name):
+        every = self.periodic.get(name)
+        return self.app.config.get(every, 0) if isinstance(every, str) else every or 0
+
+    def schedule_periodic(self, *names):
+        """Enqueue the next run of each periodic job that has none waiting.
+
+        Every worker process does this at start, so the check and the insert
+        are one statement: INSERT ... SELECT ... WHERE NOT EXISTS. SQLite
+        runs it under the database write lock; under Postgres' READ
+        COMMITTED two such inserts could still both see no row, so a
+        transaction-scoped advisory lock on the job name serializes them.
+        """
+        table = self.model.__table__
+        conn = self.db.session.connection()
+        for name in names or self.periodic:
+            interval = self._interval(name)
+            if not interval:
+                continue
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text('SELECT pg_advisory_xact_lock(hashtext(:key))'),
+                             {'key': f'job:{name}'})
+            values = self._job_values(name, interval, {})
+            waiting = exists().where(table.c.name == name,
+                                     table.c.status.in_(('pending', 'running')))
+            conn.execute(table.insert().from_select(
+                list(values),
+                select(*[literal(value, table.c[key].type) for key, value in values.items()])
+                .where(~waiting)))
+        self.db.session.commit()
+
+    def _job_values(self, name, delay, payload):
+        if name not in self.handlers:
+            raise KeyError(f'Unknown job: {name}')
+        return dict(
+            name=name,
+            payload=json.dumps(payload),
+            max_attempts=self.handlers[name][1],
+            run_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+        )
+
+    def enqueue(self, name, delay=0, **payload):
+        """Add a job to the current session; it runs once the session commits."""
+        job = self.model(**self._job_values(name, delay, payload))
+        self.db.session.add(job)
+        self.db.session.info['jobs_enqueued'] = True
+        return job
+
+    def enqueue_in_flush(self, sess, name, delay=0, **payload):
+        """Like enqueue, for flush event hooks, which can't add objects to the session."""
+        sess.connection().execute(
+            self.model.__table__.insert().values(self._job_values(name, delay, payload)))
+        sess.info['jobs_enqueued'] = True
+
+    def notify(self):
+        """Wake the dispatcher so freshly committed jobs start immediately."""
+        self._wakeup.set()
+
+    # ── execution ─────────────────────────────────────────────────────────
+
+    def start(self):
+        """Start the pool and dispatcher once per process (call after fork)."""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._pool = ThreadPoolExecutor(max_workers=self.app.config['JOB_WORKERS'],
+                                        thread_name_prefix='job')
+        threading.Thread(target=self._dispatch_forever, name='job-dispatcher',
+                         daemon=True).start()
+
+    def _dispatch_forever(self):
+        with self.app.app_context():
+            self.requeue_stale()
+            self.schedule_periodic()
+        while True:
+            try:
+                with self.app.app_context():
+                    claimed = self.dispatch_due()
+            except Exception:
+                self.app.logger.exception('Job dispatcher error')
+                claimed = 0
+            if not claimed:
+                self._wakeup.wait(self.app.config['JOB_POLL_INTERVAL'])
+                self._wakeup.clear()
+
+    def dispatch_due(self, limit=None, run_inline=False):
+        """Claim due jobs and run them on the pool (or inline). Returns the count.
+
+        On the pool, at most as many jobs are claimed as there are idle
+        threads; a finishing job wakes the dispatcher to claim the next.
+        """
+        Job = self.model
+        limit = limit or self.app.config['JOB_WORKERS']
+        if not run_inline:
+            with self._lock:
+                limit = min(limit, self.app.config['JOB_WORKERS'] - self._busy)
+            if limit <= 0:
+                return 0
+        now = datetime.now(timezone.utc)
+        due = self.db.session.query(Job.id)\
+            .filter(Job.status == 'pending', Job.run_at <= now)\
+            .order_by(Job.run_at).limit(limit).all()
+        claimed = 0
+        for (job_id,) in due:
+            updated = Job.query.filter_by(id=job_id, status='pending').update(
+                {'status': 'running', 'locked_at': now, 'attempts': Job.attempts + 1},
+                synchronize_session=False)
+            self.db.session.commit()
+            if not updated:
+                continue  # another worker got it first
+            claimed += 1
+            if run_inline:
+                self.run(job_id)
+            else:
+                with self._lock:
+                    self._busy += 1
+                self._pool.submit(self._run_in_context, job_id)
+        return claimed
+
+    def _run_in_context(self, job_id):
+        try:
+            with self.app.app_context():
+                self.run(job_id)
+        finally:
+            with self._lock:
+                self._busy -= 1
+            self._wakeup.set()
+
+    def run(self, job_id):
+        job = self.db.session.get(self.model, job_id)
+        if job is None:
+            return
+        handler = self.handlers.get(job.name, (None, 0))[0]
+        try:
+            if handler is None:
+                raise KeyError(f'No handler registered for {job.name}')
+            handler(**json.loads(job.payload or '{}'))
+        except Exception:
+            self.db.session.rollback()
+            job = self.db.session.get(self.model, job_id)
+            job.last_error = traceback.format_exc()[-2000:]
+            if job.attempts < job.max_attempts:
+                job.status = 'pending'
+                delay = self.app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+                job.run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            else:
+                job.status = 'failed'
+                job.finished_at = datetime.now(timezone.utc)
+            self.app.logger.warning('Job %s (%s) failed on attempt %s',
+                                    job.id, job.name, job.attempts)
+        else:
+            job.status = 'done'
+            job.last_error = None
+            job.finished_at = datetime.now(timezone.utc)
+        self.db.session.commit()
+        if job.name in self.periodic and job.status != 'pending':
+            self.schedule_periodic(job.name)
+
+    def requeue_stale(self):
+        """Return jobs left 'running' by a crashed or restarted process to the queue."""
+        Job = self.model
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.app.config['JOB_STALE_AFTER'])
+        count = Job.query.filter(Job.status == 'running', Job.locked_at < cutoff)\
+            .update({'status': 'pending'}, synchronize_session=False)
+        self.db.session.commit()
+        return count
+
+    def retry(self, job):
+        job.status = 'pending'
+        job.run_at = datetime.now(timezone.utc)
+        job.max_attempts = max(job.max_attempts, job.attempts + 1)
+        self.db.session.info['jobs_enqueued'] = True
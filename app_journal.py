@@ -0,0 +1,192 @@
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Seconds between checks for segments left behind by processes that died.
+RECOVERY_INTERVAL = 60
+# Names of flushed segments are remembered this long, to skip replays.
+SEGMENT_RETENTION = timedelta(days=1)
+
+
+class WriteJournal:
+    """Write-behind buffer: append records to a local journal, insert them in batches.
+
+    append() writes one JSON line to this process's active segment file and
+    fsyncs it, so a submission is durable before the request returns, without
+    waiting on the database (or on SQLite's write lock). A flusher thread
+    seals the active segment every WRITE_BEHIND_INTERVAL seconds and hands
+    its records to the registered handlers in one transaction, which also
+    records the segment's name in model; a segment found again after a crash
+    between commit and unlink is then skipped, not inserted twice.
+
+    Each process holds an flock on its active segment. When a flusher can
+    take the lock on another process's active segment, that process is
+    gone, so the segment is sealed and flushed. This is how submissions
+    journaled before a crash or restart reach the database.
+    """
+
+    def __init__(self, app=None, db=None, model=None):
+        self.handlers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started = False
+        self._file = None
+        self._path = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model):
+        self.app = app
+        self.db = db
+        self.model = model
+        app.config.setdefault('WRITE_BEHIND', False)
+        app.config.setdefault('WRITE_BEHIND_INTERVAL', 1.0)
+        self.directory = app.config['WRITE_JOURNAL_DIR']
+
+    @property
+    def enabled(self):
+        return self.app.config['WRITE_BEHIND']
+
+    def handler(self, kind):
+        """Register a handler; it receives a list of record dicts to insert."""
+        def decorator(f):
+            self.handlers[kind] = f
+            return f
+        return decorator
+
+    # ── appending ─────────────────────────────────────────────────────────
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._path = os.path.join(self.directory, f'active-{uuid.uuid4().hex}.jsonl')
+        self._file = open(self._path, 'ab')
+        fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def append(self, kind, **record):
+        """Durably journal one record; returns once it is on disk."""
+        if kind not in self.handlers:
+            raise KeyError(f'Unknown journal record: {kind}')
+        record.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+        line = json.dumps({'kind': kind, 'record': record}).encode('utf-8') + b'\n'
+        with self._lock:
+            if self._file is None or self._pid != os.getpid():
+                self._open_segment()  # first write, or a child forked from the opener
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._wakeup.set()
+
+    def _seal_active(self):
+        """Rename the active segment so it can be flushed; the next append opens a new one."""
+        with self._lock:
+            if self._file is None or self._pid != os.getpid() or not self._file.tell():
+                return
+            os.rename(self._path, self._path.replace('active-', 'sealed-', 1))
+            self._file.close()  # releases the flock only after the rename
+            self._file = None
+
+    # ── flushing ──────────────────────────────────────────────────────────
+
+    def start(self):
+        """Start the flusher thread once per process (call after fork)."""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._flush_forever, name='journal-flusher',
+                         daemon=True).start()
+
+    def _flush_forever(self):
+        interval = self.app.config['WRITE_BEHIND_INTERVAL']
+        while True:
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                self.app.logger.exception('Write journal flush failed')
+            # Sleep until something is appended (or a while, to pick up segments
+            # abandoned by dead processes), then let a batch accumulate.
+            self._wakeup.wait(RECOVERY_INTERVAL)
+            self._wakeup.clear()
+            time.sleep(interval)
+
+    def _recover_abandoned(self, names):
+        for name in names:
+            if not name.startswith('active-'):
+                continue
+            path = os.path.join(self.directory, name)
+            if path == self._path:
+                continue
+            try:
+                with open(path, 'ab') as f:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.rename(path, path.replace('active-', 'sealed-', 1))
+            except (BlockingIOError, FileNotFoundError):
+                continue  # still owned by a live process, or sealed by another flusher
+
+    def flush(self):
+        """Seal this process's segment and insert every sealed segment. Returns the record count."""
+        self._seal_active()
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return 0
+        self._recover_abandoned(names)
+        flushed = 0
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith('sealed-'):
+                flushed += self._flush_segment(os.path.join(self.directory, name))
+        return flushed
+
+    def _flush_segment(self, path):
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0  # another process is flushing it
+            if os.fstat(f.fileno()).st_nlink == 0:
+                return 0  # flushed and unlinked while we waited to open it
+            name = os.path.basename(path)
+            if self.db.session.get(self.model, name) is not None:
+                os.unlink(path)  # committed before a crash; only the unlink was lost
+                return 0
+            batches = {}
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-append; never acknowledged
+                batches.setdefault(entry['kind'], []).append(entry['record'])
+            try:
+                for kind, records in batches.items():
+                    self.handlers[kind](records)
+                self.db.session.add(self.model(name=name, records=sum(map(len, batches.values())),
+                                               flushed_at=datetime.now(timezone.utc)))
+                self.db.session.query(self.model).filter(
+                    self.model.flushed_at < datetime.now(timezone.utc) - SEGMENT_RETENTION
+                ).delete(synchronize_session=False)
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+            os.unlink(path)
+            return sum(map(len, batches.values()))
+
+    def pending(self):
+        """Number of journal segments not yet flushed (for monitoring)."""
+        try:
+            return sum(1 for name in os.listdir(self.directory) if name.endswith('.jsonl'))
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,120 @@
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid, parseaddr
+
+
+def new_message_id(sender):
+    """A Message-ID in the sender's domain.
+
+    Chosen when a mail is queued, so every retry is recognisably the same message.
+    """
+    return make_msgid(domain=parseaddr(sender or '')[1].rpartition('@')[2] or None)
+
+
+def build_message(sender, to, subject, body, reply_to=None, message_id=None):
+    """A plain-text EmailMessage."""
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = to
+    message['Subject'] = subject
+    message['Date'] = formatdate(localtime=True)
+    if reply_to:
+        message['Reply-To'] = reply_to
+    message['Message-ID'] = message_id or new_message_id(sender)
+    message.set_content(body)
+    return message
+
+
+def _close(smtp):
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+class SMTPPool:
+    """Long-lived SMTP connections shared by the threads that send mail.
+
+    Opening a connection costs a TCP handshake, usually STARTTLS and AUTH,
+    so connections are kept open between messages: a burst of mail goes out
+    over at most size connections, many messages per SMTP session.
+    Connections left idle longer than idle_timeout are closed instead of
+    reused, since servers drop them; a reused one that turns out to be dead
+    is replaced and the message sent once more.
+    """
+
+    def __init__(self, host, port=587, use_tls=True, use_ssl=False, username=None,
+                 password=None, size=2, idle_timeout=60, timeout=15):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = []  # [(connection, monotonic time last used)]
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['MAIL_SERVER'], config['MAIL_PORT'], config['MAIL_USE_TLS'],
+                   config['MAIL_USE_SSL'], config['MAIL_USERNAME'], config['MAIL_PASSWORD'],
+                   config['MAIL_POOL_SIZE'], config['MAIL_IDLE_TIMEOUT'])
+
+    def _connect(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        return smtp
+
+    def _checkout(self):
+        """(connection, reused) — the most recently used live connection, or a new one."""
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                smtp, used = self._idle.pop()
+                if now - used < self.idle_timeout:
+                    return smtp, True
+                _close(smtp)
+        return self._connect(), False
+
+    def _checkin(self, smtp):
+        with self._lock:
+            self._idle.append((smtp, time.monotonic()))
+
+    def send(self, message):
+        """Send one EmailMessage, raising smtplib/OS errors for the caller to retry."""
+        with self._slots:
+            smtp, reused = self._checkout()
+            try:
+                try:
+                    smtp.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    _close(smtp)
+                    smtp = self._connect()
+                    smtp.send_message(message)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                # The server turned down this message; the session is still good.
+                self._checkin(smtp)
+                raise
+            except BaseException:
+                _close(smtp)
+                raise
+            self._checkin(smtp)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            _close(smtp)
@@ -0,0 +1,270 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+# Request latency buckets (seconds), as in the Prometheus client defaults.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Where the snapshots of exited processes end up, and the lock guarding it.
+AGGREGATE_FILE = 'aggregate.json'
+LOCK_FILE = '.lock'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _start_time(pid):
+    """The kernel's start time for pid (Linux only), or None."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rpartition(')')[2].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _running(pid, started):
+    """Whether the process that wrote a snapshot is still alive.
+
+    Pids get reused, so where the kernel reports start times the running
+    process must also have started when the snapshot's writer did.
+    """
+    if started and os.path.exists('/proc/self/stat'):
+        return _start_time(pid) == started
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _writer(filename):
+    """(pid, start time or None) from a snapshot or temp file name, or None."""
+    parts = filename.split('-')
+    if len(parts) < 2 or not parts[0].isdigit():
+        return None
+    return int(parts[0]), (parts[1] if len(parts) > 2 and parts[1] != 'x' else None)
+
+
+def _combine(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total, count in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            entry = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+            entry[2] += count
+    return counters, histograms
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Metrics:
+    """Counters and histograms, rendered in the Prometheus text format.
+
+    Each process updates its own registry in memory. With directory set,
+    it also writes a snapshot there at most every flush_interval seconds
+    (see maybe_persist), and render() adds up the snapshots of every other
+    process, so a scrape through any gunicorn worker sees the whole
+    server. Snapshot files are named per process start rather than per pid,
+    so a recycled worker never overwrites the totals of the one it replaced
+    and counters never go backwards. At scrape time the snapshots of
+    processes that have exited are folded into a single aggregate file and
+    deleted, so the directory doesn't grow with every worker restart.
+    """
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._meta = {}  # name -> (type, help, buckets)
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+        self._persisted_at = 0.0
+        self._token = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['METRICS_DIR'], config['METRICS_FLUSH_INTERVAL'])
+
+    # ── declaration / recording ───────────────────────────────────────────
+
+    def counter(self, name, help):
+        self._meta[name] = ('counter', help, None)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        self._meta[name] = ('histogram', help, tuple(buckets))
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = self._meta[name][2]
+        key = (name, tuple(labels))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            i = bisect_left(buckets, value)
+            if i < len(buckets):
+                entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    # ── sharing between processes ─────────────────────────────────────────
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, labels, value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, labels, list(counts), total, count]
+                               for (name, labels), (counts, total, count)
+                               in self._histograms.items()],
+            }
+
+    def _own_prefix(self):
+        pid = os.getpid()
+        if self._token is None or self._token[0] != pid:
+            self._token = (pid, f'{pid}-{_start_time(pid) or "x"}-{uuid.uuid4().hex[:8]}')
+        return self._token[1]
+
+    def _own_file(self):
+        return self._own_prefix() + '.json'
+
+    def maybe_persist(self, force=False):
+        """Write this process's snapshot if flush_interval has passed since the last one."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._persisted_at < self.flush_interval:
+            return
+        self._persisted_at = now
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=self._own_prefix() + '-',
+                                   suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._snapshot(), f)
+        os.replace(tmp, os.path.join(self.directory, self._own_file()))
+
+    def _compact(self, filenames):
+        """Fold the snapshots of exited processes into the aggregate file.
+
+        Called with the directory lock held. The aggregate records which
+        files it has absorbed, so a crash between rewriting it and deleting
+        them can't count them twice.
+        """
+        aggregate_path = os.path.join(self.directory, AGGREGATE_FILE)
+        aggregate = _load(aggregate_path) or {'counters': [], 'histograms': []}
+        already = set(aggregate.get('folded', ()))
+        fold, dead = [], []
+        for name in filenames:
+            writer = _writer(name)
+            if writer is None or _running(*writer):
+                continue
+            dead.append(name)
+            if name.endswith('.json') and name not in already:
+                snapshot = _load(os.path.join(self.directory, name))
+                if snapshot is not None:
+                    fold.append((name, snapshot))
+        if fold:
+            counters, histograms = _combine([aggregate] + [snapshot for _, snapshot in fold])
+            aggregate = {
+                'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+                'histograms': [[name, labels, counts, total, count]
+                               for (name, labels), (counts, total, count) in histograms.items()],
+                'folded': sorted((already & set(filenames)) | {name for name, _ in fold}),
+            }
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=self._own_prefix() + '-',
+                                       suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(aggregate, f)
+            os.replace(tmp, aggregate_path)
+        for name in dead:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _merged(self):
+        snapshots = [self._snapshot()]
+        if self.directory:
+            own = self._own_file()
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    self._compact([name for name in os.listdir(self.directory)
+                                   if name.endswith(('.json', '.tmp'))])
+                    for name in os.listdir(self.directory):
+                        if name.endswith('.json') and name != own:
+                            snapshot = _load(os.path.join(self.directory, name))
+                            if snapshot is not None:
+                                snapshots.append(snapshot)
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        return _combine(snapshots)
+
+    # ── exposition ────────────────────────────────────────────────────────
+
+    def render(self, gauges=()):
+        """The Prometheus text exposition of every metric, plus gauges.
+
+        gauges is an iterable of (name, help, [(labels, value), ...]) computed
+        by the caller at scrape time.
+        """
+        counters, histograms = self._merged()
+        lines = []
+        for name, (kind, help, buckets) in sorted(self._meta.items()):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip(buckets, counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} '
+                                 f'{cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(labels)} {count}')
+        for name, help, samples in gauges:
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in samples:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,98 @@
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+
+class KeysetPage:
+    """One page of keyset-paginated results plus cursors to its neighbours."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values):
+    payload = json.dumps([v.isoformat() if isinstance(v, (datetime, date)) else v
+                          for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Turn a cursor back into column values; None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(columns):
+        return None
+    decoded = []
+    for column, value in zip(columns, values):
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = None
+        if value is not None and python_type is datetime:
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                return None
+        decoded.append(value)
+    return decoded
+
+
+def keyset_paginate(query, columns, per_page, after=None, before=None, descending=True):
+    """Paginate query by the unique sort key columns without OFFSET or COUNT.
+
+    columns must end with a unique column (normally the primary key) so the
+    ordering is total. after/before are cursors from a previous page's
+    next_cursor/prev_cursor. Each page costs one indexed range scan of
+    per_page + 1 rows no matter how deep it is.
+    """
+    key = tuple_(*columns)
+    forward = before is None
+    cursor = decode_cursor(after if forward else before, columns) \
+        if (after or before) else None
+
+    if cursor is not None:
+        bound = tuple_(*cursor)
+        # Moving forward through a descending list means smaller keys.
+        query = query.filter(key < bound if forward == descending else key > bound)
+
+    scan_desc = descending if forward else not descending
+    query = query.order_by(*[c.desc() if scan_desc else c.asc() for c in columns])
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    def key_of(row):
+        return encode_cursor([getattr(row, c.key) for c in columns])
+
+    if not rows:
+        return KeysetPage([])
+    if forward:
+        next_cursor = key_of(rows[-1]) if more else None
+        prev_cursor = key_of(rows[0]) if cursor is not None else None
+    else:
+        next_cursor = key_of(rows[-1])
+        prev_cursor = key_of(rows[0]) if more else None
+    return KeysetPage(rows, next_cursor, prev_cursor)
@@ -0,0 +1,132 @@
+import html
+import re
+from collections import namedtuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+# Kinds of document in the index. On SQLite the kind is folded into the FTS5
+# rowid (ref_id * len(KINDS) + position), so only ever append to this tuple.
+KINDS = ('post', 'campaign')
+
+# Control characters the database wraps matches in; the result text is
+# HTML-escaped first and only then are these turned into <mark> tags.
+_START, _STOP = '\x02', '\x03'
+
+_SKIP = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r'<[^>]*>')
+_SPACE = re.compile(r'\s+')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+SearchHit = namedtuple('SearchHit', 'kind ref_id title snippet rank')
+
+
+def plain_text(*parts):
+    """Join parts into one whitespace-normalised string with HTML tags removed."""
+    joined = ' '.join(p for p in parts if p)
+    stripped = _TAG.sub(' ', _SKIP.sub(' ', joined))
+    return _SPACE.sub(' ', html.unescape(stripped)).strip()
+
+
+def _highlight(value):
+    return Markup(str(escape(value or '')).replace(_START, '<mark>').replace(_STOP, '</mark>'))
+
+
+class SQLiteSearch:
+    """FTS5 index in the search_index virtual table (porter-stemmed, bm25-ranked)."""
+
+    def _rowid(self, kind, ref_id):
+        return ref_id * len(KINDS) + KINDS.index(kind)
+
+    def match_expression(self, q):
+        """Turn free text into an FTS5 query: every word must appear, the last
+        one as a prefix. Words are quoted so user input can't inject syntax."""
+        words = _WORD.findall(q)
+        if not words:
+            return None
+        terms = [f'"{w}"' for w in words]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def upsert(self, conn, kind, ref_id, title, body):
+        rowid = self._rowid(kind, ref_id)
+        conn.execute(text('DELETE FROM search_index WHERE rowid = :rowid'), {'rowid': rowid})
+        conn.execute(text('INSERT INTO search_index (rowid, title, body) '
+                          'VALUES (:rowid, :title, :body)'),
+                     {'rowid': rowid, 'title': title, 'body': body})
+
+    def delete(self, conn, kind, ref_id):
+        conn.execute(text('DELETE FROM search_index WHERE rowid = :rowid'),
+                     {'rowid': self._rowid(kind, ref_id)})
+
+    def clear(self, conn):
+        conn.execute(text('DELETE FROM search_index'))
+
+    def search(self, conn, q, limit, offset=0):
+        match = self.match_expression(q)
+        if match is None:
+            return []
+        rows = conn.execute(text(
+            'SELECT rowid, highlight(search_index, 0, :start, :stop), '
+            "snippet(search_index, 1, :start, :stop, '…', 32), "
+            'bm25(search_index, 5.0, 1.0) AS rank '
+            'FROM search_index WHERE search_index MATCH :match '
+            'ORDER BY rank LIMIT :limit OFFSET :offset'),
+            {'start': _START, 'stop': _STOP, 'match': match,
+             'limit': limit, 'offset': offset})
+        return [SearchHit(KINDS[rowid % len(KINDS)], rowid // len(KINDS),
+                          _highlight(title), _highlight(snippet), -rank)
+                for rowid, title, snippet, rank in rows]
+
+
+class PostgresSearch:
+    """tsvector column with a GIN index in the search_index table, ranked by ts_rank_cd."""
+
+    CONFIG = 'english'
+
+    def upsert(self, conn, kind, ref_id, title, body):
+        conn.execute(text(
+            'INSERT INTO search_index (kind, ref_id, title, body, document) '
+            'VALUES (:kind, :ref_id, :title, :body, '
+            f"setweight(to_tsvector('{self.CONFIG}', :title), 'A') || "
+            f"setweight(to_tsvector('{self.CONFIG}', :body), 'B')) "
+            'ON CONFLICT (kind, ref_id) DO UPDATE SET title = EXCLUDED.title, '
+            'body = EXCLUDED.body, document = EXCLUDED.document'),
+            {'kind': kind, 'ref_id': ref_id, 'title': title, 'body': body})
+
+    def delete(self, conn, kind, ref_id):
+        conn.execute(text('DELETE FROM search_index WHERE kind = :kind AND ref_id = :ref_id'),
+                     {'kind': kind, 'ref_id': ref_id})
+
+    def clear(self, conn):
+        conn.execute(text('DELETE FROM search_index'))
+
+    def search(self, conn, q, limit, offset=0):
+        if not _WORD.search(q):
+            return []
+        # Rank and page first; ts_headline is costly, so it only runs on the
+        # rows actually shown.
+        options = (f'StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, '
+                   'MaxFragments=2, FragmentDelimiter=" … "')
+        rows = conn.execute(text(
+            f"WITH query AS (SELECT websearch_to_tsquery('{self.CONFIG}', :q) AS q), "
+            'hits AS (SELECT s.kind, s.ref_id, s.title, s.body, '
+            'ts_rank_cd(s.document, query.q) AS rank '
+            'FROM search_index s, query WHERE s.document @@ query.q '
+            'ORDER BY rank DESC, s.ref_id DESC LIMIT :limit OFFSET :offset) '
+            'SELECT hits.kind, hits.ref_id, '
+            f"ts_headline('{self.CONFIG}', hits.title, query.q, :title_options), "
+            f"ts_headline('{self.CONFIG}', hits.body, query.q, :options), hits.rank "
+            'FROM hits, query ORDER BY hits.rank DESC, hits.ref_id DESC'),
+            {'q': q, 'limit': limit, 'offset': offset, 'options': options,
+             'title_options': f'HighlightAll=true, StartSel={_START}, StopSel={_STOP}'})
+        return [SearchHit(kind, ref_id, _highlight(title), _highlight(snippet), rank)
+                for kind, ref_id, title, snippet, rank in rows]
+
+
+_BACKENDS = {'sqlite': SQLiteSearch(), 'postgresql': PostgresSearch()}
+
+
+def search_backend(dialect_name):
+    """The index implementation for a database dialect, or None if unsupported."""
+    return _BACKENDS.get(dialect_name)
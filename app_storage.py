@@ -0,0 +1,164 @@
+import os
+import re
+import shutil
+import time
+
+# Resized copies written by app_images.make_derivatives next to an original.
+_DERIVATIVE = re.compile(r'^(.*)_\d+w\.(?:webp|jpg)$')
+BATCH_SIZE = 500
+
+CATEGORIES = (
+    ('referenced', 'referenced by a row'),
+    ('derivatives', 'derivatives of referenced images'),
+    ('recent', 'unreferenced, inside the grace period'),
+    ('orphaned', 'orphaned'),
+)
+
+
+def iter_files(root):
+    """Yield (relative posix path, os.DirEntry) for every file under root.
+
+    Walks with os.scandir and an explicit stack, so memory stays flat however
+    many files there are, and the size/mtime come from the DirEntry (no
+    extra stat on most platforms). Dotfiles and symlinks are skipped.
+    """
+    stack = ['']
+    while stack:
+        rel = stack.pop()
+        try:
+            it = os.scandir(os.path.join(root, rel) if rel else root)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                path = f'{rel}/{entry.name}' if rel else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield path, entry
+
+
+def stem(path):
+    return path.rsplit('.', 1)[0]
+
+
+class StorageReport:
+    """File counts and bytes per category, as found by collect_garbage."""
+
+    def __init__(self):
+        self.totals = {name: [0, 0] for name, _ in CATEGORIES}
+        self.removed = [0, 0]
+        self.kept = 0  # orphans that turned out to be referenced or fresh when re-checked
+
+    def add(self, category, size):
+        self.totals[category][0] += 1
+        self.totals[category][1] += size
+
+    def lines(self):
+        width = max(len(label) for _, label in CATEGORIES)
+        for name, label in CATEGORIES:
+            count, size = self.totals[name]
+            yield f'{label:<{width}}  {count:>9,} files  {format_size(size):>10}'
+
+
+def format_size(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024
+
+
+def collect_garbage(root, referenced, *, grace, apply=False, quarantine=None,
+                    recheck=None, now=None):
+    """Find files under root that no row references, and optionally remove them.
+
+    referenced is a set of paths relative to root. A file is kept if it is
+    referenced, if it is a derivative (<stem>_<width>w.webp/jpg) of a
+    referenced file, or if it was modified within grace seconds. Everything
+    else is orphaned. With apply, orphans are handled in batches: recheck
+    (called with a list of relative paths, returning those referenced now)
+    and a fresh stat guard against uploads that landed after the scan
+    started; the rest are moved under quarantine, or deleted if it is None.
+    """
+    now = time.time() if now is None else now
+    referenced_stems = {stem(path) for path in referenced}
+    report = StorageReport()
+    batch = []
+
+    for path, entry in iter_files(root):
+        st = entry.stat(follow_symlinks=False)
+        if path in referenced:
+            report.add('referenced', st.st_size)
+            continue
+        match = _DERIVATIVE.match(path)
+        if match and match.group(1) in referenced_stems:
+            report.add('derivatives', st.st_size)
+        elif now - st.st_mtime < grace:
+            report.add('recent', st.st_size)
+        else:
+            report.add('orphaned', st.st_size)
+            if apply:
+                batch.append(path)
+                if len(batch) >= BATCH_SIZE:
+                    _dispose(root, batch, report, grace, quarantine, recheck)
+                    batch = []
+    if batch:
+        _dispose(root, batch, report, grace, quarantine, recheck)
+    return report
+
+
+def _dispose(root, paths, report, grace, quarantine, recheck):
+    still_used = set(recheck(paths)) if recheck else set()
+    now = time.time()
+    touched = set()
+    for path in paths:
+        source = os.path.join(root, *path.split('/'))
+        try:
+            st = os.stat(source)
+        except FileNotFoundError:
+            continue
+        if path in still_used or now - st.st_mtime < grace:
+            report.kept += 1
+            continue
+        if quarantine:
+            target = os.path.join(quarantine, *path.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(source, target)
+            os.utime(target)  # purge_quarantine ages files from when they arrived
+        else:
+            os.remove(source)
+        report.removed[0] += 1
+        report.removed[1] += st.st_size
+        touched.add(os.path.dirname(source))
+    remove_empty_dirs(root, touched)
+
+
+def remove_empty_dirs(root, directories):
+    """Remove each directory and its parents up to root while they are empty."""
+    root = os.path.abspath(root)
+    for directory in sorted(directories, key=len, reverse=True):
+        directory = os.path.abspath(directory)
+        while directory != root and directory.startswith(root + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+def purge_quarantine(quarantine, max_age, now=None):
+    """Delete quarantined files older than max_age seconds; return (count, bytes)."""
+    now = time.time() if now is None else now
+    count = size = 0
+    touched = set()
+    for _, entry in iter_files(quarantine):
+        st = entry.stat(follow_symlinks=False)
+        if now - st.st_mtime >= max_age:
+            os.remove(entry.path)
+            count += 1
+            size += st.st_size
+            touched.add(os.path.dirname(entry.path))
+    remove_empty_dirs(quarantine, touched)
+    return count, size
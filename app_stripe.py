@@ -0,0 +1,94 @@
+import hashlib
+import hmac
+import json
+import time
+
+# Currencies Stripe counts in whole units rather than hundredths.
+ZERO_DECIMAL_CURRENCIES = {'bif', 'clp', 'djf', 'gnf', 'jpy', 'kmf', 'krw', 'mga', 'pyg',
+                           'rwf', 'ugx', 'vnd', 'vuv', 'xaf', 'xof', 'xpf'}
+
+
+class SignatureError(ValueError):
+    """A webhook payload whose Stripe-Signature header doesn't check out."""
+
+
+def _signature(payload, secret, timestamp):
+    signed = f'{timestamp}.'.encode('utf-8') + payload
+    return hmac.new(secret.encode('utf-8'), signed, hashlib.sha256).hexdigest()
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """A Stripe-Signature header value for payload, as Stripe would send it."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    return f't={timestamp},v1={_signature(payload, secret, timestamp)}'
+
+
+def verify_signature(payload, header, secret, tolerance=300, now=None):
+    """Check a webhook's Stripe-Signature header and return the decoded event.
+
+    Follows Stripe's scheme: an HMAC-SHA256 of "<timestamp>.<raw body>"
+    under the endpoint secret, in any of the header's v1 entries, with the
+    timestamp no more than tolerance seconds old so captured requests can't
+    be replayed later.
+    """
+    timestamp, signatures = None, []
+    for item in (header or '').split(','):
+        key, _, value = item.strip().partition('=')
+        if key == 't':
+            timestamp = value
+        elif key == 'v1':
+            signatures.append(value)
+    if not timestamp or not timestamp.isdigit() or not signatures:
+        raise SignatureError('Malformed Stripe-Signature header.')
+    expected = _signature(payload, secret, int(timestamp))
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise SignatureError('Signature does not match.')
+    now = time.time() if now is None else now
+    if tolerance and abs(now - int(timestamp)) > tolerance:
+        raise SignatureError('Timestamp outside the tolerance window.')
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        raise SignatureError('Payload is not JSON.')
+    if not isinstance(event, dict) or not event.get('id') or not event.get('type'):
+        raise SignatureError('Payload is not a Stripe event.')
+    return event
+
+
+def major_units(amount, currency):
+    if (currency or '').lower() in ZERO_DECIMAL_CURRENCIES:
+        return float(amount)
+    return amount / 100
+
+
+def donation_from_event(event):
+    """Donation fields for a paid Checkout Session event, or None for anything else.
+
+    payment_reference is the PaymentIntent id, so redelivered or duplicate
+    events for one payment resolve to the same donation. pledge is the
+    session's client_reference_id (or metadata.donation_reference): the
+    reference of the donate-form pledge this payment settles, if any.
+    Only Checkout events are used: payment_intent.succeeded for the same
+    payment doesn't carry the pledge reference.
+    """
+    obj = event.get('data', {}).get('object') or {}
+    metadata = obj.get('metadata') or {}
+    if event['type'] not in ('checkout.session.completed',
+                             'checkout.session.async_payment_succeeded'):
+        return None
+    if obj.get('payment_status') != 'paid':
+        return None  # async methods settle later, with async_payment_succeeded
+    customer = obj.get('customer_details') or {}
+    email = customer.get('email') or obj.get('customer_email')
+    name = customer.get('name') or metadata.get('name')
+    amount, reference = obj.get('amount_total'), obj.get('payment_intent') or obj.get('id')
+    if not amount or not reference:
+        return None
+    return {
+        'name': (name or 'Anonymous')[:100],
+        'email': (email or '')[:120],
+        'amount': major_units(amount, obj.get('currency')),
+        'message': metadata.get('message') or None,
+        'payment_reference': reference,
+        'pledge': obj.get('client_reference_id') or metadata.get('donation_reference'),
+    }
@@ -0,0 +1,266 @@
+"""Load-test the public and admin pages against a local gunicorn.
+
+    python -m benchmarks.seed                # once: fill instance/bench.db
+    python -m benchmarks.run                 # run, compare with benchmarks/baseline.json
+    python -m benchmarks.run --save          # run and record a new baseline
+    python -m benchmarks.run -k media -k admin --duration 20
+
+Every scenario is driven by --concurrency client threads for --duration
+seconds, after a short warm-up. The report gives p50/p95/p99 latency,
+throughput, and mean SQL queries per request, read from the app's
+Server-Timing header. The page cache is off, so every request renders
+and queries the database as an uncached page would. Results are written
+as JSON to --output. With a baseline present, the run exits 1 when a
+scenario's p95 latency, throughput or query count regresses by more than
+--tolerance. Latency baselines only mean something on the machine that
+recorded them; query counts are portable.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+from benchmarks.seed import BENCH_ADMIN, DEFAULT_DATABASE, WORDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# (name, path template, needs admin session). {post_id} and {word} are filled per request.
+SCENARIOS = [
+    ('index', '/', False),
+    ('blog', '/blog', False),
+    ('blog_category', '/blog?category=Community', False),
+    ('blog_post', '/blog/{post_id}', False),
+    ('media', '/media', False),
+    ('search', '/search?q={word}', False),
+    ('admin', '/admin', True),
+    ('admin_posts', '/admin/posts', True),
+    ('admin_messages', '/admin/messages', True),
+    ('admin_donations', '/admin/donations', True),
+    ('admin_media', '/admin/media', True),
+]
+
+_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+# Absolute slack added to the relative tolerance, so tiny numbers don't flap.
+LATENCY_SLACK_MS = 2.0
+QUERY_SLACK = 0.5
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Server:
+    """A gunicorn serving the app on a local port for the duration of the run."""
+
+    def __init__(self, database, workers, port):
+        self.port = port
+        # No page cache, or each scenario would measure cache hits after the
+        # first render; fresh metrics so earlier runs (or a dev server) don't mix in.
+        self.scratch = tempfile.mkdtemp(prefix='modaly-bench-')
+        env = dict(os.environ, DATABASE_URL=database, SERVER_TIMING='True',
+                   PAGE_CACHE_TYPE='null',
+                   METRICS_DIR=os.path.join(self.scratch, 'metrics'),
+                   JOBS_ENABLED='False', SECRET_KEY=os.environ.get('SECRET_KEY', 'bench'),
+                   ADMIN_EMAIL=BENCH_ADMIN[0], ADMIN_PASSWORD=BENCH_ADMIN[1])
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'bootstrap'],
+                       cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+             '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:create_app()'],
+            cwd=ROOT, env=env)
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                sys.exit('gunicorn exited during startup')
+            try:
+                request(self.port, '/')
+                return
+            except OSError:
+                time.sleep(0.2)
+        sys.exit('gunicorn did not start in time')
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+def request(port, path, method='GET', body=None, headers=None):
+    """(status, headers, seconds) for one request on a fresh connection."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    started = time.perf_counter()
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        response.read()
+        return response.status, response.headers, time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+def login(port):
+    body = urllib.parse.urlencode({'email': BENCH_ADMIN[0], 'password': BENCH_ADMIN[1]})
+    status, headers, _ = request(port, '/login', 'POST', body,
+                                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    cookie = headers.get('Set-Cookie', '').split(';', 1)[0]
+    if status != 302 or not cookie:
+        sys.exit('could not log in as the benchmark admin; was the database seeded?')
+    return cookie
+
+
+def run_scenario(port, template, headers, concurrency, duration, warmup, max_post_id):
+    samples = []  # (seconds, status, queries)
+    errors = []
+    lock = threading.Lock()
+    start_at = time.monotonic() + warmup
+    stop_at = start_at + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while (now := time.monotonic()) < stop_at:
+            path = template.format(post_id=rng.randint(1, max_post_id), word=rng.choice(WORDS))
+            try:
+                status, response_headers, seconds = request(port, path, headers=headers)
+            except OSError as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            if now < start_at:
+                continue
+            match = _QUERIES.search(response_headers.get('Server-Timing', ''))
+            with lock:
+                samples.append((seconds, status, int(match.group(1)) if match else None))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = sorted(s for s, _, _ in samples)
+    queries = [q for _, _, q in samples if q is not None]
+    server_errors = sum(1 for _, status, _ in samples if status >= 500)
+    return {
+        'requests': len(samples),
+        'errors': len(errors) + server_errors,
+        'rps': round(len(samples) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'queries': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Human-readable reasons results are worse than baseline beyond tolerance."""
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['errors']:
+            found.append(f'{name}: {result["errors"]} errors')
+        if base.get('p95_ms') and result['p95_ms'] is not None and \
+                result['p95_ms'] > base['p95_ms'] * (1 + tolerance) + LATENCY_SLACK_MS:
+            found.append(f'{name}: p95 {result["p95_ms"]} ms vs baseline {base["p95_ms"]} ms')
+        if base.get('rps') and result['rps'] < base['rps'] * (1 - tolerance):
+            found.append(f'{name}: {result["rps"]} req/s vs baseline {base["rps"]} req/s')
+        if base.get('queries') is not None and result['queries'] is not None and \
+                result['queries'] > base['queries'] * (1 + tolerance) + QUERY_SLACK:
+            found.append(f'{name}: {result["queries"]} queries/request '
+                         f'vs baseline {base["queries"]}')
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database', default=os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE))
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=1, help='unrecorded seconds first')
+    parser.add_argument('--max-post-id', type=int, default=50_000)
+    parser.add_argument('-k', '--scenario', action='append',
+                        help='only scenarios whose name starts with this (repeatable)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative regression (default 0.25 = 25%%)')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'instance', 'bench-results.json'))
+    parser.add_argument('--save', action='store_true', help='write the results as the baseline')
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS
+                 if not args.scenario or any(s[0].startswith(k) for k in args.scenario)]
+    server = Server(args.database, args.workers, args.port)
+    try:
+        server.wait_ready()
+        admin = {'Cookie': login(args.port)}
+        results = {}
+        print(f'{"scenario":<16} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+              f'{"queries":>8} {"errors":>7}')
+        for name, template, needs_admin in scenarios:
+            result = run_scenario(args.port, template, admin if needs_admin else {},
+                                  args.concurrency, args.duration, args.warmup, args.max_post_id)
+            results[name] = result
+            print(f'{name:<16} {result["rps"]:>8} {result["p50_ms"]!s:>8} {result["p95_ms"]!s:>8} '
+                  f'{result["p99_ms"]!s:>8} {result["queries"]!s:>8} {result["errors"]:>7}')
+    finally:
+        server.stop()
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'database': urllib.parse.urlsplit(args.database).scheme,
+            'workers': args.workers,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+        },
+        'scenarios': results,
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print('No baseline to compare with; run with --save to record one.')
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['scenarios']
+    found = regressions(results, baseline, args.tolerance)
+    for line in found:
+        print(f'REGRESSION {line}')
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
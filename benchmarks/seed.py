@@ -0,0 +1,190 @@
+"""Fill a throwaway database with realistic volumes of synthetic data.
+
+    python -m benchmarks.seed                     # instance/bench.db, default volumes
+    python -m benchmarks.seed --posts 5000 --donations 50000
+    python -m benchmarks.seed --database postgresql://localhost/modaly_bench
+
+Rows go in with bulk INSERTs in batches. Those bypass the flush hooks, so
+post content, the site stats and the search index are rebuilt afterwards.
+The database must be empty (apart from migrations and the admin account):
+this is never meant to run against real data.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCH_ADMIN = ('bench@example.com', 'bench-password')
+DEFAULT_DATABASE = 'sqlite:///' + os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'bench.db')
+
+WORDS = """community health school water children education clinic training
+volunteer project support village family food program women youth farm
+library teacher nurse medicine clean energy solar garden market local
+campaign donation report story change future hope build learn grow help
+together progress season harvest rain well road bridge center shelter
+safety nutrition vaccine outreach mentor scholarship classroom book
+workshop skills business loan savings cooperative recycling tree forest
+river coast island city district region partner government survey data
+result impact goal plan budget team staff event celebration festival
+music sport football art craft tradition culture language history""".split()
+
+REGION = ['Lagos', 'Accra', 'Nairobi', 'Kumasi', 'Abuja', 'Kano', 'Ibadan', 'Enugu']
+FIRST = ['Ada', 'Kofi', 'Amina', 'Chidi', 'Fatima', 'Emeka', 'Zainab', 'Tunde', 'Ngozi',
+         'Yaw', 'Esi', 'Bola', 'Musa', 'Ifeoma', 'Kwame', 'Aisha']
+LAST = ['Okafor', 'Mensah', 'Bello', 'Adeyemi', 'Owusu', 'Nwosu', 'Abubakar', 'Boateng',
+        'Eze', 'Danjuma', 'Asante', 'Ogunleye']
+
+
+def sentence(rng, low=6, high=16):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+def paragraph(rng):
+    return ' '.join(sentence(rng) for _ in range(rng.randint(3, 7)))
+
+
+def title(rng):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(3, 8))).title()
+
+
+def person(rng):
+    first, last = rng.choice(FIRST), rng.choice(LAST)
+    return f'{first} {last}', f'{first}.{last}{rng.randint(1, 999)}@example.com'.lower()
+
+
+def moment(rng, now, days=3 * 365):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert(db, model, rows, batch_size):
+    started, count = time.perf_counter(), 0
+    for batch in batched(rows, batch_size):
+        db.session.execute(db.insert(model), batch)
+        db.session.commit()
+        count += len(batch)
+    print(f'  {model.__tablename__:<16} {count:>8,} rows  {time.perf_counter() - started:6.1f} s')
+
+
+def posts(rng, n, categories, now):
+    for _ in range(n):
+        body = ''.join(f'<p>{paragraph(rng)}</p>\n' for _ in range(rng.randint(4, 10)))
+        created = moment(rng, now)
+        yield dict(title=title(rng), content=body, excerpt=paragraph(rng)[:300],
+                   category=rng.choice(categories), published=rng.random() < 0.9,
+                   created_at=created, updated_at=created)
+
+
+def campaigns(rng, n, now):
+    for i in range(n):
+        created = moment(rng, now)
+        yield dict(title=title(rng), description=paragraph(rng),
+                   category=rng.choice(['Education', 'Healthcare', 'Community', 'Environment']),
+                   completion_date=f'{rng.choice(REGION)}, {created.year}',
+                   metric1_value=f'{rng.randint(50, 5000):,}', metric1_label='People reached',
+                   metric2_value=str(rng.randint(2, 40)), metric2_label='Volunteers',
+                   metric3_value=f'{rng.randint(1, 24)} months', metric3_label='Duration',
+                   overview='\n\n'.join(paragraph(rng) for _ in range(3)),
+                   services_provided='\n'.join(title(rng) for _ in range(rng.randint(2, 6))),
+                   published=rng.random() < 0.95, featured=rng.random() < 0.05,
+                   display_order=i, created_at=created, updated_at=created)
+
+
+def campaign_images(rng, campaign_ids, per_campaign):
+    for campaign_id in campaign_ids:
+        for order in range(rng.randint(1, per_campaign * 2 - 1)):
+            yield dict(campaign_id=campaign_id, image_url='/static/images/hero.png',
+                       caption=sentence(rng, 3, 8)[:200], display_order=order,
+                       is_primary=order == 0)
+
+
+def campaign_videos(rng, campaign_ids, per_campaign):
+    for campaign_id in campaign_ids:
+        for order in range(rng.randint(0, per_campaign * 2)):
+            yield dict(campaign_id=campaign_id, video_type='youtube',
+                       video_url=f'https://www.youtube.com/watch?v={rng.getrandbits(40):x}',
+                       title=title(rng)[:200], display_order=order)
+
+
+def donations(rng, n, now):
+    for _ in range(n):
+        name, email = person(rng)
+        amount = rng.choice([10, 25, 50, 100, 250]) if rng.random() < 0.8 \
+            else round(rng.uniform(5, 2000), 2)
+        yield dict(name=name, email=email, amount=amount,
+                   message=sentence(rng) if rng.random() < 0.3 else None,
+                   created_at=moment(rng, now))
+
+
+def messages(rng, n, now):
+    for _ in range(n):
+        name, email = person(rng)
+        yield dict(name=name, email=email, subject=title(rng)[:200], message=paragraph(rng),
+                   read=rng.random() < 0.7, created_at=moment(rng, now))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database', default=os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE))
+    parser.add_argument('--posts', type=int, default=50_000)
+    parser.add_argument('--campaigns', type=int, default=2_000)
+    parser.add_argument('--images-per-campaign', type=int, default=4)
+    parser.add_argument('--videos-per-campaign', type=int, default=1)
+    parser.add_argument('--donations', type=int, default=500_000)
+    parser.add_argument('--messages', type=int, default=500_000)
+    parser.add_argument('--batch-size', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    os.environ['DATABASE_URL'] = args.database
+    os.environ['ADMIN_EMAIL'], os.environ['ADMIN_PASSWORD'] = BENCH_ADMIN
+    os.environ['JOBS_ENABLED'] = 'False'
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    from app import (app, db, bootstrap, rebuild_search_index, rebuild_site_stats, render_posts,
+                     BlogPost, ContactMessage, Donation, MediaCampaign, MediaImage, MediaVideo)
+
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        bootstrap()
+        if any(db.session.query(model.id).first() for model in (BlogPost, MediaCampaign, Donation)):
+            sys.exit(f'{args.database} already has data; seed an empty database.')
+
+        print(f'Seeding {args.database}')
+        insert(db, BlogPost, posts(rng, args.posts, app.config['CATEGORIES'], now), args.batch_size)
+        insert(db, MediaCampaign, campaigns(rng, args.campaigns, now), args.batch_size)
+        campaign_ids = [id for (id,) in db.session.query(MediaCampaign.id).order_by(MediaCampaign.id)]
+        insert(db, MediaImage, campaign_images(rng, campaign_ids, args.images_per_campaign),
+               args.batch_size)
+        insert(db, MediaVideo, campaign_videos(rng, campaign_ids, args.videos_per_campaign),
+               args.batch_size)
+        insert(db, Donation, donations(rng, args.donations, now), args.batch_size)
+        insert(db, ContactMessage, messages(rng, args.messages, now), args.batch_size)
+
+        started = time.perf_counter()
+        rendered = render_posts()
+        print(f'  rendered post content ({rendered:,} posts)  {time.perf_counter() - started:6.1f} s')
+
+        started = time.perf_counter()
+        rebuild_site_stats()
+        indexed = rebuild_search_index()
+        print(f'  stats and search index ({indexed:,} documents)  '
+              f'{time.perf_counter() - started:6.1f} s')
+
+
+if __name__ == '__main__':
+    main()
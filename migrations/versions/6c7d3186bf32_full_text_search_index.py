@@ -0,0 +1,61 @@
+"""full-text search index
+
+Revision ID: 6c7d3186bf32
+Revises: 47bb61c62945
+Create Date: 2026-10-17 00:02:41.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app_search import plain_text, search_backend
+
+
+# revision identifiers, used by Alembic.
+revision = '6c7d3186bf32'
+down_revision = '47bb61c62945'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE search_index USING fts5("
+                   "title, body, tokenize = 'porter unicode61 remove_diacritics 2')")
+    elif bind.dialect.name == 'postgresql':
+        op.create_table('search_index',
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.Text(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('document', postgresql.TSVECTOR(), nullable=False),
+        sa.PrimaryKeyConstraint('kind', 'ref_id')
+        )
+        op.create_index('ix_search_index_document', 'search_index', ['document'],
+                        postgresql_using='gin')
+    else:
+        return
+
+    # Index what is already published; from here on the app keeps it in sync.
+    backend = search_backend(bind.dialect.name)
+    posts = bind.execute(sa.text(
+        'SELECT id, title, excerpt, content, category FROM blog_post WHERE published'))
+    for id, title, excerpt, content, category in posts.fetchall():
+        backend.upsert(bind, 'post', id, title, plain_text(excerpt, content, category))
+    campaigns = bind.execute(sa.text(
+        'SELECT id, title, description, overview, services_provided, category '
+        'FROM media_campaign WHERE published'))
+    for id, title, description, overview, services, category in campaigns.fetchall():
+        backend.upsert(bind, 'campaign', id, title,
+                       plain_text(description, overview, services, category))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE search_index')
+    elif bind.dialect.name == 'postgresql':
+        op.drop_index('ix_search_index_document', table_name='search_index')
+        op.drop_table('search_index')
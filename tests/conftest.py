@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+# app.py builds its config at import time, so point it at scratch locations
+# before anything imports it. The page cache is off so every request renders.
+_scratch = tempfile.mkdtemp(prefix='modaly-tests-')
+os.environ.update({
+    'SECRET_KEY': 'test',
+    'DATABASE_URL': 'sqlite:///' + os.path.join(_scratch, 'test.db'),
+    'JOBS_ENABLED': 'False',
+    'WRITE_BEHIND': 'False',
+    'PAGE_CACHE_TYPE': 'null',
+    'METRICS_DIR': os.path.join(_scratch, 'metrics'),
+    'WRITE_JOURNAL_DIR': os.path.join(_scratch, 'write_journal'),
+    'CHUNK_UPLOAD_FOLDER': os.path.join(_scratch, 'partial_uploads'),
+    'UPLOAD_QUARANTINE_FOLDER': os.path.join(_scratch, 'upload_quarantine'),
+})
+os.environ.pop('DATABASE_REPLICA_URL', None)
+
+import app as modaly  # noqa: E402
+from app_cache import LRUCache  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    modaly.app.config['TESTING'] = True
+    modaly.app.config['UPLOAD_FOLDER'] = os.path.join(_scratch, 'uploads')
+    app = modaly.create_app()
+    with app.app_context():
+        modaly.bootstrap()
+    yield app
+    shutil.rmtree(_scratch, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def page_cache(monkeypatch):
+    """A working in-memory page cache in place of the suite's null one."""
+    monkeypatch.setattr(modaly.page_cache, 'backend', LRUCache())
+    return modaly.page_cache
+
+
+@pytest.fixture
+def queries(app):
+    """A list that collects every SQL statement run while the test is active."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = modaly.db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
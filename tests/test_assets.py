@@ -0,0 +1,98 @@
+import gzip
+import io
+import json
+import os
+
+import pytest
+from PIL import Image
+
+import app as modaly
+from app_assets import DIST_DIR, MANIFEST, build_assets, minify_css, minify_js
+
+
+def _png(path, size, noisy=False):
+    image = Image.new('RGB', size, (200, 30, 30))
+    if noisy:
+        image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    image.save(path, 'PNG')
+
+
+@pytest.fixture
+def static(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'style.css').write_text(
+        "/* theme */\nbody {\n  background: url('../images/logo.png');\n"
+        "  font-family: \"Open  Sans\";\n}\na :hover { color: red; }\n")
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'js' / 'main.js').write_text(
+        '// entry point\n/* block\n   comment */\nconst s = `a\n  b`;\n\n'
+        "    const url = 'http://x'; // trailing\n")
+    _png(str(tmp_path / 'images' / 'logo.png'), (16, 16))
+    _png(str(tmp_path / 'images' / 'photo.png'), (256, 256), noisy=True)
+    (tmp_path / 'uploads').mkdir()
+    (tmp_path / 'uploads' / 'user.txt').write_text('not an asset')
+    return tmp_path
+
+
+def test_minify_css_keeps_strings_and_descendant_selectors():
+    css = '/* x */ a  :hover , b > c { content: "a  ;  b" ; margin: 0 ; }'
+    assert minify_css(css) == 'a :hover,b>c{content:"a  ;  b";margin:0}'
+
+
+def test_minify_js_only_drops_whole_lines():
+    js = "// comment\n  if (a) {\n    return '//not a comment';\n  }\n/* one */\nlet t = `\n  kept\n`;\n"
+    assert minify_js(js) == "if (a) {\nreturn '//not a comment';\n}\nlet t = `\n  kept\n`;\n"
+
+
+def test_build_fingerprints_minifies_and_precompresses(static):
+    manifest = build_assets(str(static))
+    dist = static / DIST_DIR
+    assert set(manifest) == {'css/style.css', 'js/main.js', 'images/logo.png',
+                             'images/photo.png'}
+    assert json.loads((dist / MANIFEST).read_text()) == manifest
+    assert manifest['images/photo.png'].endswith('.webp')
+    assert manifest['images/logo.png'].endswith('.png')
+
+    css = (dist / manifest['css/style.css']).read_text()
+    assert css.startswith('body{')
+    assert f"url('../{manifest['images/logo.png']}')" in css
+    assert '"Open  Sans"' in css
+    compressed = (dist / (manifest['css/style.css'] + '.gz')).read_bytes()
+    assert gzip.decompress(compressed).decode() == css
+    assert not (dist / (manifest['images/logo.png'] + '.gz')).exists()
+    with Image.open(io.BytesIO((dist / manifest['images/photo.png']).read_bytes())) as im:
+        assert im.format == 'WEBP'
+
+
+def test_rebuild_keeps_the_previous_build_only(static):
+    first = build_assets(str(static))
+    (static / 'js' / 'main.js').write_text('const v = 2;\n')
+    second = build_assets(str(static))
+    (static / 'js' / 'main.js').write_text('const v = 3;\n')
+    third = build_assets(str(static))
+    dist = static / DIST_DIR
+    assert (dist / second['js/main.js']).exists()
+    assert (dist / third['js/main.js']).exists()
+    assert not (dist / first['js/main.js']).exists()
+    assert not (dist / (first['js/main.js'] + '.gz')).exists()
+    assert second['css/style.css'] == third['css/style.css']
+
+
+def test_pages_link_to_fingerprinted_assets(app, client, static, monkeypatch):
+    manifest = build_assets(str(static))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    monkeypatch.setattr(modaly, 'asset_manifest', manifest)
+    href = f"/static/{DIST_DIR}/{manifest['css/style.css']}"
+    assert href.encode() in client.get('/').data
+
+    response = client.get(href, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'immutable' in response.headers['Cache-Control']
+    assert gzip.decompress(response.data).startswith(b'body{')
+
+    plain = client.get(href)
+    assert 'Content-Encoding' not in plain.headers
+    assert client.get(f'/static/{DIST_DIR}/css/missing.css').status_code == 404
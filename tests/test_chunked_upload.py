@@ -0,0 +1,87 @@
+import fcntl
+import hashlib
+import io
+import os
+
+import pytest
+
+import app as modaly
+
+
+class BrokenStream(io.BytesIO):
+    """A request body that fails after its first block, like a dropped connection."""
+
+    def readinto(self, buffer):
+        if self.tell() >= modaly.UPLOAD_BLOCK_SIZE:
+            raise OSError('connection reset')
+        return super().readinto(memoryview(buffer)[:modaly.UPLOAD_BLOCK_SIZE])
+
+
+@pytest.fixture
+def campaign_id(app, client):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    with app.app_context():
+        campaign = modaly.MediaCampaign(title='Uploads', description='d', category='General')
+        modaly.db.session.add(campaign)
+        modaly.db.session.commit()
+        campaign_id = campaign.id
+    yield campaign_id
+    with app.app_context():
+        modaly.db.session.delete(modaly.db.session.get(modaly.MediaCampaign, campaign_id))
+        modaly.ChunkedUpload.query.delete()
+        modaly.db.session.commit()
+
+
+@pytest.fixture
+def upload(client, campaign_id):
+    response = client.post(f'/admin/media/{campaign_id}/uploads',
+                           json={'filename': 'clip.mp4', 'size': 1 << 20})
+    return response.get_json()
+
+
+def _upload_whole(client, campaign_id, body, sha256):
+    upload = client.post(f'/admin/media/{campaign_id}/uploads',
+                         json={'filename': 'clip.mp4', 'size': len(body), 'sha256': sha256})
+    upload = upload.get_json()
+    assert client.put(upload['url'], data=body,
+                      headers={'Upload-Offset': '0'}).get_json()['offset'] == len(body)
+    return upload, client.post(upload['url'] + '/complete')
+
+
+def test_failed_chunk_leaves_offset_unchanged(client, upload):
+    client.put(upload['url'], data=b'abcd', headers={'Upload-Offset': '0'})
+    response = client.put(upload['url'], input_stream=BrokenStream(b'e' * (1 << 19)),
+                          headers={'Upload-Offset': '4', 'Content-Length': str(1 << 19)})
+    assert response.status_code == 400  # werkzeug's ClientDisconnected
+    assert client.get(upload['url']).get_json()['offset'] == 4
+
+
+def test_concurrent_chunk_is_refused(app, client, upload):
+    path = app.config['CHUNK_UPLOAD_FOLDER'] + '/' + upload['id']
+    with open(path, 'rb') as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        response = client.put(upload['url'], data=b'abcd', headers={'Upload-Offset': '0'})
+    assert response.status_code == 409
+    assert client.get(upload['url']).get_json()['offset'] == 0
+
+
+def test_lost_partial_file_asks_for_a_new_upload(app, client, upload):
+    os.remove(os.path.join(app.config['CHUNK_UPLOAD_FOLDER'], upload['id']))
+    response = client.put(upload['url'], data=b'abcd', headers={'Upload-Offset': '0'})
+    assert response.status_code == 410
+    assert response.get_json()['offset'] == 0
+    assert client.get(upload['url']).status_code == 404
+
+
+def test_complete_checks_the_whole_file(app, client, campaign_id):
+    body = b'video bytes'
+    upload, response = _upload_whole(client, campaign_id, body,
+                                     hashlib.sha256(b'other bytes').hexdigest())
+    assert response.status_code == 422
+    assert not os.path.exists(os.path.join(app.config['CHUNK_UPLOAD_FOLDER'], upload['id']))
+    assert client.get(upload['url']).status_code == 404
+
+    upload, response = _upload_whole(client, campaign_id, body, hashlib.sha256(body).hexdigest())
+    assert response.status_code == 200
+    assert response.get_json()['sha256'] == hashlib.sha256(body).hexdigest()
@@ -0,0 +1,33 @@
+import pytest
+
+import app as modaly
+
+
+@pytest.fixture(scope='module')
+def post_id(app):
+    with app.app_context():
+        post = modaly.BlogPost(title='Conditional', content='<p>body</p>', category='News')
+        modaly.db.session.add(post)
+        modaly.db.session.commit()
+        return post.id
+
+
+def test_revalidating_a_cached_page_runs_no_sql(client, page_cache, queries, post_id):
+    etag = client.get('/blog').headers['ETag']
+    del queries[:]
+
+    assert client.get('/blog').status_code == 200
+    response = client.get('/blog', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert queries == []
+
+
+def test_edit_changes_the_etag(app, client, page_cache, post_id):
+    etag = client.get(f'/blog/{post_id}').headers['ETag']
+    with app.app_context():
+        modaly.db.session.get(modaly.BlogPost, post_id).title = 'Edited'
+        modaly.db.session.commit()
+    response = client.get(f'/blog/{post_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert b'Edited' in response.data
@@ -0,0 +1,30 @@
+from PIL import Image
+
+from app_images import make_derivatives, strip_metadata
+
+
+def _photo(path):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotate 90° clockwise to display
+    exif[0x010f] = 'Phone'
+    exif[0x8825] = {1: 'N', 2: (51.0, 30.0, 0.0)}  # GPS
+    Image.new('RGB', (40, 20), (200, 10, 10)).save(path, 'JPEG', exif=exif.tobytes())
+
+
+def test_strip_metadata_applies_orientation_and_drops_exif(tmp_path):
+    path = str(tmp_path / 'photo.jpg')
+    _photo(path)
+    assert strip_metadata(path)
+    with Image.open(path) as im:
+        assert im.format == 'JPEG'
+        assert im.size == (20, 40)
+        assert not im.getexif()
+    assert not strip_metadata(path)
+
+
+def test_decompression_bomb_is_not_an_image(tmp_path, monkeypatch):
+    path = str(tmp_path / 'huge.png')
+    Image.new('RGB', (100, 100)).save(path)
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 100)
+    assert make_derivatives(path, '/static/uploads/') is None
+    assert not strip_metadata(path)
@@ -0,0 +1,52 @@
+import app as modaly
+
+
+class RecordingPool:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+
+
+def test_dispatch_claims_only_idle_threads(app, monkeypatch):
+    jobs = modaly.jobs
+    pool = RecordingPool()
+    monkeypatch.setattr(jobs, '_pool', pool)
+    monkeypatch.setattr(jobs, '_busy', app.config['JOB_WORKERS'] - 1)
+    with app.app_context():
+        modaly.Job.query.delete()
+        for _ in range(3):
+            jobs.enqueue('delete_files', urls=[])
+        modaly.db.session.commit()
+        try:
+            assert jobs.dispatch_due() == 1
+            assert len(pool.submitted) == 1
+            assert modaly.Job.query.filter_by(status='pending').count() == 2
+
+            jobs._busy = app.config['JOB_WORKERS']
+            assert jobs.dispatch_due() == 0
+
+            jobs._run_in_context(*pool.submitted[0])
+            assert jobs._busy == app.config['JOB_WORKERS'] - 1
+            assert jobs._wakeup.is_set()
+        finally:
+            modaly.Job.query.delete()
+            modaly.db.session.commit()
+            jobs._wakeup.clear()
+
+
+def test_schedule_periodic_keeps_one_waiting_run(app):
+    jobs = modaly.jobs
+    with app.app_context():
+        modaly.Job.query.delete()
+        try:
+            jobs.schedule_periodic()
+            jobs.schedule_periodic()
+            waiting = modaly.Job.query.all()
+            names = sorted(job.name for job in waiting)
+            assert names == sorted(name for name in jobs.periodic if jobs._interval(name))
+            assert all(job.status == 'pending' and job.attempts == 0 for job in waiting)
+        finally:
+            modaly.Job.query.delete()
+            modaly.db.session.commit()
@@ -0,0 +1,99 @@
+import json
+import os
+import re
+
+import pytest
+
+from app_metrics import AGGREGATE_FILE, Metrics
+
+
+def _worker(directory):
+    metrics = Metrics(str(directory), flush_interval=60)
+    metrics.counter('hits_total', 'Hits.')
+    metrics.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+    return metrics
+
+
+def _sample(text, line):
+    match = re.search(rf'^{re.escape(line)} (\S+)$', text, re.MULTILINE)
+    return match and float(match.group(1))
+
+
+def _dead_snapshot(directory, name, hits):
+    snapshot = {'counters': [['hits_total', [['route', 'a']], hits]], 'histograms': []}
+    (directory / name).write_text(json.dumps(snapshot))
+
+
+def test_render_adds_up_every_worker(tmp_path):
+    one, two = _worker(tmp_path), _worker(tmp_path)
+    one.inc('hits_total', (('route', 'a'),), 2)
+    two.inc('hits_total', (('route', 'a'),), 3)
+    for value in (0.05, 0.5, 5):
+        one.observe('latency_seconds', (), value)
+    one.maybe_persist(force=True)
+
+    text = two.render()
+    assert _sample(text, 'hits_total{route="a"}') == 5
+    assert _sample(text, 'latency_seconds_bucket{le="0.1"}') == 1
+    assert _sample(text, 'latency_seconds_bucket{le="1.0"}') == 2
+    assert _sample(text, 'latency_seconds_bucket{le="+Inf"}') == 3
+    assert _sample(text, 'latency_seconds_count') == 3
+    assert _sample(text, 'latency_seconds_sum') == pytest.approx(5.55)
+
+
+def test_persist_is_rate_limited(tmp_path):
+    metrics = _worker(tmp_path)
+    metrics.inc('hits_total')
+    metrics.maybe_persist()
+    metrics.inc('hits_total')
+    metrics.maybe_persist()
+    (name,) = [n for n in os.listdir(tmp_path) if n.endswith('.json')]
+    assert json.loads((tmp_path / name).read_text())['counters'] == [['hits_total', [], 1]]
+
+
+def test_exited_workers_are_folded_into_the_aggregate_once(tmp_path):
+    _dead_snapshot(tmp_path, '999999999-x-deadbeef.json', 4)
+    (tmp_path / '999999999-x-deadbeef-tmp.tmp').write_text('partial')
+    metrics = _worker(tmp_path)
+    metrics.inc('hits_total', (('route', 'a'),))
+
+    for _ in range(2):
+        assert _sample(metrics.render(), 'hits_total{route="a"}') == 5
+    assert sorted(os.listdir(tmp_path)) == ['.lock', AGGREGATE_FILE]
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/stat'), reason='needs /proc start times')
+def test_recycled_pid_is_not_mistaken_for_a_live_worker(tmp_path):
+    _dead_snapshot(tmp_path, f'{os.getpid()}-1-cafef00d.json', 7)
+    metrics = _worker(tmp_path)
+    assert _sample(metrics.render(), 'hits_total{route="a"}') == 7
+    assert not (tmp_path / f'{os.getpid()}-1-cafef00d.json').exists()
+
+
+def test_label_values_are_escaped(tmp_path):
+    metrics = _worker(tmp_path)
+    metrics.inc('hits_total', (('route', 'a"b\\c\nd'),))
+    assert 'hits_total{route="a\\"b\\\\c\\nd"} 1' in metrics.render()
+
+
+def test_metrics_endpoint_needs_an_admin_or_the_token(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scrape-me')
+    assert client.get('/admin/metrics').status_code == 401
+    assert client.get('/admin/metrics',
+                      headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    client.get('/blog')
+    response = client.get('/admin/metrics', headers={'Authorization': 'Bearer scrape-me'})
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert _sample(text, 'http_request_duration_seconds_count'
+                         '{endpoint="blog",method="GET",status="200"}') >= 1
+    assert 'http_request_sql_queries_bucket{endpoint="blog",le="+Inf"}' in text
+    assert 'write_journal_segments_pending 0' in text
+
+
+def test_server_timing_header(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'SERVER_TIMING', True)
+    header = client.get('/blog').headers['Server-Timing']
+    assert re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+',
+                        header)
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+import app as modaly
+from app_cache import FileSystemCache, LRUCache, NullCache, PageCache
+
+
+@pytest.fixture
+def post_id(app):
+    with app.app_context():
+        post = modaly.BlogPost(title='Cached title', content='<p>body</p>', category='News')
+        modaly.db.session.add(post)
+        modaly.db.session.commit()
+        post_id = post.id
+    yield post_id
+    with app.app_context():
+        post = modaly.db.session.get(modaly.BlogPost, post_id)
+        if post is not None:
+            modaly.db.session.delete(post)
+            modaly.db.session.commit()
+
+
+@pytest.fixture
+def admin(app):
+    admin = app.test_client()
+    with admin.session_transaction() as sess:
+        sess['user_id'] = 1
+    return admin
+
+
+def test_admin_edit_invalidates_cached_pages(client, admin, page_cache, queries, post_id):
+    assert b'Cached title' in client.get(f'/blog/{post_id}').data
+    assert b'Cached title' in client.get('/blog').data
+    del queries[:]
+    assert b'Cached title' in client.get(f'/blog/{post_id}').data
+    assert queries == []
+
+    response = admin.post(f'/admin/post/{post_id}/edit', data={
+        'title': 'Edited title', 'content': '<p>body</p>', 'category': 'News',
+        'published': 'on'})
+    assert response.status_code == 302
+
+    assert b'Edited title' in client.get(f'/blog/{post_id}').data
+    assert b'Edited title' in client.get('/blog').data
+
+
+def test_write_to_one_namespace_keeps_the_other(app, page_cache, post_id):
+    posts, media = page_cache.version('posts'), page_cache.version('media')
+    with app.app_context():
+        modaly.db.session.get(modaly.BlogPost, post_id).title = 'Renamed'
+        modaly.db.session.commit()
+    assert page_cache.version('posts') != posts
+    assert page_cache.version('media') == media
+
+
+def test_invalidation_waits_for_commit(app, page_cache, post_id):
+    version = page_cache.version('posts')
+    with app.app_context():
+        modaly.db.session.get(modaly.BlogPost, post_id).title = 'Flushed'
+        modaly.db.session.flush()
+        assert page_cache.version('posts') == version
+        modaly.db.session.rollback()
+    assert page_cache.version('posts') == version
+
+    with app.app_context():
+        modaly.db.session.get(modaly.BlogPost, post_id).title = 'Committed'
+        modaly.db.session.commit()
+    assert page_cache.version('posts') != version
+
+
+@pytest.fixture(params=['lru', 'filesystem'])
+def backend(request, tmp_path):
+    if request.param == 'lru':
+        return LRUCache(max_entries=2, default_ttl=60)
+    return FileSystemCache(str(tmp_path / 'cache'), max_entries=2, default_ttl=60)
+
+
+def test_backend_round_trip_and_expiry(backend, monkeypatch):
+    backend.set('page', (b'<html>', 'text/html'))
+    backend.set('forever', 'token', ttl=0)
+    assert backend.get('page') == (b'<html>', 'text/html')
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert backend.get('page') is None
+    assert backend.get('forever') == 'token'
+
+    backend.delete('forever')
+    assert backend.get('forever') is None
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+
+
+def test_filesystem_cache_is_shared_and_created_on_first_write(tmp_path):
+    directory = tmp_path / 'shared'
+    one, two = FileSystemCache(str(directory)), FileSystemCache(str(directory))
+    assert not directory.exists()
+    assert one.get('key') is None
+
+    one.set('key', 'value')
+    assert two.get('key') == 'value'
+    two.clear()
+    assert one.get('key') is None
+
+
+def test_page_keys_follow_namespace_versions():
+    cache = PageCache(LRUCache())
+    both = cache.make_key(('posts', 'media'), 'index')
+    media = cache.make_key(('media',), 'media')
+    cache.invalidate('posts')
+    assert cache.make_key(('posts', 'media'), 'index') != both
+    assert cache.make_key(('media',), 'media') == media
+
+
+def test_null_cache_stores_nothing():
+    cache = PageCache(NullCache())
+    cache.set('key', 'value')
+    assert cache.get('key') is None
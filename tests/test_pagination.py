@@ -0,0 +1,79 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as modaly
+from app_pagination import decode_cursor, encode_cursor, keyset_paginate
+
+COLUMNS = [modaly.BlogPost.created_at, modaly.BlogPost.id]
+
+
+@pytest.fixture
+def paging_posts(app):
+    """Seven posts in their own category; three share a timestamp so the id breaks ties."""
+    start = datetime(2024, 1, 1, 12, 0)
+    stamps = [start + timedelta(hours=h) for h in (0, 1, 1, 1, 2, 3, 4)]
+    with app.app_context():
+        posts = [modaly.BlogPost(title=f'Paging {i}', content='<p>x</p>', category='Paging',
+                                 created_at=stamp) for i, stamp in enumerate(stamps)]
+        modaly.db.session.add_all(posts)
+        modaly.db.session.commit()
+        expected = [p.id for p in sorted(posts, key=lambda p: (p.created_at, p.id),
+                                         reverse=True)]
+    yield expected
+    with app.app_context():
+        modaly.BlogPost.query.filter_by(category='Paging').delete()
+        modaly.db.session.commit()
+
+
+def _query():
+    return modaly.BlogPost.query.filter_by(category='Paging')
+
+
+@pytest.mark.parametrize('per_page', [1, 2, 3, 7, 10])
+def test_cursors_walk_every_row_once_in_both_directions(app, paging_posts, per_page):
+    with app.app_context():
+        pages = [keyset_paginate(_query(), COLUMNS, per_page)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(_query(), COLUMNS, per_page,
+                                         after=pages[-1].next_cursor))
+        assert [p.id for page in pages for p in page] == paging_posts
+        assert not pages[0].has_prev
+        assert all(len(page) == per_page for page in pages[:-1])
+
+        back = [pages[-1]]
+        while back[-1].has_prev:
+            back.append(keyset_paginate(_query(), COLUMNS, per_page,
+                                        before=back[-1].prev_cursor))
+        assert [[p.id for p in page] for page in reversed(back)] == \
+            [[p.id for p in page] for page in pages]
+
+
+def test_page_ending_on_the_last_row_has_no_next(app, paging_posts):
+    with app.app_context():
+        first = keyset_paginate(_query(), COLUMNS, 4)
+        last = keyset_paginate(_query(), COLUMNS, 4, after=first.next_cursor)
+        assert len(last) == 3 and not last.has_next
+        assert keyset_paginate(_query(), COLUMNS, 7).next_cursor is None
+
+
+def test_cursor_round_trips_datetimes():
+    stamp = datetime(2024, 5, 6, 7, 8, 9, 10)
+    assert decode_cursor(encode_cursor([stamp, 42]), COLUMNS) == [stamp, 42]
+
+
+@pytest.mark.parametrize('token', ['', 'not-base64!', encode_cursor([1]), 'WyJ4IiwxXQ'])
+def test_malformed_cursor_is_rejected(token):
+    assert decode_cursor(token, COLUMNS) is None
+
+
+def test_blog_links_page_through_a_category(client, paging_posts, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'POSTS_PER_PAGE', 3)
+    seen, url = [], '/blog?category=Paging'
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        seen += [int(i) for i in re.findall(r'href="/blog/(\d+)"', html)]
+        match = re.search(r'href="(/blog\?[^"]*after=[^"]*)"', html)
+        url = match and match.group(1).replace('&amp;', '&')
+    assert list(dict.fromkeys(seen)) == paging_posts
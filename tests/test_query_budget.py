@@ -0,0 +1,66 @@
+import pytest
+
+import app as modaly
+
+# The most SQL any public page may run. Listing pages must stay flat in the
+# number of rows shown, so a lazy load per campaign or post blows through it.
+BUDGET = 4
+
+PUBLIC_PAGES = [
+    '/',
+    '/blog',
+    '/blog?category=News',
+    '/blog/{post}',
+    '/media',
+    '/media/{campaign}/detail',
+    '/search?q=hello',
+    '/contact',
+    '/donate',
+    '/api/v1/posts',
+    '/api/v1/posts/{post}',
+    '/api/v1/campaigns',
+    '/api/v1/campaigns/{campaign}',
+    '/api/v1/categories',
+]
+
+
+@pytest.fixture(scope='module')
+def seeded(app):
+    with app.app_context():
+        for i in range(6):
+            campaign = modaly.MediaCampaign(title=f'Campaign {i}', description='Description',
+                                            category='Education', overview='Overview',
+                                            services_provided='Design\nBuild')
+            campaign.images = [modaly.MediaImage(image_url=f'/static/uploads/{i}-{n}.png',
+                                                 is_primary=n == 0, display_order=n)
+                               for n in range(3)]
+            campaign.videos = [modaly.MediaVideo(video_url='https://youtu.be/abc',
+                                                 video_type='youtube', display_order=n)
+                               for n in range(2)]
+            modaly.db.session.add(campaign)
+        for i in range(6):
+            modaly.db.session.add(modaly.BlogPost(title=f'Post {i}', content='<p>hello world</p>',
+                                                  excerpt='Excerpt', category='News'))
+        modaly.db.session.commit()
+        return {'campaign': modaly.MediaCampaign.query.first().id,
+                'post': modaly.BlogPost.query.first().id}
+
+
+@pytest.fixture
+def budget(app):
+    app.config['SQL_QUERY_BUDGET'] = BUDGET
+    yield BUDGET
+    app.config['SQL_QUERY_BUDGET'] = 0
+
+
+@pytest.mark.parametrize('page', PUBLIC_PAGES)
+def test_public_page_within_budget(client, seeded, budget, page):
+    response = client.get(page.format(**seeded))
+    assert response.status_code == 200
+
+
+def test_over_budget_raises(app, client, seeded, budget):
+    app.config['SQL_QUERY_BUDGET'] = 1
+    with pytest.raises(modaly.QueryBudgetExceeded):
+        client.get('/media')
+
@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+from flask import g
+from sqlalchemy import create_engine, event
+
+import app as modaly
+
+
+@pytest.fixture
+def replica(app, tmp_path, monkeypatch):
+    """A snapshot of the primary standing in for a lagging replica; records its queries."""
+    path = str(tmp_path / 'replica.db')
+    with app.app_context():
+        source = sqlite3.connect(modaly.db.engine.url.database)
+        with sqlite3.connect(path) as target:
+            source.backup(target)
+        source.close()
+        engines = modaly.db.engines
+        engine = engines[modaly.REPLICA_BIND] = create_engine(f'sqlite:///{path}')
+    monkeypatch.setitem(app.config, 'SQLALCHEMY_BINDS', {modaly.REPLICA_BIND: engine.url})
+    statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    yield statements
+    del engines[modaly.REPLICA_BIND]
+    engine.dispose()
+
+
+@pytest.fixture
+def post_id(app, replica):
+    """A post written to the primary after the replica's snapshot."""
+    with app.app_context():
+        post = modaly.BlogPost(title='Lagging', content='<p>x</p>', category='News')
+        modaly.db.session.add(post)
+        modaly.db.session.commit()
+        post_id = post.id
+    yield post_id
+    with app.app_context():
+        modaly.db.session.delete(modaly.db.session.get(modaly.BlogPost, post_id))
+        modaly.db.session.commit()
+
+
+@pytest.fixture
+def admin(app):
+    admin = app.test_client()
+    with admin.session_transaction() as sess:
+        sess['user_id'] = 1
+    return admin
+
+
+def test_public_reads_go_to_the_replica(client, replica, post_id):
+    assert client.get(f'/blog/{post_id}').status_code == 404
+    assert replica
+
+
+def test_admin_pages_and_posts_use_the_primary(admin, replica, post_id):
+    assert admin.get(f'/admin/post/{post_id}/edit').status_code == 200
+    assert admin.post('/contact', data={'name': 'Replica', 'email': 'r@example.com',
+                                        'message': 'Hi'}).status_code == 302
+    assert replica == []
+
+
+def test_admin_sticks_to_the_primary_after_a_write(app, client, admin, replica, post_id):
+    assert admin.get(f'/blog/{post_id}').status_code == 404
+    response = admin.post(f'/admin/post/{post_id}/edit', data={
+        'title': 'Saved', 'content': '<p>x</p>', 'category': 'News', 'published': 'on'})
+    assert response.status_code == 302
+    with admin.session_transaction() as sess:
+        assert sess['primary_until'] > 0
+
+    del replica[:]
+    assert b'Saved' in admin.get(f'/blog/{post_id}').data
+    assert replica == []
+    assert client.get(f'/blog/{post_id}').status_code == 404
+    assert replica
+
+
+def test_statements_during_a_replica_request_split_by_kind(app, replica):
+    with app.test_request_context('/blog'):
+        g.use_replica = True
+        engines = modaly.db.engines
+        read = modaly.db.select(modaly.BlogPost.id)
+        write = modaly.db.update(modaly.BlogPost).values(title='x')
+        assert modaly.db.session.get_bind(clause=read) is engines[modaly.REPLICA_BIND]
+        assert modaly.db.session.get_bind(clause=write) is engines[None]
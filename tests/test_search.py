@@ -0,0 +1,37 @@
+import app as modaly
+
+
+def _add_post(app, title):
+    with app.app_context():
+        post = modaly.BlogPost(title=title, content='<p>searchable body</p>', category='News')
+        modaly.db.session.add(post)
+        modaly.db.session.commit()
+        return post.id
+
+
+def _found(client, word, post_id):
+    return f'href="/blog/{post_id}"'.encode() in client.get(f'/search?q={word}').data
+
+
+def test_unpublishing_removes_a_post_from_search(app, client):
+    post_id = _add_post(app, 'Zebracorn unpublished')
+    assert _found(client, 'zebracorn', post_id)
+
+    with app.app_context():
+        modaly.db.session.get(modaly.BlogPost, post_id).published = False
+        modaly.db.session.commit()
+    assert not _found(client, 'zebracorn', post_id)
+
+
+def test_deleting_removes_a_post_without_rendering_it(app, client, monkeypatch):
+    post_id = _add_post(app, 'Quokkafish deleted')
+    assert _found(client, 'quokkafish', post_id)
+
+    rendered = []
+    real = modaly.search_document
+    monkeypatch.setattr(modaly, 'search_document', lambda obj: rendered.append(obj) or real(obj))
+    with app.app_context():
+        modaly.db.session.delete(modaly.db.session.get(modaly.BlogPost, post_id))
+        modaly.db.session.commit()
+    assert rendered == []
+    assert not _found(client, 'quokkafish', post_id)
@@ -0,0 +1,29 @@
+import app as modaly
+
+
+def test_running_totals_match_a_rebuild_after_edits_on_expired_rows(app):
+    with app.app_context():
+        modaly.rebuild_site_stats()
+        post = modaly.BlogPost(title='Stats', content='<p>x</p>', published=True)
+        message = modaly.ContactMessage(name='A', email='a@example.com', message='Hi')
+        donation = modaly.Donation(name='B', email='b@example.com', amount=10)
+        modaly.db.session.add_all([post, message, donation])
+        modaly.db.session.commit()
+
+        # Each commit expires the instances, so these assignments happen
+        # without the old values loaded.
+        post.published = False
+        modaly.db.session.commit()
+        message.read = True
+        modaly.db.session.commit()
+        donation.amount = 25
+        modaly.db.session.commit()
+
+        running = modaly.get_site_stats().to_dict()
+        assert running == modaly.rebuild_site_stats().to_dict()
+
+        for row in (post, message, donation):
+            modaly.db.session.delete(row)
+        modaly.db.session.commit()
+        running = modaly.get_site_stats().to_dict()
+        assert running == modaly.rebuild_site_stats().to_dict()
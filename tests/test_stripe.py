@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import app as modaly
+from app_stripe import sign_payload
+
+SECRET = 'whsec_test'
+
+
+@pytest.fixture
+def stripe(app):
+    app.config.update(STRIPE_WEBHOOK_SECRET=SECRET, MAIL_SERVER='localhost',
+                      STRIPE_PAYMENT_LINK='https://buy.stripe.com/test_123')
+    yield
+    app.config.update(STRIPE_WEBHOOK_SECRET=None, MAIL_SERVER=None, STRIPE_PAYMENT_LINK=None)
+    with app.app_context():
+        modaly.Donation.query.delete()
+        modaly.StripeEvent.query.delete()
+        modaly.Job.query.delete()
+        modaly.db.session.commit()
+        modaly.rebuild_site_stats()
+
+
+def _checkout_event(event_id, payment_intent, amount, pledge=None):
+    with open('fixtures/stripe/checkout.session.completed.json') as f:
+        event = json.load(f)
+    event['id'] = event_id
+    event['data']['object'].update(payment_intent=payment_intent, amount_total=amount)
+    if pledge:
+        event['data']['object']['client_reference_id'] = pledge
+    return event
+
+
+def _deliver(client, event):
+    payload = json.dumps(event).encode('utf-8')
+    response = client.post('/webhooks/stripe', data=payload,
+                           headers={'Content-Type': 'application/json',
+                                    'Stripe-Signature': sign_payload(payload, SECRET)})
+    assert response.status_code == 200
+    return modaly.process_stripe_event(event['id'])
+
+
+def _mail_subjects():
+    return [json.loads(job.payload)['subject']
+            for job in modaly.Job.query.filter_by(name='send_mail').order_by(modaly.Job.id)]
+
+
+def test_payment_settles_its_pledge(app, client, stripe):
+    response = client.post('/donate', data={'name': 'Ada', 'email': 'ada@example.com',
+                                            'amount': '50'})
+    assert b'client_reference_id=' in response.data
+    with app.app_context():
+        pledge = modaly.Donation.query.one()
+        assert pledge.payment_reference is None
+        event = _checkout_event('evt_pledge_1', 'pi_pledge_1', 6000, pledge.reference)
+        _deliver(client, event)
+        _deliver(client, dict(event, id='evt_pledge_2'))  # same payment, another event
+
+        donation = modaly.Donation.query.one()
+        assert donation.payment_reference == 'pi_pledge_1'
+        assert donation.paid_at is not None
+        assert donation.amount == 60
+        stats = modaly.get_site_stats()
+        assert (stats.total_donations, stats.donation_sum) == (1, 60)
+        subjects = _mail_subjects()
+        assert len(subjects) == 2
+        assert 'Thank you' in subjects[0] and 'receipt' in subjects[1]
+
+
+def test_payment_without_pledge_is_a_new_donation(app, client, stripe):
+    with app.app_context():
+        _deliver(client, _checkout_event('evt_direct_1', 'pi_direct_1', 2500, 'no-such-pledge'))
+        donation = modaly.Donation.query.one()
+        assert (donation.amount, donation.reference) == (25, None)
+        assert modaly.get_site_stats().donation_sum == 25
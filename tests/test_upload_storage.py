@@ -0,0 +1,138 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import app as modaly
+
+
+@pytest.fixture
+def run_jobs(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_DELETE_GRACE', 0)
+
+    def run():
+        with app.app_context():
+            while modaly.jobs.dispatch_due(run_inline=True):
+                pass
+    return run
+
+
+def _store(tmp_path, data, name='photo.png'):
+    tmp = tmp_path / 'incoming'
+    tmp.write_bytes(data)
+    return modaly.store_upload(str(tmp), hashlib.sha256(data).hexdigest(), name)
+
+
+def _png(colour):
+    buf = io.BytesIO()
+    Image.new('RGB', (8, 8), colour).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def test_deleting_the_last_reference_removes_file_and_shard_dirs(app, tmp_path, run_jobs):
+    with app.app_context():
+        url = _store(tmp_path, _png((1, 2, 3)))
+        post = modaly.BlogPost(title='Shard', content='<p>x</p>', image_url=url)
+        modaly.db.session.add(post)
+        modaly.db.session.commit()
+        post_id = post.id
+    run_jobs()
+    with app.app_context():
+        path = modaly.upload_path(url)
+        assert os.path.exists(path)
+        modaly.db.session.delete(modaly.db.session.get(modaly.BlogPost, post_id))
+        modaly.db.session.commit()
+    run_jobs()
+    assert not os.path.exists(path)
+    assert not os.path.exists(os.path.dirname(path))
+    assert not os.path.exists(os.path.dirname(os.path.dirname(path)))
+    assert os.path.isdir(app.config['UPLOAD_FOLDER'])
+
+
+def _refcount(url):
+    blob = modaly.db.session.get(modaly.UploadBlob, url, populate_existing=True)
+    return blob and blob.refcount
+
+
+def test_identical_uploads_share_one_counted_file(app, tmp_path, run_jobs):
+    data = _png((4, 5, 6))
+    with app.app_context():
+        url = _store(tmp_path, data, 'first.png')
+        assert _store(tmp_path, data, 'second.PNG') == url
+        path = modaly.upload_path(url)
+        assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+        posts = [modaly.BlogPost(title=f'Dedup {i}', content='<p>x</p>', image_url=url)
+                 for i in range(2)]
+        modaly.db.session.add_all(posts)
+        modaly.db.session.commit()
+        post_ids = [post.id for post in posts]
+        assert _refcount(url) == 2
+        assert modaly.db.session.get(modaly.UploadBlob, url).size == len(data)
+
+        modaly.db.session.delete(modaly.db.session.get(modaly.BlogPost, post_ids[0]))
+        modaly.db.session.commit()
+        assert _refcount(url) == 1
+    run_jobs()
+    assert os.path.exists(path)
+
+    with app.app_context():
+        modaly.db.session.delete(modaly.db.session.get(modaly.BlogPost, post_ids[1]))
+        modaly.db.session.commit()
+        assert _refcount(url) == 0
+    run_jobs()
+    assert not os.path.exists(path)
+    with app.app_context():
+        assert modaly.db.session.get(modaly.UploadBlob, url) is None
+
+
+def test_replacing_an_image_moves_the_reference(app, tmp_path, run_jobs):
+    with app.app_context():
+        old, new = _store(tmp_path, _png((7, 8, 9))), _store(tmp_path, _png((9, 8, 7)))
+        post = modaly.BlogPost(title='Replace', content='<p>x</p>', image_url=old)
+        modaly.db.session.add(post)
+        modaly.db.session.commit()
+
+        post.image_url = new
+        modaly.db.session.commit()
+        assert (_refcount(old), _refcount(new)) == (0, 1)
+
+        post.image_url = old
+        modaly.db.session.flush()
+        modaly.db.session.rollback()
+        assert (_refcount(old), _refcount(new)) == (0, 1)
+        old_path, new_path = modaly.upload_path(old), modaly.upload_path(new)
+    run_jobs()
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path)
+
+
+def test_recently_stored_file_survives_the_grace_period(app, tmp_path, run_jobs, monkeypatch):
+    with app.app_context():
+        url = _store(tmp_path, _png((10, 11, 12)))
+        post = modaly.BlogPost(title='Grace', content='<p>x</p>', image_url=url)
+        modaly.db.session.add(post)
+        modaly.db.session.commit()
+        modaly.db.session.delete(post)
+        modaly.db.session.commit()
+    monkeypatch.setitem(app.config, 'UPLOAD_DELETE_GRACE', 3600)
+    with app.app_context():
+        modaly.jobs.dispatch_due(run_inline=True)
+        assert os.path.exists(modaly.upload_path(url))
+        modaly.Job.query.delete()
+        modaly.db.session.commit()
+
+
+def test_rebuild_upload_refs_recounts_from_the_columns(app, tmp_path):
+    with app.app_context():
+        url = _store(tmp_path, _png((13, 14, 15)))
+        modaly.db.session.add(modaly.BlogPost(title='Recount', content='<p>x</p>',
+                                              image_url=url))
+        modaly.db.session.commit()
+        modaly.db.session.get(modaly.UploadBlob, url).refcount = 5
+        modaly.db.session.commit()
+
+        modaly.rebuild_upload_refs()
+        assert _refcount(url) == 1
@@ -0,0 +1,113 @@
+import os
+import re
+
+import pytest
+from werkzeug.http import parse_range_header
+
+import app as modaly
+from app_files import MAX_RANGES, satisfiable_ranges
+
+DATA = bytes(range(256)) * 40
+SIZE = len(DATA)
+
+
+@pytest.fixture(scope='module')
+def url(app):
+    directory = os.path.join(app.config['UPLOAD_FOLDER'], 'range-test')
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'clip.mp4'), 'wb') as f:
+        f.write(DATA)
+    return '/static/uploads/range-test/clip.mp4'
+
+
+def test_full_response_advertises_ranges(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == DATA
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Type'] == 'video/mp4'
+    assert response.content_length == SIZE
+
+
+@pytest.mark.parametrize('header, start, stop', [
+    ('bytes=10-19', 10, 20),
+    ('bytes=-5', SIZE - 5, SIZE),
+    ('bytes=10000-', 10000, SIZE),
+    ('bytes=10000-99999', 10000, SIZE),
+    ('bytes=0-9,10-14', 0, 15),
+])
+def test_single_range(client, url, header, start, stop):
+    response = client.get(url, headers={'Range': header})
+    assert response.status_code == 206
+    assert response.data == DATA[start:stop]
+    assert response.headers['Content-Range'] == f'bytes {start}-{stop - 1}/{SIZE}'
+    assert response.content_length == stop - start
+
+
+@pytest.mark.parametrize('header', ['bytes=20000-', f'bytes={SIZE}-{SIZE + 10}'])
+def test_unsatisfiable_range_is_416(client, url, header):
+    response = client.get(url, headers={'Range': header})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{SIZE}'
+    assert response.data == b''
+
+
+def test_several_ranges_are_multipart(client, url):
+    response = client.get(url, headers={'Range': 'bytes=0-1,100-103,-2'})
+    assert response.status_code == 206
+    assert response.mimetype == 'multipart/byteranges'
+    boundary = response.mimetype_params['boundary']
+    body = response.data
+    assert len(body) == response.content_length
+    parts = body.split(f'--{boundary}'.encode())
+    assert parts[0] == b'' and parts[-1] == b'--\r\n'
+    found = []
+    for part in parts[1:-1]:
+        head, payload = part.split(b'\r\n\r\n', 1)
+        start, stop = map(int, re.search(rb'bytes (\d+)-(\d+)/', head).groups())
+        assert payload == DATA[start:stop + 1] + b'\r\n'
+        found.append((start, stop))
+    assert found == [(0, 1), (100, 103), (SIZE - 2, SIZE - 1)]
+
+
+def test_too_many_ranges_sends_the_whole_file(client, url):
+    header = 'bytes=' + ','.join(f'{i * 10}-{i * 10 + 1}' for i in range(MAX_RANGES + 1))
+    response = client.get(url, headers={'Range': header})
+    assert response.status_code == 200
+    assert response.data == DATA
+
+
+def test_validators(client, url):
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    current = client.get(url, headers={'Range': 'bytes=0-3', 'If-Range': etag})
+    assert current.status_code == 206
+    stale = client.get(url, headers={'Range': 'bytes=0-3', 'If-Range': '"stale"'})
+    assert stale.status_code == 200 and stale.data == DATA
+
+
+def test_offload_sends_headers_only(app, client, url, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOADS_OFFLOAD', 'x-accel-redirect')
+    response = client.get(url, headers={'Range': 'bytes=0-3'})
+    assert response.status_code == 200
+    assert response.headers['X-Accel-Redirect'] == \
+        app.config['UPLOADS_ACCEL_PREFIX'] + 'range-test/clip.mp4'
+    assert response.data == b''
+
+
+@pytest.mark.parametrize('path', ['/static/uploads/range-test/missing.mp4',
+                                  '/static/uploads/../app.py', '/static/uploads/range-test'])
+def test_missing_or_outside_files_are_404(client, url, path):
+    assert client.get(path).status_code == 404
+
+
+def test_satisfiable_ranges_merges_and_clamps():
+    def spans(header, size=100):
+        return satisfiable_ranges(parse_range_header(header), size)
+
+    assert spans('bytes=0-9,10-19,50-59') == [(0, 20), (50, 60)]
+    assert spans('bytes=0-9,5-19') is None  # overlapping: werkzeug drops the header
+    assert spans('bytes=90-200') == [(90, 100)]
+    assert spans('bytes=-200') == [(0, 100)]
+    assert spans('bytes=100-') == []
+    assert spans('bytes=0-0', size=0) == []
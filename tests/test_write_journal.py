@@ -0,0 +1,73 @@
+import os
+import shutil
+
+import pytest
+
+import app as modaly
+
+
+@pytest.fixture
+def journal(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'WRITE_BEHIND', True)
+    monkeypatch.setattr(modaly.journal, 'directory', str(tmp_path))
+    monkeypatch.setattr(modaly.journal, '_started', True)  # flush by hand, not on a thread
+    yield modaly.journal
+    with app.app_context():
+        modaly.journal.flush()
+        modaly.ContactMessage.query.delete()
+        modaly.JournalSegment.query.delete()
+        modaly.Job.query.delete()
+        modaly.db.session.commit()
+        modaly.rebuild_site_stats()
+
+
+def _submit(client, n, prefix='Journal'):
+    for i in range(n):
+        response = client.post('/contact', data={'name': f'{prefix} {i}', 'email': 'j@example.com',
+                                                 'message': 'Hello'})
+        assert response.status_code == 302
+
+
+def _messages(prefix='Journal'):
+    return modaly.ContactMessage.query.filter(
+        modaly.ContactMessage.name.startswith(prefix)).count()
+
+
+def test_submissions_reach_the_database_on_flush(app, client, journal):
+    with app.app_context():
+        unread = modaly.get_site_stats().unread_messages
+    _submit(client, 3)
+    with app.app_context():
+        assert _messages() == 0
+        assert journal.pending() == 1
+        assert journal.flush() == 3
+        assert _messages() == 3
+        assert modaly.get_site_stats().unread_messages == unread + 3
+        assert journal.pending() == 0
+        assert journal.flush() == 0
+
+
+def test_replaying_a_committed_segment_inserts_nothing(app, client, journal, tmp_path):
+    _submit(client, 2)
+    journal._seal_active()
+    (sealed,) = os.listdir(tmp_path)
+    shutil.copy(tmp_path / sealed, tmp_path / 'copy')
+    with app.app_context():
+        assert journal.flush() == 2
+        # A crash between the commit and the unlink leaves the segment behind.
+        os.rename(tmp_path / 'copy', tmp_path / sealed)
+        assert journal.flush() == 0
+        assert _messages() == 2
+        assert not os.listdir(tmp_path)
+
+
+def test_abandoned_segment_is_recovered_without_its_torn_line(app, client, journal, tmp_path):
+    _submit(client, 2, prefix='Abandoned')
+    # Pretend the writer died: drop its handle (and flock) and tear a final line.
+    with open(journal._path, 'ab') as f:
+        f.write(b'{"kind": "contact", "rec')
+    journal._file.close()
+    journal._file = journal._path = None
+    with app.app_context():
+        assert journal.flush() == 2
+        assert _messages('Abandoned') == 2